@@ -21,6 +21,50 @@ import django
 # API Key for CoinGecko 
 COIN_GECKO_API_KEY = config('COINGECKO_API_KEY', default='your-coingecko-api-key')
 
+# CoinGecko base URL (override to point at a mirror or a local fake upstream)
+COIN_GECKO_URL = config('COINGECKO_API_URL', default='https://api.coingecko.com/api/v3')
+
+# Upstream HTTP client: pooled keep-alive session with retries
+UPSTREAM_POOL_SIZE = config('UPSTREAM_POOL_SIZE', default=10, cast=int)
+UPSTREAM_CONNECT_TIMEOUT = config('UPSTREAM_CONNECT_TIMEOUT', default=3.05, cast=float)
+UPSTREAM_READ_TIMEOUT = config('UPSTREAM_READ_TIMEOUT', default=10, cast=float)
+UPSTREAM_MAX_RETRIES = config('UPSTREAM_MAX_RETRIES', default=2, cast=int)
+UPSTREAM_BACKOFF_FACTOR = config('UPSTREAM_BACKOFF_FACTOR', default=0.5, cast=float)
+UPSTREAM_BACKOFF_JITTER = config('UPSTREAM_BACKOFF_JITTER', default=0.5, cast=float)
+# Longest wait between retries, also caps Retry-After: a request-path fetch
+# must finish well within the 15s price refresh lock.
+UPSTREAM_BACKOFF_MAX = config('UPSTREAM_BACKOFF_MAX', default=2, cast=float)
+
+# Background price refresher (manage.py refresh_prices)
+# Keep the interval below the 300s price cache soft TTL so held coins never go stale.
+PRICE_REFRESH_INTERVAL = config('PRICE_REFRESH_INTERVAL', default=60, cast=int)
+# CoinGecko demo keys allow ~30 calls/minute; leave headroom for request-path misses.
+PRICE_REFRESH_MAX_CALLS_PER_MINUTE = config('PRICE_REFRESH_MAX_CALLS_PER_MINUTE', default=20, cast=int)
+
+# Spacing (seconds) of portfolio valuation snapshots (manage.py snapshot_portfolios)
+SNAPSHOT_INTERVAL = config('SNAPSHOT_INTERVAL', default=3600, cast=int)
+
+# Currencies portfolios can be valued in. Prices are fetched in USD and
+# converted locally with FX rates derived from one upstream call.
+SUPPORTED_CURRENCIES = [
+    currency.strip().lower()
+    for currency in config('SUPPORTED_CURRENCIES', default='usd,eur,gbp,kes').split(',') if currency.strip()
+]
+
+# How long (seconds) a cached list/retrieve response may be served.
+# Writes invalidate earlier through cache generations.
+RESPONSE_CACHE_TIMEOUT = config('RESPONSE_CACHE_TIMEOUT', default=300, cast=int)
+
+# Soft-deleted portfolios older than this many days are removed for good
+# by manage.py purge_portfolios
+PORTFOLIO_PURGE_AFTER_DAYS = config('PORTFOLIO_PURGE_AFTER_DAYS', default=30, cast=int)
+
+# Width (seconds) of the OHLC buckets kept in the local price history
+PRICE_HISTORY_BUCKET = config('PRICE_HISTORY_BUCKET', default=300, cast=int)
+
+# How long (seconds) a signed price quote stays valid for placing a transaction
+PRICE_QUOTE_MAX_AGE = config('PRICE_QUOTE_MAX_AGE', default=30, cast=int)
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import CustomUser, UserProfile, Portfolio, Asset, Transaction
+from .models import CustomUser, UserProfile, Portfolio, Asset, Transaction, ImportJob
 
 # Register your models here.
 @admin.register(CustomUser)
@@ -17,17 +17,32 @@ class UserProfileAdmin(admin.ModelAdmin):
 @admin.register(Portfolio)
 class PortfolioAdmin(admin.ModelAdmin):
     list_display = ('name', 'owner', 'created_at')
+    list_select_related = ('owner',)  # used by __str__ of the listed relations
     search_fields = ('name', 'owner__username')
+    list_filter = ('active',)
     ordering = ('-created_at',)
 
+    # Show soft-deleted portfolios too
+    def get_queryset(self, request):
+        return Portfolio.all_objects.order_by(*self.get_ordering(request))
+
 @admin.register(Asset)
 class AssetAdmin(admin.ModelAdmin):
     list_display = ('coin_id', 'portfolio', 'quantity', 'average_buy_price', 'created_at', 'update_at')
+    list_select_related = ('portfolio__owner',)
     search_fields = ('coin_id', 'portfolio__name')
     ordering = ('-created_at', '-update_at')
 
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
     list_display = ('transaction_type', 'asset', 'quantity', 'price_per_unit', 'total_value', 'transaction_date')
+    list_select_related = ('asset__portfolio',)
     search_fields = ('transaction_type', 'asset__coin_id')
-    ordering = ('-transaction_date',)   
\ No newline at end of file
+    ordering = ('-transaction_date',)
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ('source_name', 'portfolio', 'rows_imported', 'completed_at', 'update_at')
+    list_select_related = ('portfolio__owner',)
+    search_fields = ('source_name', 'portfolio__name')
+    ordering = ('-update_at',)
@@ -0,0 +1,133 @@
+import asyncio
+from decimal import Decimal
+from asgiref.sync import sync_to_async
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework import status
+from .models import Asset, Portfolio
+from .pagination import AssetCursorPagination
+from .renderers import EventStreamRenderer
+from .serializers import AssetSerializer
+from .views import get_request_currency
+from portfolio.services.coingecko import aget_coin_prices
+from portfolio.services.fx import FX_BASE_CURRENCY, UnsupportedCurrency, fx_rate
+from portfolio.services.price_stream import PortfolioStream
+from portfolio.services.summary import abuild_portfolio_summary
+
+
+# Async read endpoints, for the ASGI entry point (see README, "Async endpoints").
+# A request waiting on CoinGecko holds no thread, so one process keeps
+# hundreds of them in flight. Under WSGI they still work, each request
+# in an event loop of its own.
+
+
+# Async counterpart of views.get_valuation.
+# The FX rate may need an upstream call, so it runs in a worker thread.
+async def aget_valuation(request):
+    currency = await sync_to_async(get_request_currency)(request)
+    try:
+        rate, stale = await sync_to_async(fx_rate, thread_sensitive=False)(currency)
+    except UnsupportedCurrency:
+        return FX_BASE_CURRENCY, Decimal("1"), True
+    return currency, rate, stale
+
+
+class AsyncAPIView(APIView):
+    """
+    APIView whose handlers are coroutines.
+    Authentication, permission and throttle checks are the regular DRF
+    ones (they may query the database), run through `sync_to_async`.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        # Same steps as APIView.dispatch
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            # OPTIONS and 405 are answered by the sync APIView handlers
+            if asyncio.iscoroutine(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+# Same payload as PortfolioViewSet.summary
+class AsyncPortfolioSummaryView(AsyncAPIView):
+    permission_classes = [IsAuthenticated]
+
+    async def get(self, request, pk):
+        try:
+            portfolio = await Portfolio.objects.select_related('aggregate').aget(pk=pk, owner=request.user)
+        except Portfolio.DoesNotExist:
+            raise NotFound("No Portfolio matches the given query.")
+        currency, _, _ = await aget_valuation(request)
+        summary, stale = await abuild_portfolio_summary(portfolio, currency=currency)
+        response = Response(summary, status=status.HTTP_200_OK)
+        response["X-Price-Freshness"] = "stale" if stale else "fresh"
+        return response
+
+
+# Same pages as AssetViewSet.list
+class AsyncAssetListView(AsyncAPIView):
+    permission_classes = [IsAuthenticated]
+    pagination_class = AssetCursorPagination
+
+    async def get(self, request, portfolio_pk):
+        queryset = Asset.objects.filter(
+            portfolio__id=portfolio_pk,
+            portfolio__owner=request.user,
+            portfolio__active=True
+        )
+        paginator = self.pagination_class()
+        # DRF pagination is sync, it runs the page query in the sync thread
+        assets = await sync_to_async(paginator.paginate_queryset)(queryset, request, view=self)
+        currency, rate, fx_stale = await aget_valuation(request)
+        price_response = await aget_coin_prices({asset.coin_id for asset in assets}, currency=FX_BASE_CURRENCY)
+
+        serializer = AssetSerializer(assets, many=True, context={
+            "request": request,
+            "view": self,
+            "format": self.format_kwarg,
+            "currency": currency,
+            "fx_rate": rate,
+            "prices": price_response["prices"],
+        })
+        response = paginator.get_paginated_response(serializer.data)
+        response["X-Price-Freshness"] = "stale" if price_response["stale"] or fx_stale else "fresh"
+        return response
+
+
+# Live value and P/L of a portfolio's positions as server-sent events.
+# Only useful under ASGI: the stream never ends, an idle one holds no thread.
+class PortfolioStreamView(AsyncAPIView):
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+
+    async def get(self, request, pk):
+        if not await Portfolio.objects.filter(pk=pk, owner=request.user).aexists():
+            raise NotFound("No Portfolio matches the given query.")
+        currency, _, _ = await aget_valuation(request)
+        stream = PortfolioStream(int(pk), currency)
+        await stream.load()
+        response = StreamingHttpResponse(stream.events(), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        # Keep reverse proxies from buffering the events
+        response["X-Accel-Buffering"] = "no"
+        return response
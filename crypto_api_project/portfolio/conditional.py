@@ -0,0 +1,50 @@
+import hashlib
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+# Conditional GET for list endpoints that clients poll.
+# Validators come from `list_validators(queryset)`, a cheap lookup over
+# the list's queryset, so an unchanged list answers 304 Not Modified
+# without serializing anything. Views that don't override it are served
+# as plain lists.
+class ConditionalListMixin:
+    list_etag = None
+    list_last_modified = None
+
+    def list_validators(self, queryset):
+        """
+        Return (list of version parts, last modified datetime or None),
+        or None for a list without validators.
+        """
+        return None
+
+    def not_modified_response(self, queryset):
+        validators = self.list_validators(queryset)
+        if validators is None:
+            return None
+        parts, last_modified = validators
+        # Other pages, filters or users are other representations
+        key = "|".join(str(part) for part in (self.request.user.pk, self.request.get_full_path(), *parts))
+        self.list_etag = quote_etag(hashlib.sha256(key.encode()).hexdigest()[:32])
+        self.list_last_modified = int(last_modified.timestamp()) if last_modified else None
+        return get_conditional_response(
+            self.request, etag=self.list_etag, last_modified=self.list_last_modified
+        )
+
+    def with_validators(self, response):
+        if self.list_etag is None:
+            return response
+        if response.status_code in (200, 304):
+            response["ETag"] = self.list_etag
+            if self.list_last_modified is not None:
+                response["Last-Modified"] = http_date(self.list_last_modified)
+        # Clients may keep the list but must revalidate it, shared caches must not store it
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        not_modified = self.not_modified_response(self.filter_queryset(self.get_queryset()))
+        if not_modified is not None:
+            return self.with_validators(not_modified)
+        return self.with_validators(super().list(request, *args, **kwargs))
@@ -0,0 +1,39 @@
+import logging
+
+from django.core.management.base import BaseCommand
+from portfolio.models import Asset
+from portfolio.services.price_history import backfill_price_history
+
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        'Load historical prices from CoinGecko market_chart into the local price history. '
+        'Backfills every coin held in an active portfolio unless coin ids are given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('coin_ids', nargs='*', help='CoinGecko coin ids to backfill.')
+        parser.add_argument('--days', type=int, default=30, help='How many days back to load.')
+        parser.add_argument('--currency', default='usd', help='Currency of the prices.')
+
+    def handle(self, *args, **options):
+        coin_ids = options['coin_ids'] or sorted({
+            coin_id.lower() for coin_id in
+            Asset.objects.filter(portfolio__active=True).values_list('coin_id', flat=True).distinct()
+        })
+        failed = 0
+        # market_chart takes one coin per call
+        for coin_id in coin_ids:
+            result = backfill_price_history(coin_id, options['currency'], days=max(options['days'], 1))
+            if result['success']:
+                self.stdout.write(f'{coin_id}: {result["buckets"]} buckets')
+            else:
+                failed += 1
+                logger.warning("PRICE_BACKFILL_ERROR - Coin: %s, %s", coin_id, result['message'])
+                self.stderr.write(f'{coin_id}: {result["message"]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Backfilled {len(coin_ids) - failed} of {len(coin_ids)} coins.'
+        ))
@@ -0,0 +1,218 @@
+import statistics
+import time
+import tracemalloc
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+from portfolio.models import Asset, LotDisposal, Portfolio, PortfolioAggregate, TaxLot, Transaction
+from portfolio.services.aggregates import verify_aggregate
+from portfolio.services.export import stream_csv
+from portfolio.services.lots import LOT_FETCH_SIZE, LOT_ORDERING, realized_gains
+from portfolio.views import PortfolioViewSet, transaction_list_validators
+
+
+BENCH_USERNAME = "benchmark_user"
+BENCH_COINS = ["bitcoin", "ethereum", "solana", "cardano", "ripple",
+               "dogecoin", "polkadot", "litecoin", "chainlink", "stellar"]
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a benchmark portfolio and time the main API query paths. '
+        'Run it before and after applying a migration to compare plans and latency, e.g. '
+        '"manage.py migrate portfolio 0012" then "manage.py migrate portfolio 0013".'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Create this many benchmark transactions before measuring.')
+        parser.add_argument('--repeat', type=int, default=20, help='Runs per query.')
+        parser.add_argument('--explain', action='store_true', help='Print the query plan of each query.')
+        parser.add_argument('--export', action='store_true',
+                            help='Also measure streaming CSV export throughput of the whole portfolio.')
+        parser.add_argument('--cleanup', action='store_true', help='Delete the benchmark data and exit.')
+
+    def handle(self, *args, **options):
+        if options['cleanup']:
+            self.cleanup()
+            return
+        if options['seed']:
+            self.seed(options['seed'])
+
+        user = get_user_model().objects.filter(username=BENCH_USERNAME).first()
+        if user is None:
+            raise CommandError('No benchmark data, run with --seed N first.')
+        portfolio = Portfolio.objects.filter(owner=user).first()
+        asset = Asset.objects.filter(portfolio=portfolio).first()
+        self.stdout.write(
+            f'{Transaction.objects.filter(asset__portfolio=portfolio).count()} transactions '
+            f'on {connection.vendor}'
+        )
+
+        for name, queryset in self.scenarios(user, portfolio, asset):
+            self.measure(name, queryset, options['repeat'], options['explain'])
+        self.measure_call("realized gains report", lambda: realized_gains(portfolio), options['repeat'])
+        # Conditional GET validators, what a 304 revalidation costs
+        portfolio_history = Transaction.objects.filter(
+            asset__portfolio__id=portfolio.id, asset__portfolio__owner=user
+        ).order_by('-transaction_date', '-id')
+        self.measure_call("portfolio transactions ETag validators",
+                          lambda: transaction_list_validators(portfolio_history), options['repeat'])
+        asset_history = Transaction.objects.filter(
+            asset_id=asset.id, asset__portfolio__owner=user
+        ).order_by('-transaction_date', '-id')
+        self.measure_call("asset transactions ETag validators",
+                          lambda: transaction_list_validators(asset_history), options['repeat'])
+        # Transactions affected by a portfolio delete: the old count over the
+        # history, the aggregate row, and the whole destroy request
+        self.measure_call("portfolio delete, transaction count over history",
+                          lambda: Transaction.objects.filter(asset__portfolio=portfolio).count(), options['repeat'])
+        self.measure_call("portfolio delete, transaction count from aggregate",
+                          lambda: PortfolioAggregate.objects.get(portfolio=portfolio).transaction_count,
+                          options['repeat'])
+        self.measure_call("portfolio delete request (rolled back)",
+                          lambda: self.delete_portfolio(user, portfolio), options['repeat'])
+        if options['export']:
+            self.measure_export(user, portfolio)
+
+    # Query paths mirroring the viewsets' get_queryset + pagination
+    def scenarios(self, user, portfolio, asset):
+        history = Transaction.objects.filter(
+            asset_id=asset.id, asset__portfolio__owner=user
+        ).order_by('-transaction_date', '-id')
+        # Row ~90% deep into the asset history, where a cursor page would start
+        depth = history.count() * 9 // 10
+        pivot = history.values('transaction_date')[depth:depth + 1].first() or {'transaction_date': timezone.now()}
+        return [
+            # CursorPagination seeks on the first ordering field (the id
+            # tie-breaker only settles rows sharing that timestamp)
+            ("asset transactions, deep cursor page",
+             history.filter(transaction_date__lt=pivot['transaction_date'])[:10]),
+            ("asset transactions, deep offset page",
+             history[depth:depth + 10]),
+            ("asset transactions, first page",
+             Transaction.objects.filter(asset_id=asset.id, asset__portfolio__owner=user)
+             .order_by('-transaction_date', '-id')[:10]),
+            ("portfolio transactions, first page",
+             Transaction.objects.filter(asset__portfolio__id=portfolio.id, asset__portfolio__owner=user)
+             .order_by('-transaction_date', '-id')[:10]),
+            ("portfolio assets, first page",
+             Asset.objects.filter(portfolio__owner=user, portfolio__id=portfolio.id).order_by('id')[:10]),
+            ("active portfolios of user",
+             Portfolio.objects.filter(owner=user, active=True)),
+        ] + [
+            # First chunk of open lots a SELL is matched against
+            (f"open lots, {method} match",
+             TaxLot.objects.filter(asset=asset, remaining_quantity__gt=0).order_by(*ordering)[:LOT_FETCH_SIZE])
+            for method, ordering in LOT_ORDERING.items()
+        ]
+
+    def measure(self, name, queryset, repeat, explain):
+        timings = []
+        for _ in range(max(repeat, 1)):
+            start = time.perf_counter()
+            list(queryset.all())
+            timings.append((time.perf_counter() - start) * 1000)
+        self.stdout.write(self.style.SUCCESS(
+            f'{name}: median {statistics.median(timings):.2f}ms, max {max(timings):.2f}ms'
+        ))
+        if explain:
+            self.stdout.write(queryset.explain())
+
+    def measure_call(self, name, func, repeat):
+        timings = []
+        for _ in range(max(repeat, 1)):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        self.stdout.write(self.style.SUCCESS(
+            f'{name}: median {statistics.median(timings):.2f}ms, max {max(timings):.2f}ms'
+        ))
+
+    # PortfolioViewSet.destroy end to end, rolled back so the portfolio stays
+    def delete_portfolio(self, user, portfolio):
+        request = APIRequestFactory().delete(f'/api/portfolios/{portfolio.id}/')
+        force_authenticate(request, user=user)
+        with transaction.atomic():
+            response = PortfolioViewSet.as_view({'delete': 'destroy'})(request, pk=portfolio.id)
+            transaction.set_rollback(True)
+        if response.status_code != 200:
+            raise CommandError(f'Portfolio delete answered {response.status_code}.')
+
+    def measure_export(self, user, portfolio):
+        queryset = Transaction.objects.filter(
+            asset__portfolio__id=portfolio.id, asset__portfolio__owner=user
+        ).order_by('-transaction_date', '-id')
+        start = time.perf_counter()
+        rows, size = -1, 0  # header line is not a row
+        for line in stream_csv(queryset):
+            rows += 1
+            size += len(line)
+        elapsed = time.perf_counter() - start
+
+        # Second pass under tracemalloc (too slow to time) to check memory stays flat
+        tracemalloc.start()
+        for _ in stream_csv(queryset):
+            pass
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.stdout.write(self.style.SUCCESS(
+            f'csv export: {rows} rows, {size / 1e6:.1f}MB in {elapsed:.2f}s '
+            f'({rows / elapsed:.0f} rows/s), peak Python memory {peak / 1e6:.1f}MB'
+        ))
+
+    def seed(self, count, batch_size=10000):
+        user, _ = get_user_model().objects.get_or_create(
+            username=BENCH_USERNAME, defaults={"email": "benchmark@example.com"}
+        )
+        portfolio, _ = Portfolio.objects.get_or_create(owner=user, name="Benchmark Portfolio")
+        assets = [
+            Asset.objects.get_or_create(portfolio=portfolio, coin_id=coin_id)[0]
+            for coin_id in BENCH_COINS
+        ]
+        created = 0
+        while created < count:
+            size = min(batch_size, count - created)
+            with transaction.atomic():
+                buys = Transaction.objects.bulk_create([
+                    Transaction(
+                        asset=assets[(created + i) % len(assets)],
+                        transaction_type="BUY",
+                        quantity=Decimal("0.1"),
+                        price_per_unit=Decimal(100 + (created + i) % 50),
+                        total_value=Decimal("10"),
+                    )
+                    for i in range(size)
+                ], batch_size=batch_size)
+                # Every BUY opens a lot; close half of them as if already sold
+                TaxLot.objects.bulk_create([
+                    TaxLot(
+                        asset=buy.asset,
+                        transaction=buy,
+                        acquired_at=buy.transaction_date,
+                        quantity=buy.quantity,
+                        remaining_quantity=buy.quantity if i % 2 else Decimal("0"),
+                        cost_per_unit=buy.price_per_unit,
+                    )
+                    for i, buy in enumerate(buys)
+                ], batch_size=batch_size)
+            created += size
+            self.stdout.write(f'Seeded {created}/{count} transactions')
+        # Seeding bypasses the API writers, bring the portfolio totals in line
+        verify_aggregate(portfolio.id)
+
+    def cleanup(self):
+        user = get_user_model().objects.filter(username=BENCH_USERNAME).first()
+        if user is None:
+            return
+        with transaction.atomic():
+            LotDisposal.objects.filter(asset__portfolio__owner=user).delete()
+            TaxLot.objects.filter(asset__portfolio__owner=user).delete()
+            Transaction.objects.filter(asset__portfolio__owner=user).delete()
+            Asset.objects.filter(portfolio__owner=user).delete()
+            user.delete()
+        self.stdout.write(self.style.SUCCESS('Benchmark data deleted.'))
@@ -0,0 +1,108 @@
+import asyncio
+import random
+import statistics
+import threading
+import time
+import tracemalloc
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from portfolio.services.generations import portfolio_generation
+from portfolio.services.price_feed import FEED_CURRENCY, get_broadcaster
+from portfolio.services.price_stream import PortfolioStream
+
+
+BENCH_COINS = ["bitcoin", "ethereum", "solana", "cardano", "ripple",
+               "dogecoin", "polkadot", "litecoin", "chainlink", "stellar"]
+# Fake portfolio ids, far from real ones
+BENCH_PORTFOLIO_OFFSET = 10 ** 9
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test the live price streams of one worker: open N idle portfolio streams '
+        'on the in-process broadcaster, drive them with a local fake price feed and '
+        'report memory per subscriber and fan-out latency. Needs no database or CoinGecko.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, default=5000, help='Streams to open.')
+        parser.add_argument('--coins', type=int, default=3, help='Coins held per streamed portfolio.')
+        parser.add_argument('--ticks', type=int, default=10, help='Price updates sent by the fake feed.')
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Seconds between price updates (CoinGecko prices refresh every PRICE_REFRESH_INTERVAL).')
+
+    def handle(self, *args, **options):
+        asyncio.run(self.run(options['subscribers'], options['coins'], options['ticks'], options['interval']))
+
+    def make_stream(self, number, coins):
+        portfolio_id = BENCH_PORTFOLIO_OFFSET + number
+        stream = PortfolioStream(portfolio_id, FEED_CURRENCY)
+        # What load() would read, without the database
+        stream.generation = portfolio_generation(portfolio_id)
+        held = random.sample(BENCH_COINS, min(coins, len(BENCH_COINS)))
+        stream.positions = {
+            coin_id: {'coin_id': coin_id, 'total_quantity': Decimal("1.5"), 'cost_basis': Decimal("1000")}
+            for coin_id in held
+        }
+        return stream
+
+    async def consume(self, stream, sent_at, latencies):
+        events = stream.events()
+        try:
+            await anext(events)  # snapshot
+            async for event in events:
+                if event.startswith("event: prices"):
+                    latencies.append(time.perf_counter() - sent_at[-1])
+        finally:
+            await events.aclose()
+
+    # Random walk of every coin's price, published from another thread
+    # like the Redis listener or a refresh in a sync view would
+    def feed(self, broadcaster, ticks, interval, sent_at):
+        prices = {coin_id: 100.0 for coin_id in BENCH_COINS}
+        for _ in range(ticks):
+            for coin_id in prices:
+                prices[coin_id] = round(prices[coin_id] * random.uniform(0.99, 1.01), 6)
+            sent_at.append(time.perf_counter())
+            broadcaster.publish_threadsafe({"currency": FEED_CURRENCY, "prices": dict(prices)})
+            time.sleep(interval)
+
+    async def run(self, subscribers, coins, ticks, interval):
+        broadcaster = get_broadcaster()
+        sent_at = [time.perf_counter()]
+        latencies = []
+
+        # Streams are created before measuring, the Decimal and cache setup is not the idle cost
+        streams = [self.make_stream(number, coins) for number in range(subscribers)]
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        tasks = [asyncio.create_task(self.consume(stream, sent_at, latencies)) for stream in streams]
+        while len(broadcaster.subscriptions) < subscribers:
+            await asyncio.sleep(0.01)
+        idle_bytes = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+
+        started = time.perf_counter()
+        feeder = threading.Thread(target=self.feed, args=(broadcaster, ticks, interval, sent_at))
+        feeder.start()
+        await asyncio.to_thread(feeder.join)
+        # Let the last tick drain
+        await asyncio.sleep(min(interval, 1))
+        elapsed = time.perf_counter() - started
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        self.stdout.write(f'{subscribers} subscribers, {coins} coins each, {ticks} ticks in {elapsed:.2f}s')
+        self.stdout.write(f'  idle memory: {idle_bytes / subscribers / 1024:.1f} KiB per subscriber '
+                          f'({idle_bytes / 2 ** 20:.1f} MiB total)')
+        if latencies:
+            latencies.sort()
+            self.stdout.write(
+                f'  {len(latencies)} events, latency median {statistics.median(latencies) * 1000:.1f}ms, '
+                f'p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f}ms, '
+                f'max {latencies[-1] * 1000:.1f}ms'
+            )
+        self.stdout.write(f'  subscriptions left: {len(broadcaster.subscriptions)}')
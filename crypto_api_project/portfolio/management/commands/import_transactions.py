@@ -0,0 +1,173 @@
+import csv
+import hashlib
+import json
+import os
+import time
+from collections import Counter
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from portfolio.models import Asset, ImportJob, Portfolio, Transaction
+from portfolio.services.lots import LotLedger
+from portfolio.services.trades import InsufficientBalance, apply_trade
+from portfolio.services.aggregates import asset_contribution, portfolio_aggregate, record_asset_change
+
+
+class Command(BaseCommand):
+    help = (
+        'Import historical trades from a CSV or NDJSON file into a portfolio. '
+        'Rows need coin_id, transaction_type (BUY/SELL), quantity and price_per_unit, '
+        'optionally transaction_date (ISO 8601), and must be in chronological order. '
+        'Interrupted imports of the same file resume where they stopped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV (with header) or NDJSON file.')
+        parser.add_argument('--portfolio', type=int, required=True, help='Target portfolio ID.')
+        parser.add_argument('--format', choices=['csv', 'ndjson'],
+                            help='File format, guessed from the extension by default.')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Rows written per database transaction.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.isfile(path):
+            raise CommandError(f'File "{path}" does not exist.')
+        try:
+            portfolio = Portfolio.objects.get(id=options['portfolio'], active=True)
+        except Portfolio.DoesNotExist:
+            raise CommandError(f'Portfolio {options["portfolio"]} does not exist.')
+        file_format = options['format'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+        batch_size = max(options['batch_size'], 1)
+
+        job, _ = ImportJob.objects.get_or_create(
+            portfolio=portfolio, checksum=self.file_checksum(path),
+            defaults={"source_name": os.path.basename(path)},
+        )
+        if job.completed_at:
+            self.stdout.write(self.style.WARNING(f'{path} was already imported into this portfolio.'))
+            return
+        if job.rows_imported:
+            self.stdout.write(f'Resuming after row {job.rows_imported}.')
+
+        started = time.monotonic()
+        imported = 0
+        with open(path, newline='', encoding='utf-8') as source:
+            rows = self.read_rows(source, file_format)
+            # Skip what an earlier run already committed
+            rows = islice(rows, job.rows_imported, None)
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                self.import_batch(portfolio, job, batch)
+                imported += len(batch)
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'Imported {job.rows_imported} rows ({imported / max(elapsed, 1e-9):.0f} rows/s)'
+                )
+
+        job.completed_at = timezone.now()
+        job.save(update_fields=['completed_at', 'update_at'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Import finished: {job.rows_imported} rows into portfolio {portfolio.id}.'
+        ))
+
+    def file_checksum(self, path):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as source:
+            for block in iter(lambda: source.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def read_rows(self, source, file_format):
+        """Yield (line number, row dict) without loading the file."""
+        if file_format == 'csv':
+            reader = csv.DictReader(source)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_number, line in enumerate(source, start=1):
+                if line.strip():
+                    try:
+                        yield line_number, json.loads(line)
+                    except ValueError:
+                        raise CommandError(f'Line {line_number}: invalid JSON.')
+
+    def parse_row(self, line_number, row):
+        try:
+            coin_id = (row.get('coin_id') or '').strip()
+            transaction_type = (row.get('transaction_type') or '').strip().upper()
+            quantity = Decimal(str(row['quantity']))
+            price_per_unit = Decimal(str(row['price_per_unit']))
+        except (KeyError, InvalidOperation):
+            raise CommandError(f'Line {line_number}: quantity and price_per_unit must be numbers.')
+        if not coin_id or transaction_type not in ('BUY', 'SELL'):
+            raise CommandError(f'Line {line_number}: coin_id and a BUY/SELL transaction_type are required.')
+        if quantity <= 0 or price_per_unit <= 0:
+            raise CommandError(f'Line {line_number}: quantity and price_per_unit must be greater than zero.')
+
+        transaction_date = timezone.now()
+        if row.get('transaction_date'):
+            transaction_date = parse_datetime(str(row['transaction_date']))
+            if transaction_date is None:
+                raise CommandError(f'Line {line_number}: invalid transaction_date.')
+            if timezone.is_naive(transaction_date):
+                transaction_date = timezone.make_aware(transaction_date)
+        return coin_id, transaction_type, quantity, price_per_unit, transaction_date
+
+    @transaction.atomic
+    def import_batch(self, portfolio, job, batch):
+        parsed = [self.parse_row(line_number, row) for line_number, row in batch]
+
+        # Lock the batch's assets so API trades can't interleave with the replay
+        assets = {}
+        for asset in Asset.objects.select_for_update().filter(
+            portfolio=portfolio, coin_id__in={row[0] for row in parsed}
+        ).order_by('id'):
+            assets.setdefault(asset.coin_id, asset)
+        # Contributions to the portfolio totals before the batch (None for new assets).
+        # The totals row must exist before the writes, or the first asset's
+        # change would create it from rows that already hold the whole batch.
+        before = {asset.id: asset_contribution(asset) for asset in assets.values()}
+        portfolio_aggregate(portfolio)
+        # Ledgers see the holdings from before the batch
+        ledgers = {asset.id: LotLedger(asset, method=portfolio.lot_method) for asset in assets.values()}
+
+        new_transactions = []
+        for (line_number, _), (coin_id, transaction_type, quantity, price, date) in zip(batch, parsed):
+            asset = assets.get(coin_id)
+            if asset is None:
+                asset = assets[coin_id] = Asset.objects.create(portfolio=portfolio, coin_id=coin_id)
+                ledgers[asset.id] = LotLedger(asset, method=portfolio.lot_method)
+            try:
+                total_value = apply_trade(asset, transaction_type, quantity, price)
+            except InsufficientBalance:
+                raise CommandError(f'Line {line_number}: SELL of {quantity} {coin_id} exceeds the held quantity.')
+            new_transactions.append(Transaction(
+                asset=asset,
+                transaction_type=transaction_type,
+                quantity=quantity,
+                price_per_unit=price,
+                total_value=total_value,
+                transaction_date=date,
+            ))
+
+        Transaction.objects.bulk_create(new_transactions, batch_size=1000)
+        for txn in new_transactions:
+            ledgers[txn.asset_id].record(txn)
+        for ledger in ledgers.values():
+            ledger.flush()
+        for asset in assets.values():
+            asset.save(update_fields=['quantity', 'average_buy_price', 'realized_profit_loss', 'update_at'])
+        imported = Counter(txn.asset_id for txn in new_transactions)
+        for asset in assets.values():
+            record_asset_change(portfolio.id, before.get(asset.id), asset_contribution(asset),
+                                assets=0 if asset.id in before else 1, transactions=imported[asset.id])
+        # Checkpoint commits with the batch
+        job.rows_imported += len(batch)
+        job.save(update_fields=['rows_imported', 'update_at'])
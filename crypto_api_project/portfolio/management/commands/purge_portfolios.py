@@ -0,0 +1,45 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from portfolio.services.purge import PURGE_BATCH_SIZE, purge_portfolio, purgeable_portfolios
+
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        'Remove soft-deleted portfolios for good, with their assets and transactions, '
+        'once they have been deleted for PORTFOLIO_PURGE_AFTER_DAYS. Rows are deleted in '
+        'batches; run it from cron (or a scheduler) outside the request path.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=settings.PORTFOLIO_PURGE_AFTER_DAYS,
+                            help='Only purge portfolios deleted at least this many days ago.')
+        parser.add_argument('--batch-size', type=int, default=PURGE_BATCH_SIZE,
+                            help='Transactions removed per delete statement.')
+        parser.add_argument('--limit', type=int, default=None,
+                            help='Purge at most this many portfolios in this run.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        deleted_before = timezone.now() - timedelta(days=options['older_than_days'])
+        portfolio_ids = list(purgeable_portfolios(deleted_before)[:options['limit']])
+
+        transactions = 0
+        for portfolio_id in portfolio_ids:
+            removed = purge_portfolio(portfolio_id, batch_size=options['batch_size'])
+            transactions += removed
+            logger.info("PORTFOLIO_PURGED - Portfolio ID: %s, Transactions: %d", portfolio_id, removed)
+        logger.info(
+            "PORTFOLIO_PURGE - Portfolios: %d, Transactions: %d, Duration: %.2fs",
+            len(portfolio_ids), transactions, time.monotonic() - started
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Purged {len(portfolio_ids)} portfolios, {transactions} transactions.'
+        ))
@@ -0,0 +1,47 @@
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+from portfolio.models import Portfolio
+from portfolio.services.aggregates import verify_aggregate
+
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        'Verify every portfolio aggregate against the assets and transactions it sums up, '
+        'and repair drift (e.g. rows edited in the admin) and missing aggregates. '
+        'With --check nothing is written and drift makes the command fail.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--portfolio', type=int, default=None, help='Only this portfolio ID.')
+        parser.add_argument('--check', action='store_true', help='Report drift without repairing it.')
+
+    def handle(self, *args, **options):
+        # Soft-deleted portfolios too, they can be restored
+        portfolios = Portfolio.all_objects.order_by('id').values_list('id', flat=True)
+        if options['portfolio']:
+            portfolios = portfolios.filter(id=options['portfolio'])
+
+        checked = drifted = 0
+        for portfolio_id in portfolios.iterator():
+            drift = verify_aggregate(portfolio_id, repair=not options['check'])
+            checked += 1
+            if not drift:
+                continue
+            drifted += 1
+            for field, (stored, actual) in drift.items():
+                logger.warning(
+                    "AGGREGATE_DRIFT - Portfolio ID: %s, Field: %s, Stored: %s, Actual: %s",
+                    portfolio_id, field, stored, actual
+                )
+                self.stdout.write(f'Portfolio {portfolio_id}: {field} is {stored}, should be {actual}')
+
+        if options['check'] and drifted:
+            raise CommandError(f'{drifted} of {checked} portfolio aggregates drifted.')
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {checked} portfolio aggregates, '
+            f'{"found" if options["check"] else "repaired"} {drifted} drifted.'
+        ))
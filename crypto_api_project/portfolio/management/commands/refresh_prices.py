@@ -0,0 +1,155 @@
+import logging
+import math
+import signal
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from portfolio.models import Asset
+from portfolio.services.coingecko import chunk_coin_ids, refresh_coin_prices
+from portfolio.services.price_history import record_prices
+
+
+logger = logging.getLogger(__name__)
+
+# Cache key holding stats of the last refresh cycle (for dashboards/health checks)
+REFRESHER_STATS_KEY = "price_refresher_stats"
+# Only one refresher instance may run a cycle at a time
+REFRESHER_CYCLE_LOCK_KEY = "price_refresher_cycle_lock"
+# Slack on top of the slowest chunk for the database work around it (seconds)
+REFRESHER_CYCLE_LOCK_MARGIN = 30
+
+
+class Command(BaseCommand):
+    help = 'Keep cached prices of held coins warm by refreshing them in batches on a schedule'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=int, default=settings.PRICE_REFRESH_INTERVAL,
+            help='Seconds between refresh cycles.'
+        )
+        parser.add_argument(
+            '--max-calls-per-minute', type=int, default=settings.PRICE_REFRESH_MAX_CALLS_PER_MINUTE,
+            help='Upstream call budget for the refresher.'
+        )
+        parser.add_argument('--currency', default='usd', help='Currency to refresh prices in.')
+        parser.add_argument('--once', action='store_true', help='Run a single cycle and exit.')
+
+    def handle(self, *args, **options):
+        self.stop_event = threading.Event()
+        previous_handlers = self.install_signal_handlers()
+        interval = max(options['interval'], 1)
+        # Minimum spacing between two upstream calls to stay within budget
+        self.call_spacing = 60 / max(options['max_calls_per_minute'], 1)
+        self.last_call_at = 0.0
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Price refresher started (interval {interval}s, '
+            f'{options["max_calls_per_minute"]} calls/minute).'
+        ))
+        while not self.stop_event.is_set():
+            cycle_started = time.monotonic()
+            # Released after the cycle and extended after every chunk, so the
+            # timeout only frees it if this process dies or hangs mid-cycle
+            self.lock_token = uuid.uuid4().hex
+            if cache.add(REFRESHER_CYCLE_LOCK_KEY, self.lock_token, timeout=self.cycle_lock_timeout()):
+                try:
+                    self.run_cycle(options['currency'])
+                except Exception:
+                    logger.exception("PRICE_REFRESH_FAILED")
+                finally:
+                    self.release_cycle_lock()
+            else:
+                logger.info("PRICE_REFRESH_SKIPPED - Another refresher holds the cycle lock.")
+            if options['once']:
+                break
+            # Sleep until the next cycle, waking up early on shutdown
+            self.stop_event.wait(max(interval - (time.monotonic() - cycle_started), 0))
+        for signum, handler in previous_handlers.items():
+            signal.signal(signum, handler)
+        self.stdout.write(self.style.SUCCESS('Price refresher stopped.'))
+
+    def install_signal_handlers(self):
+        def request_stop(signum, frame):
+            logger.info("PRICE_REFRESH_STOPPING - Signal: %s", signum)
+            self.stop_event.set()
+
+        return {
+            signum: signal.signal(signum, request_stop)
+            for signum in (signal.SIGINT, signal.SIGTERM)
+        }
+
+    def cycle_lock_timeout(self):
+        # Longest one chunk may take: the throttle wait, then an upstream
+        # call whose every attempt times out, with the backoff in between
+        attempts = settings.UPSTREAM_MAX_RETRIES + 1
+        upstream = (attempts * (settings.UPSTREAM_CONNECT_TIMEOUT + settings.UPSTREAM_READ_TIMEOUT)
+                    + settings.UPSTREAM_MAX_RETRIES * settings.UPSTREAM_BACKOFF_MAX)
+        return math.ceil(self.call_spacing + upstream) + REFRESHER_CYCLE_LOCK_MARGIN
+
+    def extend_cycle_lock(self):
+        # False if the lock expired and another refresher took it over
+        if cache.get(REFRESHER_CYCLE_LOCK_KEY) != self.lock_token:
+            return False
+        cache.touch(REFRESHER_CYCLE_LOCK_KEY, self.cycle_lock_timeout())
+        return True
+
+    def release_cycle_lock(self):
+        # Only while it is still ours, never another refresher's
+        if cache.get(REFRESHER_CYCLE_LOCK_KEY) == self.lock_token:
+            cache.delete(REFRESHER_CYCLE_LOCK_KEY)
+
+    def throttle(self):
+        # Wait out the call spacing, unless we are shutting down
+        wait = self.last_call_at + self.call_spacing - time.monotonic()
+        if wait > 0:
+            self.stop_event.wait(wait)
+        self.last_call_at = time.monotonic()
+
+    def run_cycle(self, currency):
+        started_at = time.time()
+        coin_ids = sorted({
+            coin_id.lower() for coin_id in
+            Asset.objects.filter(portfolio__active=True).values_list('coin_id', flat=True).distinct()
+        })
+        previous = cache.get(REFRESHER_STATS_KEY) or {}
+        refreshed, failed, calls = 0, 0, 0
+
+        for chunk in chunk_coin_ids(coin_ids):
+            if self.stop_event.is_set():
+                break
+            self.throttle()
+            result = refresh_coin_prices(chunk, currency=currency)
+            calls += 1
+            refreshed += result['refreshed']
+            # Every refreshed price also extends the local price history
+            if result['prices']:
+                record_prices(result['prices'], currency=currency)
+            if not result['success']:
+                failed += len(chunk) - result['refreshed']
+                logger.warning("PRICE_REFRESH_ERROR - %s", result['message'])
+            if not self.extend_cycle_lock():
+                logger.warning("PRICE_REFRESH_LOCK_LOST - Another refresher took over the cycle.")
+                break
+
+        finished_at = time.time()
+        stats = {
+            "last_run_at": finished_at,
+            "duration": finished_at - started_at,
+            "coins": len(coin_ids),
+            "refreshed": refreshed,
+            "failed": failed,
+            "upstream_calls": calls,
+            # Age of the prices right before this cycle replaced them
+            "refresh_lag": finished_at - previous["last_run_at"] if previous.get("last_run_at") else None,
+        }
+        cache.set(REFRESHER_STATS_KEY, stats, timeout=None)
+        logger.info(
+            "PRICE_REFRESH - Coins: %d, Refreshed: %d, Failed: %d, Calls: %d, Duration: %.2fs, Lag: %s",
+            stats["coins"], refreshed, failed, calls, stats["duration"],
+            "n/a" if stats["refresh_lag"] is None else f'{stats["refresh_lag"]:.2f}s'
+        )
+        return stats
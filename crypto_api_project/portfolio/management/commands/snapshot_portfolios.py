@@ -0,0 +1,29 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from portfolio.services.snapshots import snapshot_time, take_snapshots
+
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        'Record a valuation snapshot of every active portfolio for the current '
+        'SNAPSHOT_INTERVAL slot. Run it from cron (or a scheduler) once per interval; '
+        'running it again within the same slot fills in values that had no price.'
+    )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        taken_at = snapshot_time(interval=settings.SNAPSHOT_INTERVAL)
+        written, unpriced = take_snapshots(taken_at)
+        if unpriced:
+            logger.warning("SNAPSHOT_UNPRICED - Coins: %s", ", ".join(unpriced))
+        logger.info(
+            "PORTFOLIO_SNAPSHOT - Taken at: %s, Rows: %d, Duration: %.2fs",
+            taken_at.isoformat(), written, time.monotonic() - started
+        )
+        self.stdout.write(self.style.SUCCESS(f'Snapshot {taken_at.isoformat()}: {written} rows.'))
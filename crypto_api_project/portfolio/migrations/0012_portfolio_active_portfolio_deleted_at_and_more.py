@@ -0,0 +1,46 @@
+# Generated by Django 5.2.9 on 2026-10-18 15:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portfolio", "0011_alter_asset_coin_id"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="portfolio",
+            name="active",
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name="portfolio",
+            name="deleted_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="asset",
+            name="portfolio",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="assets",
+                to="portfolio.portfolio",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="transaction",
+            name="asset",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="transactions",
+                to="portfolio.asset",
+            ),
+        ),
+    ]
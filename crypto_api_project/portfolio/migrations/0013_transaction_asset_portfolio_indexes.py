@@ -0,0 +1,25 @@
+# Generated by Django 5.2.9 on 2026-10-18 15:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portfolio", "0012_portfolio_active_portfolio_deleted_at_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="asset",
+            index=models.Index(fields=["portfolio", "id"], name="asset_portfolio_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="portfolio",
+            index=models.Index(fields=["owner", "active"], name="portfolio_owner_active_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(fields=["asset", "-transaction_date", "id"], name="txn_asset_date_idx"),
+        ),
+    ]
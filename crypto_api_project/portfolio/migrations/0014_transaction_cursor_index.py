@@ -0,0 +1,21 @@
+# Generated by Django 5.2.9 on 2026-10-18 15:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portfolio", "0013_transaction_asset_portfolio_indexes"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="transaction",
+            name="txn_asset_date_idx",
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(fields=["asset", "-transaction_date", "-id"], name="txn_asset_date_id_idx"),
+        ),
+    ]
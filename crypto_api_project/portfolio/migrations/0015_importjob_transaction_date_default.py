@@ -0,0 +1,36 @@
+# Generated by Django 5.2.9 on 2026-10-18 15:55
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portfolio", "0014_transaction_cursor_index"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="transaction",
+            name="transaction_date",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.CreateModel(
+            name="ImportJob",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("source_name", models.CharField(max_length=255)),
+                ("checksum", models.CharField(max_length=64)),
+                ("rows_imported", models.PositiveBigIntegerField(default=0)),
+                ("completed_at", models.DateTimeField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("update_at", models.DateTimeField(auto_now=True)),
+                ("portfolio", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="import_jobs", to="portfolio.portfolio")),
+            ],
+            options={
+                "constraints": [models.UniqueConstraint(fields=("portfolio", "checksum"), name="import_job_portfolio_checksum_uniq")],
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.9 on 2026-10-18 15:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portfolio", "0015_importjob_transaction_date_default"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="portfolio",
+            name="lot_method",
+            field=models.CharField(choices=[("FIFO", "First in, first out"), ("LIFO", "Last in, first out"), ("HIFO", "Highest cost first")], default="FIFO", max_length=4),
+        ),
+        migrations.CreateModel(
+            name="TaxLot",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("acquired_at", models.DateTimeField()),
+                ("quantity", models.DecimalField(decimal_places=8, max_digits=20)),
+                ("remaining_quantity", models.DecimalField(decimal_places=8, max_digits=20)),
+                ("cost_per_unit", models.DecimalField(decimal_places=8, max_digits=20)),
+                ("asset", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="lots", to="portfolio.asset")),
+                ("transaction", models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name="lot", to="portfolio.transaction")),
+            ],
+        ),
+        migrations.CreateModel(
+            name="LotDisposal",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("quantity", models.DecimalField(decimal_places=8, max_digits=20)),
+                ("cost_per_unit", models.DecimalField(decimal_places=8, max_digits=20)),
+                ("proceeds_per_unit", models.DecimalField(decimal_places=8, max_digits=20)),
+                ("realized_gain", models.DecimalField(decimal_places=2, max_digits=20)),
+                ("disposed_at", models.DateTimeField()),
+                ("asset", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="disposals", to="portfolio.asset")),
+                ("transaction", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="disposals", to="portfolio.transaction")),
+                ("lot", models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name="disposals", to="portfolio.taxlot")),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="taxlot",
+            index=models.Index(condition=models.Q(("remaining_quantity__gt", 0)), fields=["asset", "acquired_at", "id"], name="lot_open_fifo_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="taxlot",
+            index=models.Index(condition=models.Q(("remaining_quantity__gt", 0)), fields=["asset", "-acquired_at", "-id"], name="lot_open_lifo_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="taxlot",
+            index=models.Index(condition=models.Q(("remaining_quantity__gt", 0)), fields=["asset", "-cost_per_unit", "id"], name="lot_open_hifo_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="lotdisposal",
+            index=models.Index(fields=["asset", "disposed_at"], name="disposal_asset_date_idx"),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.9 on 2026-10-18 16:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portfolio", "0016_tax_lots"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PortfolioSnapshot",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("coin_id", models.CharField(blank=True, default="", max_length=100)),
+                ("taken_at", models.DateTimeField()),
+                ("quantity", models.DecimalField(blank=True, decimal_places=8, max_digits=20, null=True)),
+                ("price", models.DecimalField(blank=True, decimal_places=8, max_digits=20, null=True)),
+                ("value", models.DecimalField(blank=True, decimal_places=2, max_digits=30, null=True)),
+                ("cost_basis", models.DecimalField(decimal_places=2, max_digits=30)),
+                ("unrealized_profit_loss", models.DecimalField(blank=True, decimal_places=2, max_digits=30, null=True)),
+                ("realized_profit_loss", models.DecimalField(decimal_places=2, max_digits=30)),
+                ("portfolio", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="snapshots", to="portfolio.portfolio")),
+            ],
+            options={
+                "constraints": [models.UniqueConstraint(fields=("portfolio", "coin_id", "taken_at"), name="snapshot_portfolio_coin_time_uniq")],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.9 on 2026-10-18 16:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portfolio", "0017_portfolio_snapshots"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PricePoint",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("coin_id", models.CharField(max_length=100)),
+                ("currency", models.CharField(max_length=10)),
+                ("timestamp", models.DateTimeField()),
+                ("open", models.DecimalField(decimal_places=12, max_digits=30)),
+                ("high", models.DecimalField(decimal_places=12, max_digits=30)),
+                ("low", models.DecimalField(decimal_places=12, max_digits=30)),
+                ("close", models.DecimalField(decimal_places=12, max_digits=30)),
+            ],
+            options={
+                "constraints": [models.UniqueConstraint(fields=("coin_id", "currency", "timestamp"), name="price_point_coin_currency_ts_uniq")],
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.9 on 2026-10-18 16:20
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portfolio", "0018_price_history"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="portfolio",
+            name="update_at",
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
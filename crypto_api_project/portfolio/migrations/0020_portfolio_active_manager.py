@@ -0,0 +1,25 @@
+# Generated by Django 5.2.9 on 2026-10-18 16:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portfolio", "0019_portfolio_update_at"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="portfolio",
+            name="portfolio_owner_active_idx",
+        ),
+        migrations.AddIndex(
+            model_name="portfolio",
+            index=models.Index(condition=models.Q(("active", True)), fields=["owner"], name="portfolio_active_owner_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="portfolio",
+            index=models.Index(condition=models.Q(("active", True), _negated=True), fields=["deleted_at"], name="portfolio_deleted_at_idx"),
+        ),
+    ]
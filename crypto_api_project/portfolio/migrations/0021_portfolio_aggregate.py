@@ -0,0 +1,25 @@
+# Generated by Django 5.2.9 on 2026-10-18 16:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portfolio", "0020_portfolio_active_manager"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PortfolioAggregate",
+            fields=[
+                ("portfolio", models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name="aggregate", serialize=False, to="portfolio.portfolio")),
+                ("cost_basis", models.DecimalField(decimal_places=10, default=0, max_digits=40)),
+                ("realized_profit_loss", models.DecimalField(decimal_places=2, default=0, max_digits=30)),
+                ("asset_count", models.IntegerField(default=0)),
+                ("position_count", models.IntegerField(default=0)),
+                ("transaction_count", models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
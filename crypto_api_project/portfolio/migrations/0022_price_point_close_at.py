@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-18 17:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portfolio", "0021_portfolio_aggregate"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="pricepoint",
+            name="close_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
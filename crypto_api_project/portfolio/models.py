@@ -32,6 +32,16 @@ class UserProfile(models.Model):
         return f"Profile of {self.user.username}"
 
 
+# Soft-deleted portfolios stay in the table until purged
+# (see portfolio/services/purge.py), hidden from the default manager.
+ACTIVE_PORTFOLIO = models.Q(active=True)
+
+
+class ActivePortfolioManager(models.Manager):
+    def get_queryset(self):
+        return super().get_queryset().filter(ACTIVE_PORTFOLIO)
+
+
 #Portofolio, Asset and Transaction models
 class Portfolio(models.Model):
     owner = models.ForeignKey(
@@ -39,19 +49,62 @@ class Portfolio(models.Model):
     )
     name = models.CharField(max_length=100)
     created_at = models.DateTimeField(auto_now_add=True)
+    update_at = models.DateTimeField(auto_now=True)
     active = models.BooleanField(default=True)
     deleted_at = models.DateTimeField(blank=True, null=True)
+    # How SELLs are matched against tax lots for realized gains
+    lot_method = models.CharField(
+        max_length=4,
+        choices=[("FIFO", "First in, first out"), ("LIFO", "Last in, first out"), ("HIFO", "Highest cost first")],
+        default="FIFO",
+    )
+
+    # Active portfolios only; all_objects also sees soft-deleted ones.
+    # Related lookups (asset.portfolio) use the base manager and see both.
+    objects = ActivePortfolioManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        indexes = [
+            # PortfolioViewSet: active portfolios of a user
+            models.Index(fields=["owner"], condition=ACTIVE_PORTFOLIO,
+                         name="portfolio_active_owner_idx"),
+            # purge_portfolios: deleted portfolios, oldest deletion first
+            models.Index(fields=["deleted_at"], condition=~ACTIVE_PORTFOLIO,
+                         name="portfolio_deleted_at_idx"),
+        ]
 
     # soft delete method
+    # One UPDATE of the changed columns; post_save still invalidates cached reads.
+    # Assets and transactions are hidden through the portfolio's active flag.
     def soft_delete(self):
         self.active = False
         self.deleted_at = timezone.now()
-        self.save()
+        self.save(update_fields=["active", "deleted_at", "update_at"])
 
     def __str__(self):
         return f"{self.name} - {self.owner.username}"
 
 
+# Running totals of a portfolio, updated with F() expressions in the same
+# database transaction as the trades and asset changes that move them
+# (see portfolio/services/aggregates.py). Amounts are in USD.
+# `manage.py rebuild_aggregates` recomputes them from the rows.
+class PortfolioAggregate(models.Model):
+    portfolio = models.OneToOneField(
+        Portfolio, on_delete=models.CASCADE, primary_key=True, related_name="aggregate"
+    )
+    # Sum of quantity x average_buy_price, at the precision of that product
+    cost_basis = models.DecimalField(max_digits=40, decimal_places=10, default=0)
+    realized_profit_loss = models.DecimalField(max_digits=30, decimal_places=2, default=0)
+    asset_count = models.IntegerField(default=0)
+    position_count = models.IntegerField(default=0)  # assets with a quantity left
+    transaction_count = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Totals of {self.portfolio_id}: {self.transaction_count} transactions"
+
+
 class Asset(models.Model):
     portfolio = models.ForeignKey(
         Portfolio, on_delete=models.SET_NULL,
@@ -66,6 +119,12 @@ class Asset(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     update_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # AssetViewSet: assets of a portfolio, cursor-paginated on id
+            models.Index(fields=["portfolio", "id"], name="asset_portfolio_id_idx"),
+        ]
+
 
     def __str__(self):
         return f"{self.quantity} of {self.coin_id} in {self.portfolio.name}"
@@ -78,8 +137,140 @@ class Transaction(models.Model):
     quantity = models.DecimalField(max_digits=20, decimal_places=8)
     price_per_unit = models.DecimalField(max_digits=20, decimal_places=8)
     total_value = models.DecimalField(max_digits=20, decimal_places=2, blank=True, null=True)
-    transaction_date = models.DateTimeField(auto_now_add=True)
+    # default instead of auto_now_add so historical imports keep their own dates
+    transaction_date = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # TransactionViewSet: history of an asset, newest first
+            # ordered like TransactionCursorPagination, so pages are index range scans
+            models.Index(fields=["asset", "-transaction_date", "-id"], name="txn_asset_date_id_idx"),
+        ]
 
     def __str__(self):
         return f"{self.transaction_type} {self.quantity} of {self.asset.coin_id} at {self.price_per_unit} on {self.transaction_date}"
-    
+
+
+# Tax lots: every BUY opens a lot, SELLs consume open lots in the
+# portfolio's matching order (see portfolio/services/lots.py).
+# Partial indexes only cover open lots, so matching stays an index scan
+# no matter how many closed lots an asset has accumulated.
+OPEN_LOT = models.Q(remaining_quantity__gt=0)
+
+
+class TaxLot(models.Model):
+    asset = models.ForeignKey(Asset, on_delete=models.CASCADE, related_name="lots")
+    transaction = models.OneToOneField(Transaction, on_delete=models.CASCADE, related_name="lot")
+    acquired_at = models.DateTimeField()
+    quantity = models.DecimalField(max_digits=20, decimal_places=8)
+    remaining_quantity = models.DecimalField(max_digits=20, decimal_places=8)
+    cost_per_unit = models.DecimalField(max_digits=20, decimal_places=8)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["asset", "acquired_at", "id"], condition=OPEN_LOT, name="lot_open_fifo_idx"),
+            models.Index(fields=["asset", "-acquired_at", "-id"], condition=OPEN_LOT, name="lot_open_lifo_idx"),
+            models.Index(fields=["asset", "-cost_per_unit", "id"], condition=OPEN_LOT, name="lot_open_hifo_idx"),
+        ]
+
+    def __str__(self):
+        return f"Lot of {self.remaining_quantity}/{self.quantity} at {self.cost_per_unit}"
+
+
+# Part of a SELL matched against one lot, with its realized gain.
+# lot is empty for quantity bought before lot tracking existed, which is
+# valued at the asset's average buy price instead.
+class LotDisposal(models.Model):
+    asset = models.ForeignKey(Asset, on_delete=models.CASCADE, related_name="disposals")
+    lot = models.ForeignKey(TaxLot, on_delete=models.CASCADE, related_name="disposals", null=True, blank=True)
+    transaction = models.ForeignKey(Transaction, on_delete=models.CASCADE, related_name="disposals")
+    quantity = models.DecimalField(max_digits=20, decimal_places=8)
+    cost_per_unit = models.DecimalField(max_digits=20, decimal_places=8)
+    proceeds_per_unit = models.DecimalField(max_digits=20, decimal_places=8)
+    realized_gain = models.DecimalField(max_digits=20, decimal_places=2)
+    disposed_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            # Realized gains of an asset over a date range
+            models.Index(fields=["asset", "disposed_at"], name="disposal_asset_date_idx"),
+        ]
+
+    def __str__(self):
+        return f"Disposal of {self.quantity} with gain {self.realized_gain}"
+
+
+# Point-in-time valuation written by `manage.py snapshot_portfolios`.
+# One row per held coin plus one row with an empty coin_id holding the
+# portfolio totals, so a chart series is a single range scan on the
+# unique (portfolio, coin_id, taken_at) index.
+class PortfolioSnapshot(models.Model):
+    portfolio = models.ForeignKey(Portfolio, on_delete=models.CASCADE, related_name="snapshots")
+    coin_id = models.CharField(max_length=100, blank=True, default="")
+    taken_at = models.DateTimeField()
+    quantity = models.DecimalField(max_digits=20, decimal_places=8, blank=True, null=True)
+    price = models.DecimalField(max_digits=20, decimal_places=8, blank=True, null=True)
+    # Empty when no price was available for the coin at snapshot time
+    value = models.DecimalField(max_digits=30, decimal_places=2, blank=True, null=True)
+    cost_basis = models.DecimalField(max_digits=30, decimal_places=2)
+    unrealized_profit_loss = models.DecimalField(max_digits=30, decimal_places=2, blank=True, null=True)
+    realized_profit_loss = models.DecimalField(max_digits=30, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["portfolio", "coin_id", "taken_at"], name="snapshot_portfolio_coin_time_uniq"
+            ),
+        ]
+
+    def __str__(self):
+        return f"Snapshot of {self.portfolio_id} {self.coin_id or 'total'} at {self.taken_at}"
+
+
+# Local price history: one OHLC row per coin, currency and
+# PRICE_HISTORY_BUCKET-sized time bucket, fed by the price refresher and
+# market_chart backfills (see portfolio/services/price_history.py).
+# "Price at time T" is a single descent of the unique index.
+class PricePoint(models.Model):
+    coin_id = models.CharField(max_length=100)
+    currency = models.CharField(max_length=10)
+    timestamp = models.DateTimeField()  # Start of the bucket
+    open = models.DecimalField(max_digits=30, decimal_places=12)
+    high = models.DecimalField(max_digits=30, decimal_places=12)
+    low = models.DecimalField(max_digits=30, decimal_places=12)
+    close = models.DecimalField(max_digits=30, decimal_places=12)
+    # Times of the observations open and close come from, so a backfill
+    # merged after the refresher keeps the earliest open and latest close
+    # (empty for rows written before they existed)
+    open_at = models.DateTimeField(blank=True, null=True)
+    close_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["coin_id", "currency", "timestamp"], name="price_point_coin_currency_ts_uniq"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.coin_id}/{self.currency} at {self.timestamp}: {self.close}"
+
+
+# Progress of a `manage.py import_transactions` run, committed together with
+# each imported batch so a crashed import resumes exactly where it stopped.
+class ImportJob(models.Model):
+    portfolio = models.ForeignKey(Portfolio, on_delete=models.CASCADE, related_name="import_jobs")
+    source_name = models.CharField(max_length=255)
+    checksum = models.CharField(max_length=64)  # sha256 of the source file
+    rows_imported = models.PositiveBigIntegerField(default=0)
+    completed_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    update_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["portfolio", "checksum"], name="import_job_portfolio_checksum_uniq"),
+        ]
+
+    def __str__(self):
+        return f"Import of {self.source_name} into {self.portfolio_id} ({self.rows_imported} rows)"
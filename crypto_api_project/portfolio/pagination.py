@@ -6,8 +6,12 @@ from rest_framework.pagination import CursorPagination
 
 class TransactionCursorPagination(CursorPagination):
     page_size = 10
-    ordering = '-transaction_date'  # Order by transaction_date descending
+    page_size_query_param = 'page_size'  # Clients may ask for bigger pages...
+    max_page_size = 100  # ...up to this hard cap
+    # transaction_date is not unique (bulk imports share timestamps),
+    # the id tie-breaker keeps cursor pages from skipping or repeating rows
+    ordering = ('-transaction_date', '-id')
 
 class AssetCursorPagination(CursorPagination):
     page_size = 10
-    ordering = 'id'  # Order by updated_at descending
\ No newline at end of file
+    ordering = 'id'  # Order by updated_at descending
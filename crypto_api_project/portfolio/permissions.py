@@ -1,12 +1,16 @@
 from rest_framework.permissions import BasePermission
 
+# Ownership is checked on owner_id, so no user row is loaded.
+# The viewsets select_related the chain up to the portfolio, so
+# none of these checks runs a query of its own.
+
 class IsOwner(BasePermission):
     """
     Custom permission to only allow owners of an object to access it.
     """
     def has_object_permission(self, request, view, obj):
         # Assuming the model instance has an `owner` attribute.
-        return obj.owner == request.user
+        return obj.owner_id == request.user.pk
     
 class IsAssetOwner(BasePermission):
     """
@@ -14,7 +18,7 @@ class IsAssetOwner(BasePermission):
     """
     def has_object_permission(self, request, view, obj):
         # Assuming the Asset model instance has a `portfolio` attribute with an `owner`.
-        return obj.portfolio.owner == request.user
+        return obj.portfolio is not None and obj.portfolio.owner_id == request.user.pk
     
 class IsTransactionOwner(BasePermission):
     """
@@ -23,4 +27,5 @@ class IsTransactionOwner(BasePermission):
     def has_object_permission(self, request, view, obj):
         # Assuming the Transaction model instance has an `asset` attribute
         # which in turn has a `portfolio` attribute with an `owner`.
-        return obj.asset.portfolio.owner == request.user
\ No newline at end of file
+        portfolio = obj.asset.portfolio if obj.asset is not None else None
+        return portfolio is not None and portfolio.owner_id == request.user.pk
@@ -0,0 +1,14 @@
+import json
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+# Lets clients that only accept text/event-stream (EventSource) be served,
+# and renders errors raised before a stream starts as a single `error` event.
+class EventStreamRenderer(BaseRenderer):
+    media_type = "text/event-stream"
+    format = "sse"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return f"event: error\ndata: {json.dumps(data, cls=JSONEncoder)}\n\n".encode(self.charset)
@@ -0,0 +1,60 @@
+import hashlib
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+from portfolio.services.generations import record_response_cache
+
+
+# Response headers replayed on cache hits
+CACHED_HEADERS = ("X-Price-Freshness",)
+
+
+# Per-user cache of list/retrieve response data.
+# Keys embed `response_cache_version()` (cache generations, see
+# portfolio/services/generations.py), so writes invalidate by bumping a
+# generation from portfolio/signals.py rather than by deleting keys.
+# Views that don't override it are rendered without caching.
+class CachedResponseMixin:
+
+    def response_cache_version(self):
+        """
+        Return the generation(s) and any other inputs the response depends
+        on, or None to not cache it.
+        """
+        return None
+
+    def response_cache_timeout(self):
+        """Seconds to keep the response; 0 or less to not store it."""
+        return settings.RESPONSE_CACHE_TIMEOUT
+
+    def cached_response(self, render):
+        version = self.response_cache_version()
+        if version is None:
+            return render()
+        request = self.request
+        fingerprint = f"{version}|{request.get_full_path()}"
+        key = "response_{}_{}_{}".format(
+            self.basename, request.user.pk, hashlib.sha256(fingerprint.encode()).hexdigest()[:32]
+        )
+        entry = cache.get(key)
+        record_response_cache(self.basename, hit=entry is not None)
+        if entry is not None:
+            response = Response(entry["data"], headers=entry["headers"])
+            response["X-Cache"] = "HIT"
+            return response
+
+        response = render()
+        timeout = self.response_cache_timeout()
+        if response.status_code == 200 and timeout > 0:
+            cache.set(key, {
+                "data": response.data,
+                "headers": {header: response[header] for header in CACHED_HEADERS if header in response},
+            }, timeout=timeout)
+        response["X-Cache"] = "MISS"
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(lambda: super(CachedResponseMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(lambda: super(CachedResponseMixin, self).retrieve(request, *args, **kwargs))
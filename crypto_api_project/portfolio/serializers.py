@@ -2,6 +2,7 @@ from  rest_framework import serializers
 from .models import  Portfolio, Asset, Transaction, UserProfile
 # Import get_user_model to reference the custom user model
 from django.contrib.auth import get_user_model
+from django.conf import settings
 from portfolio.services.coingecko import get_coin_price
 from decimal import Decimal
 from PIL import Image # For image validation
@@ -45,6 +46,14 @@ class UserProfileSerializer(serializers.ModelSerializer):
         fields = ['id', 'phone_number', 'bio', 'profile_picture', 'preferred_currency']
         ordering = ['id']
 
+    # Only currencies we hold FX rates for can be used for valuations
+    def validate_preferred_currency(self, value):
+        if value.lower() not in settings.SUPPORTED_CURRENCIES:
+            raise serializers.ValidationError(
+                f"Unsupported currency. Supported currencies: {', '.join(settings.SUPPORTED_CURRENCIES)}."
+            )
+        return value.upper()
+
     """ 
     -Validate profile picture size and type if needed.
     -Allow only extentions like .jpg, .png, .webp and limit size to 2MB.
@@ -81,7 +90,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
 class PortfolioSerializer(serializers.ModelSerializer):
     class Meta:
         model = Portfolio
-        fields = ['id', 'owner', 'name', 'created_at']
+        fields = ['id', 'owner', 'name', 'lot_method', 'created_at']
         read_only_fields = ['owner', 'created_at']
         ordering = ['-created_at', 'id']
 
@@ -89,37 +98,79 @@ class PortfolioSerializer(serializers.ModelSerializer):
 class AssetSerializer(serializers.ModelSerializer):
     unrealized_profit_loss = serializers.SerializerMethodField()
     current_value = serializers.SerializerMethodField()
+    # Currency of current_value and unrealized_profit_loss (stored amounts stay in USD)
+    valuation_currency = serializers.SerializerMethodField()
 
     class Meta:
         model = Asset
         fields = ['id', 'portfolio', 'coin_id', 'quantity', 'average_buy_price', 'realized_profit_loss', 
-                  'unrealized_profit_loss', 'current_value', 'created_at', 'update_at'] 
+                  'unrealized_profit_loss', 'current_value', 'valuation_currency', 'created_at', 'update_at'] 
         read_only_fields = ['id', 'portfolio', 'created_at', 'quantity', 'average_buy_price', 'realized_profit_loss', 'update_at', 'unrealized_profit_loss',]
         ordering = ['-update_at', 'id']
 
+    # Resolve the current price for an asset.
+    # AssetViewSet.list prefetches prices for the whole page into the
+    # context, so list rows never hit the cache or CoinGecko one by one.
+    def resolve_current_price(self, obj):
+        prices = self.context.get("prices")
+        if prices is not None:
+            price = prices.get(obj.coin_id)
+        else:
+            price_response = get_coin_price(obj.coin_id, currency="usd")
+            if price_response is None or not price_response.get("success", True):
+                return None
+            price = price_response.get("price")
+        if price is None:
+            return None
+        # convert to Decimal for accurate calculations
+        return Decimal(str(price))
+
+    # USD -> valuation currency rate, set by the viewset from the cached FX rates
+    def valuation_rate(self):
+        return self.context.get("fx_rate", Decimal("1"))
+
+    def get_valuation_currency(self, obj):
+        return self.context.get("currency", "usd")
+
     # Calculate unrealized profit/loss and current value
     def get_current_value(self, obj):
-        current_price = get_coin_price(obj.coin_id, currency="usd")
-        if current_price is not None and current_price.get("success", True):
-            # convert to Decimal for accurate calculations
-            current_price = Decimal(str(current_price.get("price", 0.00)))
-            return current_price * Decimal(str(obj.quantity))
+        current_price = self.resolve_current_price(obj)
+        if current_price is not None:
+            return current_price * Decimal(str(obj.quantity)) * self.valuation_rate()
         return 0.00
     
     def get_unrealized_profit_loss(self, obj):
-        current_price = get_coin_price(obj.coin_id, currency="usd")
-        if current_price is not None and current_price.get("success", True):
-            # convert to Decimal for accurate calculations
+        current_price = self.resolve_current_price(obj)
+        if current_price is not None:
             quantity = Decimal(str(obj.quantity))
             average_buy_price = Decimal(str(obj.average_buy_price))
-            current_price = Decimal(str(current_price.get("price", 0.00)))
-            return (current_price - average_buy_price) * quantity
+            return (current_price - average_buy_price) * quantity * self.valuation_rate()
         return 0.00
 
 # Transaction Serializer
 class TransactionSerializer(serializers.ModelSerializer):
+    # Optional signed quote from the asset quote endpoint to pin the price
+    quote_token = serializers.CharField(write_only=True, required=False)
+
     class Meta:
         model = Transaction
-        fields = ['id', 'asset', 'transaction_type', 'quantity', 'price_per_unit', 'total_value', 'transaction_date']
+        fields = ['id', 'asset', 'transaction_type', 'quantity', 'price_per_unit', 'total_value', 'transaction_date',
+                  'quote_token']
         read_only_fields = ['id', 'asset', 'price_per_unit', 'total_value', 'transaction_date']
-        ordering = ['-transaction_date', 'id']
\ No newline at end of file
+        ordering = ['-transaction_date', 'id']
+
+# Bulk transaction import (one asset, many trades)
+class BulkTransactionItemSerializer(serializers.Serializer):
+    transaction_type = serializers.ChoiceField(choices=["BUY", "SELL"])
+    quantity = serializers.DecimalField(max_digits=20, decimal_places=8, min_value=Decimal("0.00000001"))
+    # Fill price from the exchange; when omitted the live price is used
+    price_per_unit = serializers.DecimalField(
+        max_digits=20, decimal_places=8, min_value=Decimal("0.00000001"), required=False
+    )
+
+class BulkTransactionSerializer(serializers.Serializer):
+    transactions = serializers.ListField(
+        child=BulkTransactionItemSerializer(), allow_empty=False, max_length=1000
+    )
+    quote_token = serializers.CharField(required=False)
+
@@ -0,0 +1,108 @@
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, Q, Sum
+from portfolio.models import Asset, PortfolioAggregate, Transaction
+
+
+AGGREGATE_FIELDS = ["cost_basis", "realized_profit_loss", "asset_count", "position_count", "transaction_count"]
+# Same precision as PortfolioAggregate.cost_basis
+COST_BASIS_FIELD = DecimalField(max_digits=40, decimal_places=10)
+# Amounts are compared to the cent: SQLite runs F() arithmetic in floating point
+DRIFT_TOLERANCE = Decimal("0.01")
+
+
+def compute_aggregate(portfolio_id):
+    """Recompute a portfolio's aggregate from its assets and transactions."""
+    totals = Asset.objects.filter(portfolio_id=portfolio_id).aggregate(
+        cost_basis=Sum(F('quantity') * F('average_buy_price'), output_field=COST_BASIS_FIELD),
+        realized_profit_loss=Sum('realized_profit_loss'),
+        asset_count=Count('id'),
+        position_count=Count('id', filter=Q(quantity__gt=0)),
+    )
+    totals["cost_basis"] = totals["cost_basis"] or Decimal("0")
+    totals["realized_profit_loss"] = totals["realized_profit_loss"] or Decimal("0")
+    totals["transaction_count"] = Transaction.objects.filter(asset__portfolio_id=portfolio_id).count()
+    return totals
+
+
+def _create_aggregate(portfolio_id):
+    """Create the aggregate row from the rows; None if it exists already."""
+    try:
+        with transaction.atomic():
+            return PortfolioAggregate.objects.create(portfolio_id=portfolio_id, **compute_aggregate(portfolio_id))
+    except IntegrityError:
+        return None
+
+
+def portfolio_aggregate(portfolio):
+    """
+    The portfolio's aggregate, computed and stored on first use
+    (portfolios created before the table, or only written outside the API).
+    """
+    try:
+        return portfolio.aggregate
+    except PortfolioAggregate.DoesNotExist:
+        pass
+    return _create_aggregate(portfolio.id) or PortfolioAggregate.objects.get(portfolio_id=portfolio.id)
+
+
+def asset_contribution(asset):
+    """What one asset adds to its portfolio's aggregate."""
+    quantity = Decimal(str(asset.quantity))
+    return {
+        "cost_basis": quantity * Decimal(str(asset.average_buy_price)),
+        "realized_profit_loss": Decimal(str(asset.realized_profit_loss)),
+        "position_count": 1 if quantity > 0 else 0,
+    }
+
+
+def record_asset_change(portfolio_id, before, after, assets=0, transactions=0):
+    """
+    Move the aggregate from an asset's `before` to its `after` contribution
+    (None when the asset did not / no longer exists), plus `assets` and
+    `transactions` added or removed.
+
+    Call it inside the atomic block that wrote the change, after writing:
+    a portfolio without an aggregate row gets one computed from its rows,
+    which then already include the change. The UPDATE locks the row until
+    commit, so concurrent trades of one portfolio queue up only here.
+    """
+    if portfolio_id is None:
+        return
+    before = before or {}
+    after = after or {}
+    deltas = {field: after.get(field, 0) - before.get(field, 0)
+              for field in ("cost_basis", "realized_profit_loss", "position_count")}
+    deltas["asset_count"] = assets
+    deltas["transaction_count"] = transactions
+    changes = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if not changes:
+        return
+    if PortfolioAggregate.objects.filter(portfolio_id=portfolio_id).update(**changes):
+        return
+    if _create_aggregate(portfolio_id) is None:
+        # Created concurrently, from rows that don't include this change yet
+        PortfolioAggregate.objects.filter(portfolio_id=portfolio_id).update(**changes)
+
+
+def verify_aggregate(portfolio_id, repair=True):
+    """
+    Recount a portfolio's aggregate and return the fields that drifted,
+    as {field: (stored, actual)}; stored is None when the row is missing.
+    With `repair`, the recount is stored. The row stays locked from the
+    recount to the write, so concurrent trades add their deltas on top.
+    """
+    with transaction.atomic():
+        stored = PortfolioAggregate.objects.select_for_update().filter(portfolio_id=portfolio_id).first()
+        actual = compute_aggregate(portfolio_id)
+        if stored is None:
+            if repair:
+                _create_aggregate(portfolio_id)
+            return {field: (None, actual[field]) for field in AGGREGATE_FIELDS}
+        drift = {
+            field: (getattr(stored, field), actual[field]) for field in AGGREGATE_FIELDS
+            if abs(getattr(stored, field) - actual[field]) >= DRIFT_TOLERANCE
+        }
+        if drift and repair:
+            PortfolioAggregate.objects.filter(portfolio_id=portfolio_id).update(**actual)
+    return drift
@@ -0,0 +1,73 @@
+import time
+
+import requests
+from django.core.cache import cache
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of calling an upstream whose circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker whose state lives in the cache, so every worker
+    (and every gunicorn process when Redis is configured) shares it.
+    - closed: calls go through; failures are counted within `failure_window`.
+    - open: after `failure_threshold` failures calls fail fast for
+      `recovery_timeout` seconds.
+    - half-open: once the timeout passes a single probe call is let
+      through; its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, name, failure_threshold=5, recovery_timeout=30, failure_window=60):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.failure_window = failure_window
+        self.failures_key = f"circuit_{name}_failures"
+        self.opened_at_key = f"circuit_{name}_opened_at"
+        self.probe_key = f"circuit_{name}_probe"
+
+    def state(self):
+        opened_at = cache.get(self.opened_at_key)
+        if opened_at is None:
+            return CLOSED
+        if time.time() - opened_at < self.recovery_timeout:
+            return OPEN
+        return HALF_OPEN
+
+    def allow_request(self):
+        state = self.state()
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN:
+            # Only the worker that claims the probe slot may try upstream
+            return cache.add(self.probe_key, 1, timeout=self.recovery_timeout)
+        return False
+
+    def record_success(self):
+        cache.delete_many([self.failures_key, self.opened_at_key, self.probe_key])
+
+    def record_failure(self):
+        if self.state() == HALF_OPEN:
+            # Probe failed, open again for another recovery period
+            self._open()
+            return
+        cache.add(self.failures_key, 0, timeout=self.failure_window)
+        try:
+            failures = cache.incr(self.failures_key)
+        except ValueError:
+            # Key expired between add and incr
+            cache.set(self.failures_key, 1, timeout=self.failure_window)
+            failures = 1
+        if failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self):
+        cache.set(self.opened_at_key, time.time(), timeout=None)
+        cache.delete_many([self.failures_key, self.probe_key])
@@ -1,61 +1,488 @@
+import asyncio
+import logging
+import time
+from urllib.parse import quote_plus, urlencode
+
+import httpx
 import requests
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.core.cache import cache
+from portfolio.services.circuit_breaker import OPEN, CircuitBreaker, CircuitOpenError
+from portfolio.services.http_client import aupstream_get, upstream_get
+from portfolio.services.price_feed import publish_prices
+
+
+logger = logging.getLogger(__name__)
+
+# How long a fetched price is considered fresh (seconds)
+PRICE_CACHE_TIMEOUT = 300
+
+# How long a stale price may still be served while it is refreshed (seconds)
+PRICE_CACHE_HARD_TIMEOUT = 3600
+
+# Refresh lock, so only one worker refetches an expired price
+PRICE_REFRESH_LOCK_TIMEOUT = 15
+
+# How long a worker waits for another worker's refresh on a hard miss
+PRICE_REFRESH_WAIT = 2
+PRICE_REFRESH_POLL_INTERVAL = 0.1
+
+# How long an unknown coin id is remembered as unknown (seconds)
+NEGATIVE_CACHE_TIMEOUT = 60
 
+# Shared across workers through the cache: after 5 failed calls within a
+# minute, skip CoinGecko for 30s and serve cached prices only.
+coingecko_circuit = CircuitBreaker("coingecko", failure_threshold=5, recovery_timeout=30)
 
-COIN_GECKO_URL = "https://api.coingecko.com/api/v3"
+# Max length of the URL-encoded `ids=...` query parameter per upstream call
+# (commas go out as %2C). Keeps the full URL well below the ~2k limit
+# enforced by most proxies.
+MAX_IDS_PARAM_LENGTH = 1500
 
-def get_coin_price(coin_id: str, currency: str = "usd"):
+
+def _price_cache_key(coin_id: str, currency: str) -> str:
+    return f"coin_price_{coin_id.lower()}_{currency.lower()}"
+
+
+def get_cached_prices(coin_ids, currency: str = "usd"):
     """
-    - First look the price in cache. If found, return it.
-    - If not found in cache, fetch from CoinGecko API.
-    - Cache the fetched price for future requests.
-    Args:
-        coin_id (str): The CoinGecko coin ID (e.g., 'bitcoin').
-        currency (str): The target currency (e.g., 'usd').
+    What the cache holds for `coin_ids`, as {coin_id: (price, fetched at
+    timestamp or None)}, from one `cache.get_many` and without fetching.
+    Coins without a cached price are left out. Used for cheap version
+    checks (list ETags, response cache keys) of price-dependent responses.
+    """
+    keys = {_price_cache_key(coin_id, currency): coin_id for coin_id in coin_ids if coin_id}
+    cached = {}
+    for key, entry in cache.get_many(list(keys)).items():
+        if not isinstance(entry, dict):
+            cached[keys[key]] = (entry, None)
+        elif not entry.get("unknown"):
+            cached[keys[key]] = (entry["price"], entry["fresh_until"] - PRICE_CACHE_TIMEOUT)
+    return cached
+
+
+def chunk_coin_ids(coin_ids, max_length=MAX_IDS_PARAM_LENGTH):
+    """
+    Split coin ids into groups whose encoded `ids` parameter fits in one URL,
+    i.e. len(urlencode({"ids": ",".join(chunk)})) <= max_length.
+    """
+    empty_length = len(urlencode({"ids": ""}))
+    separator_length = len(quote_plus(","))
+    chunk, chunk_length = [], empty_length
+    for coin_id in coin_ids:
+        extra = len(quote_plus(coin_id)) + (separator_length if chunk else 0)
+        if chunk and chunk_length + extra > max_length:
+            yield chunk
+            chunk, chunk_length = [], empty_length
+            extra = len(quote_plus(coin_id))
+        chunk.append(coin_id)
+        chunk_length += extra
+    if chunk:
+        yield chunk
+
+
+def _request_prices(coin_ids, currency: str) -> dict:
+    """
+    Fetch prices for a list of lowercase coin ids in a single upstream call.
+    Returns the raw CoinGecko payload, e.g. {"bitcoin": {"usd": 30000}}.
+    """
+    params = {
+        "ids": ",".join(coin_ids),
+        "vs_currencies": currency
+    }
+    return _request_json("/simple/price", params)
+
+
+def _is_upstream_failure(error) -> bool:
+    """
+    Whether an upstream error says CoinGecko itself is in trouble: 5xx, 429,
+    no connection or no answer in time. Other 4xx (e.g. a 404 for an unknown
+    coin) are about the request and leave the circuit breaker alone.
     """
-    cache_key = f"coin_price_{coin_id}_{currency}"
-    # Try to get  price from cache
-    cached_price = cache.get(cache_key)
-    if cached_price is not None:
-        print("Price fetched from cache.")
-        return {"success": True, "price": cached_price, "message": None}
-    # If not in cache, fetch from CoinGecko API
-    print("Fetching price from CoinGecko API.")
+    if isinstance(error, (requests.HTTPError, httpx.HTTPStatusError)):
+        status_code = error.response.status_code
+        return status_code >= 500 or status_code == 429
+    return isinstance(error, (requests.ConnectionError, requests.Timeout, httpx.TransportError))
 
-    endpoint = f"{COIN_GECKO_URL}/simple/price"
+
+def _request_json(path: str, params: dict):
+    """GET a CoinGecko endpoint through the circuit breaker and return its JSON body."""
+    endpoint = f"{settings.COIN_GECKO_URL}{path}"
+    headers = {
+        "x-cg-demo-api-key": settings.COIN_GECKO_API_KEY
+    }
+    if not coingecko_circuit.allow_request():
+        raise CircuitOpenError("CoinGecko is unavailable, try again shortly.")
+    try:
+        response = upstream_get(endpoint, headers=headers, params=params)
+        response.raise_for_status()
+        data = response.json()
+    except requests.RequestException as e:
+        if _is_upstream_failure(e):
+            coingecko_circuit.record_failure()
+        raise
+    coingecko_circuit.record_success()
+    return data
+
+
+async def _arequest_prices(coin_ids, currency: str) -> dict:
+    """Async counterpart of `_request_prices`, same circuit breaker."""
+    endpoint = f"{settings.COIN_GECKO_URL}/simple/price"
     headers = {
         "x-cg-demo-api-key": settings.COIN_GECKO_API_KEY
     }
     params = {
-        "ids": coin_id.lower(),
+        "ids": ",".join(coin_ids),
         "vs_currencies": currency
     }
+    if not await sync_to_async(coingecko_circuit.allow_request)():
+        raise CircuitOpenError("CoinGecko is unavailable, try again shortly.")
     try:
-        response = requests.get(endpoint, headers=headers, params=params, timeout=10)
+        response = await aupstream_get(endpoint, headers=headers, params=params)
         response.raise_for_status()
         data = response.json()
+    except httpx.HTTPError as e:
+        if _is_upstream_failure(e):
+            await sync_to_async(coingecko_circuit.record_failure)()
+        raise
+    await sync_to_async(coingecko_circuit.record_success)()
+    return data
 
-        # Cache the price for 5 minutes (300 seconds)
-        price = data[coin_id.lower()][currency.lower()]
-        cache.set(cache_key, price, timeout=300)
 
-        return {
-            "success": True, "price": price, "message": None
-        }
-    
-    # Timeout exception
+def _fetch_and_cache(missing: dict, currency: str):
+    """
+    Fetch prices for `missing` ({lowercase coin id: cache key}) and write
+    them to cache with a fresh soft TTL.
+    Returns ({cache_key: price}, error message or None).
+    """
+    logger.debug("Fetching %d coin price(s) from CoinGecko API.", len(missing))
+    responses = []
+    for chunk in chunk_coin_ids(sorted(missing)):
+        try:
+            responses.append((chunk, _request_prices(chunk, currency), None))
+        # Timeout exception
+        except requests.Timeout:
+            responses.append((chunk, None, 'Request to CoinGecko timed out.'))
+        # Catch network-related errors
+        except requests.RequestException as e:
+            responses.append((chunk, None, str(e)))
+    return _cache_fetched(missing, currency, responses)
+
+
+async def _afetch_and_cache(missing: dict, currency: str):
+    """
+    Async `_fetch_and_cache`: every chunk is requested at once with
+    `asyncio.gather`, the HTTP client caps how many are in flight.
+    """
+    logger.debug("Fetching %d coin price(s) from CoinGecko API.", len(missing))
+
+    async def fetch(chunk):
+        try:
+            return chunk, await _arequest_prices(chunk, currency), None
+        except httpx.TimeoutException:
+            return chunk, None, 'Request to CoinGecko timed out.'
+        except (httpx.HTTPError, CircuitOpenError) as e:
+            return chunk, None, str(e)
+
+    responses = await asyncio.gather(*(fetch(chunk) for chunk in chunk_coin_ids(sorted(missing))))
+    return await sync_to_async(_cache_fetched)(missing, currency, responses)
+
+
+def _cache_fetched(missing: dict, currency: str, responses):
+    """
+    Write the prices found in `responses` ([(chunk, payload or None,
+    error message or None)]) to cache and announce them to live streams.
+    Returns ({cache_key: price}, last error message or None).
+    """
+    fetched = {}
+    published = {}
+    unknown = []
+    message = None
+    for chunk, data, error in responses:
+        if error is not None:
+            message = error
+            continue
+        for coin_id in chunk:
+            price = data.get(coin_id, {}).get(currency)
+            if price is not None:
+                fetched[missing[coin_id]] = price
+                published[coin_id] = price
+            else:
+                unknown.append(missing[coin_id])
+
+    if fetched:
+        fresh_until = time.time() + PRICE_CACHE_TIMEOUT
+        cache.set_many(
+            {key: {"price": price, "fresh_until": fresh_until} for key, price in fetched.items()},
+            timeout=PRICE_CACHE_HARD_TIMEOUT
+        )
+        publish_prices(published, currency)
+    # Remember unknown coin ids for a while so typos don't hit upstream every time
+    if unknown:
+        cache.set_many({key: {"unknown": True} for key in unknown}, timeout=NEGATIVE_CACHE_TIMEOUT)
+    return fetched, message
+
+
+def _collect_refreshed(entries, found):
+    """Move entries another worker has refreshed (or found unknown) into `found`."""
+    for key, entry in entries.items():
+        if isinstance(entry, dict) and entry.get("fresh_until", 0) > time.time():
+            found[key] = entry["price"]
+        elif isinstance(entry, dict) and entry.get("unknown"):
+            found[key] = None
+
+
+def _wait_for_prices(cache_keys):
+    """
+    Poll the cache until another worker has filled `cache_keys` or the
+    wait budget runs out. Returns whatever entries showed up.
+    """
+    found = {}
+    deadline = time.monotonic() + PRICE_REFRESH_WAIT
+    while len(found) < len(cache_keys) and time.monotonic() < deadline:
+        time.sleep(PRICE_REFRESH_POLL_INTERVAL)
+        pending = [key for key in cache_keys if key not in found]
+        _collect_refreshed(cache.get_many(pending), found)
+    return found
+
+
+async def _await_prices(cache_keys):
+    """`_wait_for_prices` that sleeps without holding the event loop."""
+    found = {}
+    deadline = time.monotonic() + PRICE_REFRESH_WAIT
+    while len(found) < len(cache_keys) and time.monotonic() < deadline:
+        await asyncio.sleep(PRICE_REFRESH_POLL_INTERVAL)
+        pending = [key for key in cache_keys if key not in found]
+        _collect_refreshed(await cache.aget_many(pending), found)
+    return found
+
+
+class _PriceLookup:
+    """
+    State of one `get_coin_prices` call. The sync and async versions share
+    it and only differ in how they wait for other workers and fetch.
+    """
+
+    def __init__(self, coin_ids, currency: str, allow_stale: bool):
+        self.currency = currency.lower()
+        self.allow_stale = allow_stale
+        # Keep the caller's spelling of each coin id for the returned mapping
+        self.requested = {}
+        for coin_id in coin_ids:
+            if coin_id:
+                self.requested.setdefault(_price_cache_key(coin_id, self.currency), coin_id)
+        self.prices = {}
+        self.stale = {}  # cache_key -> stale price
+        self.locked = []
+        self.waiting = []
+        self.missing = {}  # lowercase coin id -> cache key, to fetch
+        self.fetched = {}
+        self.message = None
+
+    def start(self):
+        """
+        Read the cache and take the refresh locks.
+        Returns True when every price is answered and nothing is left to do.
+        """
+        requested = self.requested
+        if not requested:
+            return True
+        cached = cache.get_many(list(requested))
+        now = time.time()
+        unknown = set()
+        for cache_key, entry in cached.items():
+            # Entries written before soft TTLs existed hold a bare price
+            if not isinstance(entry, dict):
+                entry = {"price": entry, "fresh_until": 0}
+            if entry.get("unknown"):
+                unknown.add(cache_key)
+            elif entry["fresh_until"] > now:
+                self.prices[requested[cache_key]] = entry["price"]
+            else:
+                self.stale[cache_key] = entry["price"]
+
+        to_refresh = [key for key in requested if requested[key] not in self.prices and key not in unknown]
+        if not to_refresh:
+            return True
+
+        # Only the worker that wins the lock refreshes a given coin
+        self.locked = [key for key in to_refresh if cache.add(f"{key}_lock", 1, timeout=PRICE_REFRESH_LOCK_TIMEOUT)]
+        others = [key for key in to_refresh if key not in self.locked]
+
+        self.missing = {requested[key].lower(): key for key in self.locked}
+        if others:
+            if self.allow_stale:
+                # Someone else is refreshing; serve the stale copy meanwhile
+                for key in others:
+                    if key in self.stale:
+                        self.prices[requested[key]] = self.stale[key]
+                waiting = [key for key in others if key not in self.stale]
+            else:
+                waiting = others
+            # Hard miss: give the lock holder a moment, then fall back to fetching.
+            # No point waiting while the circuit is open, nobody is fetching.
+            if waiting and coingecko_circuit.state() != OPEN:
+                self.waiting = waiting
+            else:
+                self.missing.update({requested[key].lower(): key for key in waiting})
+        return False
+
+    def add_found(self, found):
+        """Take what other workers refreshed while we waited; fetch the rest ourselves."""
+        requested = self.requested
+        for key, price in found.items():
+            if price is not None:
+                self.prices[requested[key]] = price
+            self.stale.pop(key, None)
+        self.missing.update({requested[key].lower(): key for key in self.waiting if key not in found})
+
+    def add_fetched(self, fetched, message):
+        self.fetched, self.message = fetched, message
+        for cache_key, price in fetched.items():
+            self.prices[self.requested[cache_key]] = price
+
+    def release(self):
+        if self.locked:
+            cache.delete_many([f"{key}_lock" for key in self.locked])
+
+    def result(self):
+        requested = self.requested
+        # Upstream failed for a coin we still have a stale copy of
+        if self.allow_stale:
+            for key, price in self.stale.items():
+                self.prices.setdefault(requested[key], price)
+
+        served_stale = sorted(
+            requested[key] for key in self.stale
+            if key not in self.fetched and requested[key] in self.prices
+        )
+        return {"success": self.message is None, "prices": self.prices, "stale": served_stale,
+                "message": self.message}
+
+
+def get_coin_prices(coin_ids, currency: str = "usd", allow_stale: bool = True):
+    """
+    Batched version of `get_coin_price`.
+    - Resolve every cached price with a single `cache.get_many`.
+    - Fetch all misses from CoinGecko in as few calls as the URL length allows.
+    - Write fetched prices back with a single `cache.set_many`.
+    Cached prices are fresh for PRICE_CACHE_TIMEOUT seconds and then served
+    stale (up to PRICE_CACHE_HARD_TIMEOUT) while exactly one worker, holding
+    a `cache.add` lock, refreshes them. Workers that find a price missing
+    and the lock taken wait briefly for it, then fetch it themselves.
+    Args:
+        coin_ids (iterable): CoinGecko coin IDs (e.g., ['bitcoin', 'ethereum']).
+        currency (str): The target currency (e.g., 'usd').
+        allow_stale (bool): Serve stale prices while refreshing. Pass False
+            when the price is used to book a transaction.
+    Returns:
+        dict: {"success": bool, "prices": {coin_id: price}, "stale": [coin_id],
+        "message": str | None}. Coins unknown to CoinGecko are simply left
+        out of `prices`; `stale` lists the coins served from a stale entry.
+    """
+    lookup = _PriceLookup(coin_ids, currency, allow_stale)
+    if lookup.start():
+        return lookup.result()
+    try:
+        if lookup.waiting:
+            lookup.add_found(_wait_for_prices(lookup.waiting))
+        if lookup.missing:
+            lookup.add_fetched(*_fetch_and_cache(lookup.missing, lookup.currency))
+    finally:
+        lookup.release()
+    return lookup.result()
+
+
+async def aget_coin_prices(coin_ids, currency: str = "usd", allow_stale: bool = True):
+    """
+    Async version of `get_coin_prices`, for views served under ASGI.
+    Waiting for another worker's refresh and fetching from CoinGecko
+    happen on the event loop; every cache-missed chunk is requested
+    concurrently.
+    """
+    lookup = _PriceLookup(coin_ids, currency, allow_stale)
+    if await sync_to_async(lookup.start)():
+        return lookup.result()
+    try:
+        if lookup.waiting:
+            lookup.add_found(await _await_prices(lookup.waiting))
+        if lookup.missing:
+            lookup.add_fetched(*await _afetch_and_cache(lookup.missing, lookup.currency))
+    finally:
+        await sync_to_async(lookup.release)()
+    return lookup.result()
+
+
+def refresh_coin_prices(coin_ids, currency: str = "usd"):
+    """
+    Fetch prices for `coin_ids` regardless of what is cached and overwrite
+    the cache with fresh entries. Used by the background refresher.
+    Returns:
+        dict: {"success": bool, "refreshed": int, "prices": {coin_id: price},
+               "message": str | None}.
+    """
+    currency = currency.lower()
+    missing = {
+        coin_id.lower(): _price_cache_key(coin_id, currency)
+        for coin_id in coin_ids if coin_id
+    }
+    if not missing:
+        return {"success": True, "refreshed": 0, "prices": {}, "message": None}
+    fetched, message = _fetch_and_cache(missing, currency)
+    prices = {coin_id: fetched[key] for coin_id, key in missing.items() if key in fetched}
+    return {"success": message is None, "refreshed": len(fetched), "prices": prices, "message": message}
+
+
+def get_reference_quotes(coin_id: str, currencies):
+    """
+    Price of one reference coin in every currency of `currencies`, in a
+    single upstream call. Used to derive FX cross rates.
+    Raises requests.RequestException (incl. CircuitOpenError) on failure.
+    """
+    data = _request_prices([coin_id.lower()], ",".join(c.lower() for c in currencies))
+    return data.get(coin_id.lower(), {})
+
+
+def get_market_chart(coin_id: str, currency: str = "usd", days: int = 1):
+    """
+    Fetch the price history of one coin over the last `days` days.
+    CoinGecko picks the granularity: 5 minutes up to 1 day, hourly up to
+    90 days, daily beyond.
+    Returns:
+        dict: {"success": bool, "prices": [[timestamp_ms, price], ...], "message": str | None}.
+    """
+    params = {"vs_currency": currency.lower(), "days": days}
+    try:
+        data = _request_json(f"/coins/{coin_id.lower()}/market_chart", params)
     except requests.Timeout:
-        err_message = 'Request to CoinGecko timed out.'
-        return {"success": False, "message": err_message}
-    
-    # Catch network-related errors
+        return {"success": False, "prices": [], "message": "Request to CoinGecko timed out."}
     except requests.RequestException as e:
-        message = 'Network error occurred while fetching data from CoinGecko.'
-        return {"success": False, "price": None, "message": str(e)}
-     
-    # Catch coin_id not found
-    except KeyError:
-        err_message = f"Coin ID {coin_id} not found in CoinGecko response."
-        return {"success": False, "price": None, "message": err_message}
-   
\ No newline at end of file
+        return {"success": False, "prices": [], "message": str(e)}
+    return {"success": True, "prices": data.get("prices", []), "message": None}
+
+
+def get_coin_price(coin_id: str, currency: str = "usd", allow_stale: bool = True):
+    """
+    - First look the price in cache. If found, return it.
+    - If not found in cache, fetch from CoinGecko API.
+    - Cache the fetched price for future requests.
+    Args:
+        coin_id (str): The CoinGecko coin ID (e.g., 'bitcoin').
+        currency (str): The target currency (e.g., 'usd').
+        allow_stale (bool): Accept a stale cached price while it is refreshed.
+    """
+    result = get_coin_prices([coin_id], currency, allow_stale=allow_stale)
+    if coin_id in result["prices"]:
+        return {
+            "success": True, "price": result["prices"][coin_id], "message": None,
+            "stale": coin_id in result["stale"]
+        }
+
+    # Upstream call failed (timeout or network error)
+    if not result["success"]:
+        return {"success": False, "price": None, "message": result["message"]}
+
+    # Upstream answered but does not know this coin_id
+    err_message = f"Coin ID {coin_id} not found in CoinGecko response."
+    return {"success": False, "price": None, "message": err_message}
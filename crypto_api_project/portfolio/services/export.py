@@ -0,0 +1,47 @@
+import csv
+import json
+
+
+# Columns of a transaction export, read with values_list (no model instances)
+EXPORT_FIELDS = (
+    'id', 'asset_id', 'asset__coin_id', 'transaction_type', 'quantity',
+    'price_per_unit', 'total_value', 'transaction_date',
+)
+EXPORT_HEADER = (
+    'id', 'asset', 'coin_id', 'transaction_type', 'quantity',
+    'price_per_unit', 'total_value', 'transaction_date',
+)
+EXPORT_CHUNK_SIZE = 2000
+
+
+class Echo:
+    """Pseudo-buffer for csv.writer: `write` hands the line back instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def _format_value(value):
+    if value is None:
+        return None
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def _rows(queryset):
+    return queryset.values_list(*EXPORT_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def stream_csv(queryset):
+    """Yield the transactions of `queryset` as CSV lines, header first."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_HEADER)
+    for row in _rows(queryset):
+        yield writer.writerow([_format_value(value) for value in row])
+
+
+def stream_ndjson(queryset):
+    """Yield the transactions of `queryset` as newline-delimited JSON objects."""
+    for row in _rows(queryset):
+        yield json.dumps(dict(zip(EXPORT_HEADER, map(_format_value, row)))) + "\n"
@@ -0,0 +1,108 @@
+import logging
+import time
+from decimal import Decimal
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from portfolio.services.coingecko import PRICE_REFRESH_LOCK_TIMEOUT, get_reference_quotes
+
+
+logger = logging.getLogger(__name__)
+
+# Prices are fetched and stored in the base currency, other currencies
+# are a local multiply by the rates below.
+FX_BASE_CURRENCY = "usd"
+
+# Coin quoted in every supported currency to derive the rates from
+FX_REFERENCE_COIN = "bitcoin"
+
+FX_CACHE_KEY = "fx_rates_usd"
+# How long rates are considered fresh, and how long stale rates may still
+# be served while CoinGecko is unavailable (seconds)
+FX_CACHE_TIMEOUT = 600
+FX_CACHE_HARD_TIMEOUT = 86400
+# Only one worker refreshes the rates, the others keep serving what is cached
+FX_LOCK_KEY = f"{FX_CACHE_KEY}_lock"
+# After a failed refresh, don't call upstream again for a while
+FX_FAILURE_KEY = f"{FX_CACHE_KEY}_failed"
+FX_FAILURE_TIMEOUT = 60
+
+
+class UnsupportedCurrency(Exception):
+    """Raised for a currency outside SUPPORTED_CURRENCIES or without a known rate."""
+
+
+def _fetch_rates():
+    """Units of each supported currency per one unit of the base currency."""
+    quotes = get_reference_quotes(FX_REFERENCE_COIN, settings.SUPPORTED_CURRENCIES)
+    base = quotes.get(FX_BASE_CURRENCY)
+    if not base:
+        raise requests.RequestException(f"No {FX_BASE_CURRENCY} quote to derive FX rates from.")
+    base = Decimal(str(base))
+    return {currency: Decimal(str(quote)) / base for currency, quote in quotes.items()}
+
+
+def get_fx_rates(fetch: bool = True):
+    """
+    The cached rate vector ({currency: units per 1 USD}), refreshed with a
+    single upstream call for all supported currencies once it goes stale.
+    The refresh is skipped (stale rates served) when `fetch` is False,
+    while another worker holds the refresh lock, or for FX_FAILURE_TIMEOUT
+    after a failed refresh.
+    Returns (rates, stale); rates only holds the base currency when no
+    rates were ever fetched.
+    """
+    cached = cache.get_many([FX_CACHE_KEY, FX_FAILURE_KEY])
+    entry = cached.get(FX_CACHE_KEY)
+    if entry is not None and entry["fresh_until"] > time.time():
+        return entry["rates"], False
+    fallback = entry["rates"] if entry is not None else {FX_BASE_CURRENCY: Decimal("1")}
+    if not fetch or FX_FAILURE_KEY in cached:
+        return fallback, True
+    if not cache.add(FX_LOCK_KEY, 1, timeout=PRICE_REFRESH_LOCK_TIMEOUT):
+        return fallback, True
+    try:
+        rates = _fetch_rates()
+    except requests.RequestException as e:
+        logger.warning("FX_RATES_UNAVAILABLE - %s", e)
+        cache.set(FX_FAILURE_KEY, True, timeout=FX_FAILURE_TIMEOUT)
+        return fallback, True
+    finally:
+        cache.delete(FX_LOCK_KEY)
+    cache.set(
+        FX_CACHE_KEY, {"rates": rates, "fresh_until": time.time() + FX_CACHE_TIMEOUT},
+        timeout=FX_CACHE_HARD_TIMEOUT
+    )
+    return rates, False
+
+
+def cross_rate(from_currency: str, to_currency: str, fetch: bool = True):
+    """
+    Rate converting `from_currency` amounts into `to_currency`, derived from
+    the cached vector (any cell of the cross-rate matrix is one division).
+    With `fetch` False stale rates are never refreshed (see get_fx_rates).
+    Returns (rate, stale).
+    """
+    from_currency, to_currency = from_currency.lower(), to_currency.lower()
+    if from_currency == to_currency:
+        return Decimal("1"), False
+    for currency in (from_currency, to_currency):
+        if currency not in settings.SUPPORTED_CURRENCIES:
+            raise UnsupportedCurrency(f"Unsupported currency: {currency}.")
+    rates, stale = get_fx_rates(fetch)
+    if from_currency not in rates or to_currency not in rates:
+        raise UnsupportedCurrency(f"No exchange rate available for {from_currency}/{to_currency}.")
+    return rates[to_currency] / rates[from_currency], stale
+
+
+def fx_rate(currency: str, fetch: bool = True):
+    """Rate converting base currency (USD) amounts into `currency`, as (rate, stale)."""
+    return cross_rate(FX_BASE_CURRENCY, currency, fetch)
+
+
+def preferred_currency(user):
+    """The user's preferred valuation currency, falling back to the base currency."""
+    profile = getattr(user, "profile", None)
+    currency = (getattr(profile, "preferred_currency", None) or FX_BASE_CURRENCY).lower()
+    return currency if currency in settings.SUPPORTED_CURRENCIES else FX_BASE_CURRENCY
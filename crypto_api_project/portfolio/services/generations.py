@@ -0,0 +1,75 @@
+import time
+from django.core.cache import cache
+
+
+# Cache generations. Every cached response key embeds the generation of
+# the data it was built from; writes bump the generation instead of
+# looking for keys to delete. Entries of old generations are never read
+# again and simply expire.
+RESPONSE_CACHE_STATS_KEY = "response_cache_{}_{}"  # result, view name
+
+
+def _generation_key(scope, object_id):
+    return f"cache_generation_{scope}_{object_id}"
+
+
+def _get_generation(key):
+    generation = cache.get(key)
+    if generation is None:
+        # Start from the clock, so an evicted counter never repeats an old value
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def _bump_generation(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Not set (or evicted): any fresh clock value is a new generation
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+# The user's set of portfolios (portfolio list and detail)
+def user_generation(user_id):
+    return _get_generation(_generation_key("user", user_id))
+
+
+def bump_user_generation(user_id):
+    _bump_generation(_generation_key("user", user_id))
+
+
+# Everything inside one portfolio (its assets and transactions)
+def portfolio_generation(portfolio_id):
+    return _get_generation(_generation_key("portfolio", portfolio_id))
+
+
+def bump_portfolio_generation(portfolio_id):
+    _bump_generation(_generation_key("portfolio", portfolio_id))
+
+
+def record_response_cache(view_name, hit):
+    key = RESPONSE_CACHE_STATS_KEY.format("hits" if hit else "misses", view_name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def response_cache_stats(view_names):
+    """Hits, misses and hit ratio per view since the counters were created."""
+    counters = cache.get_many([
+        RESPONSE_CACHE_STATS_KEY.format(result, name)
+        for name in view_names for result in ("hits", "misses")
+    ])
+    stats = {}
+    for name in view_names:
+        hits = counters.get(RESPONSE_CACHE_STATS_KEY.format("hits", name), 0)
+        misses = counters.get(RESPONSE_CACHE_STATS_KEY.format("misses", name), 0)
+        stats[name] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None,
+        }
+    return stats
@@ -0,0 +1,220 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+import weakref
+
+import httpx
+import requests
+from django.conf import settings
+from django.dispatch import Signal
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+logger = logging.getLogger(__name__)
+
+# Sent after every upstream call with `url`, `status_code` (None on error)
+# and `duration` (seconds), so latency can be fed into metrics.
+upstream_request_finished = Signal()
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+# Async clients and their concurrency caps, one per event loop: neither
+# may be shared across loops. A persistent ASGI loop keeps its client for
+# the life of the worker; a loop that asyncio.run shuts down (WSGI runs
+# each async view in a loop of its own) closes its client on the way out.
+_async_clients = weakref.WeakKeyDictionary()
+
+
+class CappedRetry(Retry):
+    """Retry that honours Retry-After, but never waits longer than `backoff_max`."""
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        return None if retry_after is None else min(retry_after, self.backoff_max)
+
+
+def _build_session():
+    """
+    Build a keep-alive session with a bounded connection pool and
+    retries with jittered exponential backoff on 429/5xx.
+    """
+    retry = CappedRetry(
+        total=settings.UPSTREAM_MAX_RETRIES,
+        connect=settings.UPSTREAM_MAX_RETRIES,
+        read=0,  # Never replay a request whose response was lost mid-read
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset({"GET"}),
+        backoff_factor=settings.UPSTREAM_BACKOFF_FACTOR,
+        backoff_jitter=settings.UPSTREAM_BACKOFF_JITTER,
+        backoff_max=settings.UPSTREAM_BACKOFF_MAX,
+        respect_retry_after_header=True,
+        raise_on_status=False,  # Hand the last response to raise_for_status
+    )
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=settings.UPSTREAM_POOL_SIZE,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session():
+    """
+    Return the process-wide session.
+    Sockets must not be shared across processes, so a process forked by
+    gunicorn after the session was created gets a fresh one.
+    """
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                _session = _build_session()
+                _session_pid = pid
+    return _session
+
+
+def reset_session():
+    """Close and drop the process-wide session (after fork or in tests)."""
+    global _session, _session_pid
+    session, _session, _session_pid = _session, None, None
+    if session is not None:
+        session.close()
+
+
+def _reset_after_fork():
+    # The child must not close the parent's sockets, only forget them
+    global _session, _session_pid, _session_lock
+    _session, _session_pid = None, None
+    _session_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def upstream_get(url, **kwargs):
+    """
+    GET `url` through the pooled session with split connect/read timeouts.
+    Raises the same `requests` exceptions as `requests.get`.
+    """
+    kwargs.setdefault(
+        "timeout", (settings.UPSTREAM_CONNECT_TIMEOUT, settings.UPSTREAM_READ_TIMEOUT)
+    )
+    status_code = None
+    start = time.perf_counter()
+    try:
+        response = get_session().get(url, **kwargs)
+        status_code = response.status_code
+        return response
+    finally:
+        duration = time.perf_counter() - start
+        logger.debug("UPSTREAM_GET - URL: %s, Status: %s, Duration: %.3fs", url, status_code, duration)
+        upstream_request_finished.send(
+            sender=upstream_get, url=url, status_code=status_code, duration=duration
+        )
+
+
+def _build_async_client():
+    """Async counterpart of `_build_session`: keep-alive pool of UPSTREAM_POOL_SIZE."""
+    limits = httpx.Limits(
+        max_connections=settings.UPSTREAM_POOL_SIZE,
+        max_keepalive_connections=settings.UPSTREAM_POOL_SIZE,
+    )
+    timeout = httpx.Timeout(
+        settings.UPSTREAM_READ_TIMEOUT, connect=settings.UPSTREAM_CONNECT_TIMEOUT, pool=None
+    )
+    return httpx.AsyncClient(limits=limits, timeout=timeout)
+
+
+async def _close_at_loop_shutdown(client):
+    # Parked at its first yield; loop.shutdown_asyncgens() (run by
+    # asyncio.run before it closes the loop) finalises it, closing `client`
+    try:
+        yield
+    finally:
+        await client.aclose()
+
+
+async def get_async_client():
+    """
+    Return (client, semaphore) for the running event loop.
+    The semaphore caps in-flight upstream calls at the pool size, so a
+    burst of requests queues here instead of timing out on the pool.
+    """
+    loop = asyncio.get_running_loop()
+    entry = _async_clients.get(loop)
+    if entry is None:
+        client = _build_async_client()
+        # The loop only holds a weak reference to the closer: keep it with the client
+        closer = _close_at_loop_shutdown(client)
+        await closer.asend(None)
+        entry = _async_clients[loop] = (
+            client, asyncio.Semaphore(settings.UPSTREAM_POOL_SIZE), closer
+        )
+    return entry[:2]
+
+
+async def reset_async_client():
+    """Close and drop the running loop's client (in tests)."""
+    entry = _async_clients.pop(asyncio.get_running_loop(), None)
+    if entry is not None:
+        await entry[2].aclose()
+
+
+def _retry_delay(response, attempt):
+    """
+    Retry-After if the upstream sent one, else jittered exponential backoff,
+    capped at UPSTREAM_BACKOFF_MAX either way (the semaphore is held meanwhile).
+    """
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after and retry_after.isdigit():
+        delay = int(retry_after)
+    else:
+        delay = (settings.UPSTREAM_BACKOFF_FACTOR * (2 ** attempt)
+                 + random.uniform(0, settings.UPSTREAM_BACKOFF_JITTER))
+    return min(delay, settings.UPSTREAM_BACKOFF_MAX)
+
+
+async def aupstream_get(url, **kwargs):
+    """
+    Async counterpart of `upstream_get`, with the same retry policy:
+    retry connection errors and 429/5xx up to UPSTREAM_MAX_RETRIES times,
+    never a request whose response was lost mid-read.
+    Raises `httpx` exceptions; the last 429/5xx response is returned as is.
+    """
+    client, semaphore = await get_async_client()
+    status_code = None
+    start = time.perf_counter()
+    try:
+        async with semaphore:
+            for attempt in range(settings.UPSTREAM_MAX_RETRIES + 1):
+                last_attempt = attempt == settings.UPSTREAM_MAX_RETRIES
+                try:
+                    response = await client.get(url, **kwargs)
+                except (httpx.ConnectError, httpx.ConnectTimeout):
+                    if last_attempt:
+                        raise
+                    await asyncio.sleep(_retry_delay(None, attempt))
+                    continue
+                status_code = response.status_code
+                if status_code not in RETRY_STATUS_CODES or last_attempt:
+                    return response
+                await asyncio.sleep(_retry_delay(response, attempt))
+    finally:
+        duration = time.perf_counter() - start
+        logger.debug("UPSTREAM_GET - URL: %s, Status: %s, Duration: %.3fs", url, status_code, duration)
+        upstream_request_finished.send(
+            sender=aupstream_get, url=url, status_code=status_code, duration=duration
+        )
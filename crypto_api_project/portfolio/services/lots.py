@@ -0,0 +1,147 @@
+from decimal import Decimal
+from django.db.models import Sum
+from portfolio.models import LotDisposal, Portfolio, TaxLot
+from portfolio.services.trades import MONEY_PLACES
+
+
+# Open lot order per matching method, each backed by a partial index on TaxLot
+LOT_ORDERING = {
+    "FIFO": ("acquired_at", "id"),
+    "LIFO": ("-acquired_at", "-id"),
+    "HIFO": ("-cost_per_unit", "id"),
+}
+# Open lots fetched per query while matching a SELL
+LOT_FETCH_SIZE = 100
+# Whether quantity held from before lot tracking is matched ahead of an open
+# lot, given its cost: it was acquired before every lot, so FIFO takes it
+# first, LIFO last, and HIFO places it by cost (ahead on a tie, as older)
+UNTRACKED_FIRST = {
+    "FIFO": lambda lot, cost: True,
+    "LIFO": lambda lot, cost: False,
+    "HIFO": lambda lot, cost: cost >= lot.cost_per_unit,
+}
+
+
+class LotLedger:
+    """
+    Opens and consumes the tax lots of one asset.
+    The caller must hold the asset row lock, create the ledger before
+    applying the trades to the asset, feed saved transactions in
+    chronological order, then call `flush()` before committing.
+    """
+
+    def __init__(self, asset, method=None):
+        self.asset = asset
+        # Default to the matching method configured on the portfolio
+        if method is None:
+            method = Portfolio.all_objects.values_list('lot_method', flat=True).get(id=asset.portfolio_id)
+        self.ordering = LOT_ORDERING[method]
+        self.untracked_first = UNTRACKED_FIRST[method]
+        # Holding before these trades; the part not covered by open lots is
+        # valued at the average buy price (computed on the first SELL)
+        self.held = Decimal(str(asset.quantity))
+        self.untracked_cost = Decimal(str(asset.average_buy_price))
+        self.untracked = None
+        self.pending_lots = []
+        self.disposals = []
+
+    def record(self, txn):
+        if txn.transaction_type == "BUY":
+            self.buy(txn)
+        elif txn.transaction_type == "SELL":
+            self.sell(txn)
+
+    def buy(self, txn):
+        self.pending_lots.append(TaxLot(
+            asset=self.asset,
+            transaction=txn,
+            acquired_at=txn.transaction_date,
+            quantity=txn.quantity,
+            remaining_quantity=txn.quantity,
+            cost_per_unit=txn.price_per_unit,
+        ))
+
+    def sell(self, txn):
+        """Match a SELL against open lots, returns the realized gain."""
+        if self.untracked is None:
+            # Before this batch's lots are saved: only older lots count against the holding
+            open_quantity = TaxLot.objects.filter(
+                asset=self.asset, remaining_quantity__gt=0
+            ).aggregate(total=Sum('remaining_quantity'))['total'] or Decimal("0")
+            self.untracked = max(self.held - open_quantity, Decimal("0"))
+        # Lots bought earlier in this batch must be visible to the query
+        self._save_pending_lots()
+        remaining = txn.quantity
+        realized = Decimal("0")
+        while remaining > 0:
+            lots = list(
+                TaxLot.objects.filter(asset=self.asset, remaining_quantity__gt=0)
+                .order_by(*self.ordering)[:LOT_FETCH_SIZE]
+            )
+            if not lots:
+                break
+            for lot in lots:
+                if self.untracked > 0 and self.untracked_first(lot, self.untracked_cost):
+                    remaining, gain = self._dispose_untracked(txn, remaining)
+                    realized += gain
+                    if remaining <= 0:
+                        break
+                matched = min(lot.remaining_quantity, remaining)
+                lot.remaining_quantity -= matched
+                remaining -= matched
+                realized += self._dispose(txn, matched, lot.cost_per_unit, lot)
+                if remaining <= 0:
+                    break
+            TaxLot.objects.bulk_update(lots, ['remaining_quantity'])
+
+        # Quantity held from before lot tracking that sorts after every open lot
+        if remaining > 0:
+            realized += self._dispose(txn, remaining, self.untracked_cost, None)
+            self.untracked = max(self.untracked - remaining, Decimal("0"))
+        return realized
+
+    def _dispose_untracked(self, txn, remaining):
+        matched = min(self.untracked, remaining)
+        self.untracked -= matched
+        return remaining - matched, self._dispose(txn, matched, self.untracked_cost, None)
+
+    def flush(self):
+        self._save_pending_lots()
+        LotDisposal.objects.bulk_create(self.disposals, batch_size=1000)
+        self.disposals = []
+
+    def _save_pending_lots(self):
+        if self.pending_lots:
+            TaxLot.objects.bulk_create(self.pending_lots, batch_size=1000)
+            self.pending_lots = []
+
+    def _dispose(self, txn, quantity, cost_per_unit, lot):
+        gain = ((txn.price_per_unit - cost_per_unit) * quantity).quantize(MONEY_PLACES)
+        self.disposals.append(LotDisposal(
+            asset=self.asset,
+            lot=lot,
+            transaction=txn,
+            quantity=quantity,
+            cost_per_unit=cost_per_unit,
+            proceeds_per_unit=txn.price_per_unit,
+            realized_gain=gain,
+            disposed_at=txn.transaction_date,
+        ))
+        return gain
+
+
+def realized_gains(portfolio, start=None, end=None):
+    """
+    Lot-matched realized gains of a portfolio per coin, for disposals in
+    [start, end), computed in a single grouped query.
+    """
+    disposals = LotDisposal.objects.filter(asset__portfolio=portfolio)
+    if start is not None:
+        disposals = disposals.filter(disposed_at__gte=start)
+    if end is not None:
+        disposals = disposals.filter(disposed_at__lt=end)
+    return list(
+        disposals.values('asset__coin_id')
+        .annotate(quantity=Sum('quantity'), realized_gain=Sum('realized_gain'))
+        .order_by('asset__coin_id')
+    )
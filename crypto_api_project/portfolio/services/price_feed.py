@@ -0,0 +1,171 @@
+import asyncio
+import json
+import logging
+import threading
+import weakref
+from collections import defaultdict
+
+import redis
+import redis.asyncio
+from django.conf import settings
+from django_redis import get_redis_connection
+
+
+logger = logging.getLogger(__name__)
+
+# Pub/sub channel of freshly fetched prices.
+# Messages are {"currency": "usd", "prices": {coin_id: price}}.
+PRICE_CHANNEL = "coin_prices"
+
+# Streams value positions from prices in the FX base currency (see services/fx.py)
+FEED_CURRENCY = "usd"
+
+# Pause before listening again after the Redis connection dropped (seconds)
+LISTEN_RETRY_DELAY = 1
+
+# One broadcaster per event loop (one per ASGI worker process in practice)
+_broadcasters = weakref.WeakKeyDictionary()
+_broadcasters_lock = threading.Lock()
+
+
+def publish_prices(prices, currency: str):
+    """
+    Announce prices just written to the cache to the live streams.
+    With Redis configured every process hears them, prices fetched by the
+    background refresher included; otherwise only streams of this process.
+    Never raises: live streams are best effort.
+    """
+    if not prices:
+        return
+    message = {"currency": currency.lower(), "prices": prices}
+    if settings.REDIS_URL:
+        try:
+            get_redis_connection("default").publish(PRICE_CHANNEL, json.dumps(message))
+        except redis.RedisError as e:
+            logger.warning("PRICE_PUBLISH_FAILED - %s", e)
+        return
+    with _broadcasters_lock:
+        broadcasters = list(_broadcasters.values())
+    for broadcaster in broadcasters:
+        broadcaster.publish_threadsafe(message)
+
+
+def get_broadcaster():
+    """Return the broadcaster of the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _broadcasters_lock:
+        broadcaster = _broadcasters.get(loop)
+        if broadcaster is None:
+            broadcaster = _broadcasters[loop] = PriceBroadcaster(loop)
+    return broadcaster
+
+
+class Subscription:
+    """
+    One stream's interest in a set of coins.
+    Only the latest price per coin is kept until the stream reads it, so
+    a slow or idle client costs one small dict, never a growing queue.
+    """
+
+    def __init__(self, coin_ids):
+        self.coin_ids = {coin_id.lower() for coin_id in coin_ids}
+        self.pending = {}
+        self.ready = asyncio.Event()
+
+    def offer(self, prices):
+        for coin_id in self.coin_ids.intersection(prices):
+            self.pending[coin_id] = prices[coin_id]
+            self.ready.set()
+
+    async def next(self, timeout):
+        """Prices received since the last call, or {} after `timeout` seconds without any."""
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return {}
+        self.ready.clear()
+        prices, self.pending = self.pending, {}
+        return prices
+
+
+class PriceBroadcaster:
+    """
+    Fans price updates out to the subscriptions of one event loop.
+    Subscriptions are indexed by coin, so an update only touches the
+    streams holding one of its coins. With Redis configured a single
+    pub/sub connection per loop feeds every stream.
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.by_coin = defaultdict(set)
+        self.subscriptions = set()
+        self.listener = None
+
+    def subscribe(self, coin_ids):
+        subscription = Subscription(coin_ids)
+        self.subscriptions.add(subscription)
+        self._index(subscription)
+        if settings.REDIS_URL and self.listener is None:
+            self.listener = self.loop.create_task(self.listen())
+        return subscription
+
+    def resubscribe(self, subscription, coin_ids):
+        """Change the coins of a subscription (the portfolio's positions changed)."""
+        self._unindex(subscription)
+        subscription.coin_ids = {coin_id.lower() for coin_id in coin_ids}
+        self._index(subscription)
+
+    def unsubscribe(self, subscription):
+        self._unindex(subscription)
+        self.subscriptions.discard(subscription)
+        # Nobody left to feed, drop the Redis connection
+        if not self.subscriptions and self.listener is not None:
+            self.listener.cancel()
+            self.listener = None
+
+    def _index(self, subscription):
+        for coin_id in subscription.coin_ids:
+            self.by_coin[coin_id].add(subscription)
+
+    def _unindex(self, subscription):
+        for coin_id in subscription.coin_ids:
+            subscribers = self.by_coin.get(coin_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.by_coin[coin_id]
+
+    def dispatch(self, message):
+        """Hand a price message to the interested subscriptions (on the loop's thread)."""
+        if message.get("currency") != FEED_CURRENCY:
+            return
+        prices = message.get("prices", {})
+        targets = set()
+        for coin_id in prices:
+            targets.update(self.by_coin.get(coin_id, ()))
+        for subscription in targets:
+            subscription.offer(prices)
+
+    def publish_threadsafe(self, message):
+        try:
+            self.loop.call_soon_threadsafe(self.dispatch, message)
+        except RuntimeError:
+            # The loop is closed, nobody is listening any more
+            pass
+
+    async def listen(self):
+        """Feed dispatch() from Redis pub/sub until cancelled, reconnecting on errors."""
+        while True:
+            client = redis.asyncio.Redis.from_url(settings.REDIS_URL)
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(PRICE_CHANNEL)
+                async for message in pubsub.listen():
+                    self.dispatch(json.loads(message["data"]))
+            except redis.RedisError as e:
+                logger.warning("PRICE_FEED_DISCONNECTED - %s", e)
+            finally:
+                await pubsub.aclose()
+                await client.aclose()
+            await asyncio.sleep(LISTEN_RETRY_DELAY)
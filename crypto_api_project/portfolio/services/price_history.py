@@ -0,0 +1,126 @@
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from portfolio.models import PricePoint
+from portfolio.services.coingecko import get_market_chart
+
+
+def bucket_start(moment, bucket=None):
+    """Start of the PRICE_HISTORY_BUCKET-sized bucket containing `moment`."""
+    bucket = bucket or settings.PRICE_HISTORY_BUCKET
+    epoch = int(moment.timestamp()) // bucket * bucket
+    return datetime.fromtimestamp(epoch, tz=dt_timezone.utc)
+
+
+@transaction.atomic
+def merge_prices(currency: str, points):
+    """
+    Fold (coin_id, moment, price) points, in chronological order, into the
+    OHLC buckets of the price history. Existing buckets are widened, not
+    replaced: they keep their open when it was observed earlier than the
+    new points and their close when it was observed later (e.g. a
+    backfill after the refresher).
+    One read plus batched writes, whatever the point count.
+    Returns the number of buckets touched.
+    """
+    currency = currency.lower()
+    buckets = {}
+    for coin_id, moment, price in points:
+        price = Decimal(str(price))
+        key = (coin_id.lower(), bucket_start(moment))
+        ohlc = buckets.get(key)
+        if ohlc is None:
+            buckets[key] = [price, price, price, price, moment, moment]
+        else:
+            ohlc[1] = max(ohlc[1], price)
+            ohlc[2] = min(ohlc[2], price)
+            if moment < ohlc[4]:
+                ohlc[0], ohlc[4] = price, moment
+            if moment >= ohlc[5]:
+                ohlc[3], ohlc[5] = price, moment
+    if not buckets:
+        return 0
+
+    timestamps = [timestamp for _, timestamp in buckets]
+    existing = {
+        (point.coin_id, point.timestamp): point
+        for point in PricePoint.objects.select_for_update().filter(
+            currency=currency,
+            coin_id__in={coin_id for coin_id, _ in buckets},
+            timestamp__gte=min(timestamps),
+            timestamp__lte=max(timestamps),
+        )
+    }
+    created, updated = [], []
+    for (coin_id, timestamp), (open_, high, low, close, open_at, close_at) in buckets.items():
+        point = existing.get((coin_id, timestamp))
+        if point is None:
+            created.append(PricePoint(
+                coin_id=coin_id, currency=currency, timestamp=timestamp,
+                open=open_, high=high, low=low, close=close, open_at=open_at, close_at=close_at,
+            ))
+        else:
+            point.high = max(point.high, high)
+            point.low = min(point.low, low)
+            if point.open_at is not None and open_at < point.open_at:
+                point.open, point.open_at = open_, open_at
+            if point.close_at is None or close_at >= point.close_at:
+                point.close, point.close_at = close, close_at
+            updated.append(point)
+    # A concurrent writer may have created the same bucket meanwhile; keep theirs
+    PricePoint.objects.bulk_create(created, batch_size=1000, ignore_conflicts=True)
+    PricePoint.objects.bulk_update(updated, ['open', 'high', 'low', 'close', 'open_at', 'close_at'],
+                                   batch_size=1000)
+    return len(buckets)
+
+
+def record_prices(prices: dict, currency: str = "usd", at=None):
+    """Add spot prices ({coin_id: price}) observed at `at` (now by default)."""
+    at = at or timezone.now()
+    return merge_prices(currency, ((coin_id, at, price) for coin_id, price in prices.items()))
+
+
+def backfill_price_history(coin_id: str, currency: str = "usd", days: int = 1):
+    """
+    Load the last `days` days of a coin's prices from CoinGecko's
+    market_chart into the local history.
+    Returns:
+        dict: {"success": bool, "buckets": int, "message": str | None}.
+    """
+    chart = get_market_chart(coin_id, currency, days)
+    if not chart["success"]:
+        return {"success": False, "buckets": 0, "message": chart["message"]}
+    points = (
+        (coin_id, datetime.fromtimestamp(timestamp_ms / 1000, tz=dt_timezone.utc), price)
+        for timestamp_ms, price in sorted(chart["prices"])
+    )
+    return {"success": True, "buckets": merge_prices(currency, points), "message": None}
+
+
+def price_at(coin_id: str, currency: str, moment, max_age=None):
+    """
+    Closing price of the latest bucket starting at or before `moment`, or
+    None if there is none (or it is older than the `max_age` timedelta).
+    """
+    point = (
+        PricePoint.objects
+        .filter(coin_id=coin_id.lower(), currency=currency.lower(), timestamp__lte=moment)
+        .order_by('-timestamp')
+        .values('timestamp', 'close')
+        .first()
+    )
+    if point is None or (max_age is not None and point['timestamp'] < moment - max_age):
+        return None
+    return point['close']
+
+
+def price_history(coin_id: str, currency: str, start, end):
+    """OHLC buckets of a coin in [start, end), oldest first."""
+    return list(
+        PricePoint.objects
+        .filter(coin_id=coin_id.lower(), currency=currency.lower(), timestamp__gte=start, timestamp__lt=end)
+        .order_by('timestamp')
+        .values('timestamp', 'open', 'high', 'low', 'close')
+    )
@@ -0,0 +1,126 @@
+import json
+from decimal import Decimal
+from asgiref.sync import sync_to_async
+from portfolio.services.coingecko import aget_coin_prices
+from portfolio.services.fx import FX_BASE_CURRENCY, fx_rate
+from portfolio.services.generations import portfolio_generation
+from portfolio.services.price_feed import get_broadcaster
+from portfolio.services.summary import position_rows
+
+
+# Seconds without a price update after which a stream sends a keep-alive
+# comment and checks whether trades changed the portfolio's positions
+STREAM_HEARTBEAT = 15
+
+
+# Payloads hold Decimals and plain JSON types only. Decimals become floats,
+# as with the DRF encoder, but without its isinstance chain on every value
+# (one price tick formats an event for every open stream).
+def format_event(name, data):
+    return f"event: {name}\ndata: {json.dumps(data, default=float)}\n\n"
+
+
+class PortfolioStream:
+    """
+    Server-sent events for one client watching one portfolio.
+    - `snapshot`: every open position at its latest price, with totals.
+      Sent first, and again whenever trades change the positions.
+    - `prices`: only the positions whose price moved, with the change in
+      value since the previous event, and the new totals.
+    Amounts are converted from USD to `currency` like the summary.
+    Updates come from the process-wide price broadcaster, the stream
+    never polls the database or CoinGecko on its own.
+    """
+
+    def __init__(self, portfolio_id, currency):
+        self.portfolio_id = portfolio_id
+        self.currency = currency
+        self.rate = Decimal("1")
+        self.generation = None
+        self.positions = {}  # lowercase coin id -> position row
+        self.values = {}  # lowercase coin id -> valued position
+        # Running totals of the valued positions, in `currency`
+        self.value_total = Decimal("0")
+        self.cost_total = Decimal("0")
+
+    async def load(self):
+        """(Re)read the open positions, the FX rate and the cached prices."""
+        self.generation = await sync_to_async(portfolio_generation)(self.portfolio_id)
+        self.rate, _ = await sync_to_async(fx_rate, thread_sensitive=False)(self.currency)
+        self.positions = {
+            row['coin_id'].lower(): row async for row in position_rows(self.portfolio_id)
+            if row['total_quantity'] > 0
+        }
+        self.values = {}
+        self.value_total = self.cost_total = Decimal("0")
+        price_response = await aget_coin_prices(list(self.positions), currency=FX_BASE_CURRENCY)
+        self.revalue(price_response["prices"])
+
+    def revalue(self, prices):
+        """Value the positions of the coins in `prices`; returns the valued positions."""
+        changed = []
+        for coin_id, price in prices.items():
+            row = self.positions.get(coin_id.lower())
+            if row is None or price is None:
+                continue
+            price = Decimal(str(price)) * self.rate
+            value = price * row['total_quantity']
+            cost_basis = row['cost_basis'] * self.rate
+            previous = self.values.get(coin_id.lower())
+            if previous is None:
+                self.cost_total += cost_basis
+            else:
+                self.value_total -= previous["value"]
+            self.value_total += value
+            position = {
+                "coin_id": row['coin_id'],
+                "quantity": row['total_quantity'],
+                "price": price,
+                "value": value,
+                "unrealized_profit_loss": value - cost_basis,
+                "value_change": value - previous["value"] if previous else None,
+            }
+            self.values[coin_id.lower()] = position
+            changed.append(position)
+        return changed
+
+    def totals(self):
+        return {
+            "portfolio": self.portfolio_id,
+            "currency": self.currency,
+            "current_value": self.value_total,
+            "unrealized_profit_loss": self.value_total - self.cost_total,
+        }
+
+    def snapshot_event(self):
+        return format_event("snapshot", {**self.totals(), "positions": list(self.values.values())})
+
+    def prices_event(self, prices):
+        before = self.value_total
+        changed = self.revalue(prices)
+        totals = self.totals()
+        return format_event("prices", {
+            **totals,
+            "value_change": totals["current_value"] - before,
+            "positions": changed,
+        })
+
+    async def events(self):
+        """The event stream; call `load()` first. Runs until the client disconnects."""
+        broadcaster = get_broadcaster()
+        subscription = broadcaster.subscribe(self.positions)
+        try:
+            yield self.snapshot_event()
+            while True:
+                prices = await subscription.next(timeout=STREAM_HEARTBEAT)
+                if prices:
+                    yield self.prices_event(prices)
+                elif await sync_to_async(portfolio_generation)(self.portfolio_id) != self.generation:
+                    # Trades changed the positions while the prices stood still
+                    await self.load()
+                    broadcaster.resubscribe(subscription, self.positions)
+                    yield self.snapshot_event()
+                else:
+                    yield ": keep-alive\n\n"
+        finally:
+            broadcaster.unsubscribe(subscription)
@@ -0,0 +1,38 @@
+from django.db import transaction
+from portfolio.models import Asset, Portfolio
+
+
+# Rows removed per delete statement (and per database transaction)
+PURGE_BATCH_SIZE = 1000
+
+
+def purgeable_portfolios(deleted_before):
+    """Ids of portfolios soft-deleted before `deleted_before`, oldest deletion first."""
+    return Portfolio.all_objects.filter(
+        active=False, deleted_at__lt=deleted_before
+    ).order_by('deleted_at').values_list('id', flat=True)
+
+
+def purge_portfolio(portfolio_id, batch_size=PURGE_BATCH_SIZE):
+    """
+    Remove a soft-deleted portfolio for good, with its assets and history.
+
+    Transactions go `batch_size` at a time, each batch in its own database
+    transaction, so locks stay short however long the history is.
+    Returns the number of transactions removed.
+    """
+    removed = 0
+    for asset in Asset.objects.filter(portfolio_id=portfolio_id, portfolio__active=False):
+        while True:
+            batch = list(asset.transactions.values_list('id', flat=True)[:batch_size])
+            if not batch:
+                break
+            with transaction.atomic():
+                # Tax lots and disposals cascade. Going through asset.transactions
+                # hands the asset to the delete signals instead of a query per row.
+                asset.transactions.filter(id__in=batch).delete()
+            removed += len(batch)
+        asset.delete()
+    # Snapshots and import jobs cascade
+    Portfolio.all_objects.filter(id=portfolio_id, active=False).delete()
+    return removed
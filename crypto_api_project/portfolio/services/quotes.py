@@ -0,0 +1,46 @@
+from decimal import Decimal, InvalidOperation
+from django.core import signing
+
+
+QUOTE_SALT = "portfolio.price-quote"
+
+
+class QuoteError(Exception):
+    """Raised when a price quote token is invalid, expired or for another coin."""
+
+
+def issue_quote(coin_id: str, price, currency: str = "usd") -> str:
+    """
+    Sign a price so a client can place a transaction at it later.
+    The token is timestamped; `resolve_quote` enforces the max age.
+    """
+    payload = {
+        "coin_id": coin_id,
+        "currency": currency.lower(),
+        "price": str(price),
+    }
+    return signing.dumps(payload, salt=QUOTE_SALT, compress=True)
+
+
+def resolve_quote(token: str, coin_id: str, currency: str = "usd", max_age=None) -> Decimal:
+    """
+    Return the quoted price from a token issued by `issue_quote`.
+    Args:
+        token (str): The signed quote token.
+        coin_id (str): The coin the transaction is for.
+        currency (str): The transaction currency.
+        max_age (int): Max staleness of the quote in seconds.
+    """
+    try:
+        payload = signing.loads(token, salt=QUOTE_SALT, max_age=max_age)
+    except signing.SignatureExpired:
+        raise QuoteError("Price quote has expired.")
+    except signing.BadSignature:
+        raise QuoteError("Invalid price quote.")
+
+    if payload.get("coin_id") != coin_id or payload.get("currency") != currency.lower():
+        raise QuoteError("Price quote does not match this asset.")
+    try:
+        return Decimal(payload["price"])
+    except (KeyError, InvalidOperation):
+        raise QuoteError("Invalid price quote.")
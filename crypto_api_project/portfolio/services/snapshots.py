@@ -0,0 +1,146 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from django.conf import settings
+from django.db.models import F, Sum
+from django.utils import timezone
+from portfolio.models import Asset, PortfolioSnapshot
+from portfolio.services.coingecko import get_coin_prices
+from portfolio.services.fx import FX_BASE_CURRENCY
+from portfolio.services.price_history import price_at
+from portfolio.services.summary import MONEY_FIELD
+from portfolio.services.trades import MONEY_PLACES
+
+
+# History resolutions: ?interval= -> bucket size in seconds
+HISTORY_INTERVALS = {
+    "hour": 3600,
+    "day": 86400,
+    "week": 7 * 86400,
+}
+SERIES_FIELDS = ('taken_at', 'value', 'cost_basis', 'unrealized_profit_loss', 'realized_profit_loss')
+# Amounts of a series point, stored in the base currency
+SERIES_MONEY_FIELDS = SERIES_FIELDS[1:]
+# Overwritten when a later run in the same slot writes a complete row
+SNAPSHOT_UPDATE_FIELDS = ('quantity', 'price', 'value', 'cost_basis', 'unrealized_profit_loss',
+                          'realized_profit_loss')
+
+
+def snapshot_time(now=None, interval=None):
+    """Floor a time to the snapshot interval, so re-runs within one interval land on the same slot."""
+    now = now or timezone.now()
+    interval = interval or settings.SNAPSHOT_INTERVAL
+    epoch = int(now.timestamp()) // interval * interval
+    return datetime.fromtimestamp(epoch, tz=dt_timezone.utc)
+
+
+def _money(value):
+    return value.quantize(MONEY_PLACES) if value is not None else None
+
+
+def take_snapshots(taken_at=None):
+    """
+    Record the value of every active portfolio and its positions at
+    `taken_at` (the current slot by default), in the base currency like
+    the cost basis and P/L it is compared with, from one grouped query over
+    all assets and one batched price lookup. Coins the lookup can't price
+    fall back to the local price history, if it is recent enough.
+    A portfolio holding a coin without a price gets a totals row without
+    value or unrealized P/L rather than an understated one. A later run in
+    the same slot overwrites existing rows, except with such incomplete ones.
+    Returns (number of rows written, list of coin ids without a price).
+    """
+    taken_at = taken_at or snapshot_time()
+    rows = list(
+        Asset.objects.filter(portfolio__active=True)
+        .values('portfolio_id', 'coin_id')
+        .annotate(
+            total_quantity=Sum('quantity'),
+            cost_basis=Sum(F('quantity') * F('average_buy_price'), output_field=MONEY_FIELD),
+            total_realized=Sum('realized_profit_loss'),
+        )
+        .order_by('portfolio_id', 'coin_id')
+    )
+    held = {row['coin_id'] for row in rows if row['total_quantity'] > 0}
+    prices = dict(get_coin_prices(held, currency=FX_BASE_CURRENCY)["prices"]) if held else {}
+    max_age = timedelta(seconds=settings.SNAPSHOT_INTERVAL)
+    for coin_id in held - set(prices):
+        price = price_at(coin_id, FX_BASE_CURRENCY, timezone.now(), max_age=max_age)
+        if price is not None:
+            prices[coin_id] = price
+
+    zero = Decimal("0")
+    snapshots, totals = [], {}
+    for row in rows:
+        total = totals.setdefault(row['portfolio_id'], {
+            "value": zero, "cost_basis": zero, "unrealized": zero, "realized": zero, "complete": True,
+        })
+        total["cost_basis"] += row['cost_basis']
+        total["realized"] += row['total_realized']
+        # Closed positions only add to the realized total
+        if row['total_quantity'] <= 0:
+            continue
+
+        price = prices.get(row['coin_id'])
+        price = Decimal(str(price)) if price is not None else None
+        value = price * row['total_quantity'] if price is not None else None
+        unrealized = value - row['cost_basis'] if value is not None else None
+        if value is not None:
+            total["value"] += value
+            total["unrealized"] += unrealized
+        else:
+            total["complete"] = False
+        snapshots.append(PortfolioSnapshot(
+            portfolio_id=row['portfolio_id'],
+            coin_id=row['coin_id'],
+            taken_at=taken_at,
+            quantity=row['total_quantity'],
+            price=price,
+            value=_money(value),
+            cost_basis=_money(row['cost_basis']),
+            unrealized_profit_loss=_money(unrealized),
+            realized_profit_loss=_money(row['total_realized']),
+        ))
+
+    for portfolio_id, total in totals.items():
+        snapshots.append(PortfolioSnapshot(
+            portfolio_id=portfolio_id,
+            taken_at=taken_at,
+            value=_money(total["value"]) if total["complete"] else None,
+            cost_basis=_money(total["cost_basis"]),
+            unrealized_profit_loss=_money(total["unrealized"]) if total["complete"] else None,
+            realized_profit_loss=_money(total["realized"]),
+        ))
+    PortfolioSnapshot.objects.bulk_create(
+        [snapshot for snapshot in snapshots if snapshot.value is not None], batch_size=1000,
+        update_conflicts=True, unique_fields=('portfolio', 'coin_id', 'taken_at'),
+        update_fields=SNAPSHOT_UPDATE_FIELDS,
+    )
+    # Never blank a row an earlier run could price
+    PortfolioSnapshot.objects.bulk_create(
+        [snapshot for snapshot in snapshots if snapshot.value is None], batch_size=1000, ignore_conflicts=True
+    )
+    return len(snapshots), sorted(held - set(prices))
+
+
+def portfolio_history(portfolio, start, end, interval="day", coin_id="", rate=None):
+    """
+    Value series of a portfolio (or of one of its coins) in [start, end),
+    downsampled to the last snapshot of each interval bucket. Amounts are
+    multiplied by `rate` (base currency -> valuation currency) if given.
+    """
+    bucket_size = HISTORY_INTERVALS[interval]
+    rows = (
+        PortfolioSnapshot.objects
+        .filter(portfolio=portfolio, coin_id=coin_id, taken_at__gte=start, taken_at__lt=end)
+        .order_by('taken_at')
+        .values(*SERIES_FIELDS)
+    )
+    series = {}
+    for row in rows:
+        # Later snapshots overwrite earlier ones of the same bucket
+        series[int(row['taken_at'].timestamp()) // bucket_size] = row
+    if rate is not None and rate != 1:
+        for row in series.values():
+            for field in SERIES_MONEY_FIELDS:
+                row[field] = _money(row[field] * rate if row[field] is not None else None)
+    return list(series.values())
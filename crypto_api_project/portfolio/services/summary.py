@@ -0,0 +1,102 @@
+from decimal import Decimal
+from asgiref.sync import sync_to_async
+from django.db.models import DecimalField, F, Sum
+from portfolio.models import Asset
+from portfolio.services.aggregates import portfolio_aggregate
+from portfolio.services.coingecko import aget_coin_prices, get_coin_prices
+from portfolio.services.fx import FX_BASE_CURRENCY, fx_rate
+
+
+# Wide enough for quantity (20, 8) x price (20, 2) products
+MONEY_FIELD = DecimalField(max_digits=40, decimal_places=10)
+
+
+def build_portfolio_summary(portfolio, currency: str = "usd"):
+    """
+    Summarize a portfolio from one grouped query over its assets plus one
+    batched price lookup for the coins still held. Portfolio-wide totals
+    and counts come from its aggregate row (load it with
+    select_related('aggregate') to save the query).
+    Amounts are stored and priced in USD and converted to `currency` with
+    the current FX rate (raises UnsupportedCurrency).
+    Returns (summary dict, list of coin ids priced from a stale cache entry,
+    plus "fx" when the exchange rate itself is stale).
+    """
+    rate, fx_stale = fx_rate(currency)
+    aggregate = portfolio_aggregate(portfolio)
+    rows = list(position_rows(portfolio))
+    held = [row['coin_id'] for row in rows if row['total_quantity'] > 0]
+    price_response = get_coin_prices(held, currency=FX_BASE_CURRENCY)
+    return _summarize(portfolio, aggregate, currency, rows, price_response, rate, fx_stale)
+
+
+async def abuild_portfolio_summary(portfolio, currency: str = "usd"):
+    """
+    Async version of `build_portfolio_summary`, for views served under ASGI.
+    The FX rate may need an upstream call, so it runs in a worker thread
+    rather than on the event loop.
+    """
+    rate, fx_stale = await sync_to_async(fx_rate, thread_sensitive=False)(currency)
+    aggregate = await sync_to_async(portfolio_aggregate)(portfolio)
+    rows = [row async for row in position_rows(portfolio)]
+    held = [row['coin_id'] for row in rows if row['total_quantity'] > 0]
+    price_response = await aget_coin_prices(held, currency=FX_BASE_CURRENCY)
+    return _summarize(portfolio, aggregate, currency, rows, price_response, rate, fx_stale)
+
+
+# One row per coin with the totals of the portfolio's assets in it
+def position_rows(portfolio):
+    return (
+        Asset.objects.filter(portfolio=portfolio)
+        .values('coin_id')
+        .annotate(
+            total_quantity=Sum('quantity'),
+            cost_basis=Sum(F('quantity') * F('average_buy_price'), output_field=MONEY_FIELD),
+            total_realized=Sum('realized_profit_loss'),
+        )
+        .order_by('coin_id')
+    )
+
+
+def _summarize(portfolio, aggregate, currency, rows, price_response, rate, fx_stale):
+    prices = price_response["prices"]
+    zero = Decimal("0")
+    totals = {
+        "total_invested": aggregate.cost_basis * rate,
+        "realized_profit_loss": aggregate.realized_profit_loss * rate,
+        "current_value": zero,
+        "unrealized_profit_loss": zero,
+    }
+    positions = []
+    for row in rows:
+        price = prices.get(row['coin_id'])
+        price = Decimal(str(price)) * rate if price is not None else None
+        cost_basis = row['cost_basis'] * rate
+        realized = row['total_realized'] * rate
+        current_value = price * row['total_quantity'] if price is not None else None
+        unrealized = current_value - cost_basis if current_value is not None else None
+
+        if current_value is not None:
+            totals["current_value"] += current_value
+            totals["unrealized_profit_loss"] += unrealized
+        positions.append({
+            "coin_id": row['coin_id'],
+            "quantity": row['total_quantity'],
+            "cost_basis": cost_basis,
+            "realized_profit_loss": realized,
+            "current_price": price,
+            "current_value": current_value,
+            "unrealized_profit_loss": unrealized,
+        })
+
+    summary = {
+        "portfolio": portfolio.id,
+        "name": portfolio.name,
+        "currency": currency,
+        "asset_count": aggregate.asset_count,
+        "position_count": aggregate.position_count,
+        "transaction_count": aggregate.transaction_count,
+        **totals,
+        "positions": positions,
+    }
+    return summary, price_response["stale"] + (["fx"] if fx_stale else [])
@@ -0,0 +1,44 @@
+from decimal import Decimal
+
+
+# Same precision as Asset.average_buy_price / realized_profit_loss, so an
+# in-memory replay matches what sequential saves would have stored.
+MONEY_PLACES = Decimal("0.01")
+
+
+class InsufficientBalance(Exception):
+    """Raised when a SELL is larger than the asset's current quantity."""
+
+
+def apply_trade(asset, transaction_type: str, quantity: Decimal, price_per_unit: Decimal) -> Decimal:
+    """
+    Apply one BUY/SELL to the asset's running quantity, average buy price
+    and realized profit/loss (in memory, the caller saves the asset).
+    Returns the total value of the trade.
+    """
+    # Unsaved assets still hold the float field defaults
+    asset.quantity = Decimal(str(asset.quantity))
+    asset.average_buy_price = Decimal(str(asset.average_buy_price))
+    asset.realized_profit_loss = Decimal(str(asset.realized_profit_loss))
+
+    if transaction_type == "BUY":
+        # Calculate the new average buy price based on the existing quantity and price plus the new purchase
+        total_cost = (asset.average_buy_price * asset.quantity) + (price_per_unit * quantity)
+        total_quantity = asset.quantity + quantity
+
+        # Avoid division by zero error
+        if total_quantity > 0:
+            asset.average_buy_price = (total_cost / total_quantity).quantize(MONEY_PLACES)
+        asset.quantity = total_quantity
+    elif transaction_type == "SELL":
+        # check if user is trying to sell more than they own
+        if quantity > asset.quantity:
+            raise InsufficientBalance("Insufficient balance.")
+
+        # Calculate realized profit/loss for the sold quantity
+        profit_loss = (price_per_unit - asset.average_buy_price) * quantity
+        asset.realized_profit_loss = (asset.realized_profit_loss + profit_loss).quantize(MONEY_PLACES)
+
+        # Sell transaction reduces the quantity
+        asset.quantity -= quantity
+    return price_per_unit * quantity
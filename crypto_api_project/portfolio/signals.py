@@ -1,7 +1,9 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from .models import CustomUser, UserProfile
+from .models import Asset, CustomUser, Portfolio, Transaction, UserProfile
 from django.conf import settings
+from portfolio.services.generations import bump_portfolio_generation, bump_user_generation
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
 def create_user_profile(sender, instance, created, **kwargs):
@@ -9,3 +11,28 @@ def create_user_profile(sender, instance, created, **kwargs):
     if created:
         # Create an associated UserProfile for the new user.
         UserProfile.objects.create(user=instance) 
+
+
+# Invalidate cached responses once a write commits (see portfolio/response_cache.py).
+# Bumping after commit keeps a concurrent reader from caching pre-commit
+# data under the new generation.
+@receiver([post_save, post_delete], sender=Portfolio)
+def invalidate_portfolio(sender, instance, **kwargs):
+    owner_id, portfolio_id = instance.owner_id, instance.id
+
+    def bump():
+        bump_user_generation(owner_id)
+        bump_portfolio_generation(portfolio_id)
+    transaction.on_commit(bump)
+
+@receiver([post_save, post_delete], sender=Asset)
+def invalidate_asset(sender, instance, **kwargs):
+    if instance.portfolio_id:
+        transaction.on_commit(lambda: bump_portfolio_generation(instance.portfolio_id))
+
+# bulk_create skips signals; bulk writers save the asset afterwards, which bumps
+@receiver([post_save, post_delete], sender=Transaction)
+def invalidate_transaction(sender, instance, **kwargs):
+    portfolio_id = instance.asset.portfolio_id if instance.asset_id else None
+    if portfolio_id:
+        transaction.on_commit(lambda: bump_portfolio_generation(portfolio_id))
@@ -0,0 +1,88 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeCoinGecko:
+    """
+    Minimal local stand-in for the CoinGecko API used in tests.
+    - `prices` maps coin id -> {currency: price}.
+    - `charts` maps coin id -> [[timestamp_ms, price], ...] served by
+      /coins/<id>/market_chart.
+    - `statuses` is a queue of status codes to answer with before the
+      normal 200 response (e.g. [503] to exercise retries).
+    - `retry_after` is sent as the Retry-After header of those answers.
+    - `requests` records (path, query) per call; `client_ports` records
+      the client side port, so keep-alive reuse can be asserted.
+    """
+
+    def __init__(self, prices=None):
+        self.prices = prices or {}
+        self.charts = {}
+        self.statuses = []
+        self.retry_after = None
+        self.requests = []
+        self.client_ports = []
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/api/v3"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                query = parse_qs(parsed.query)
+                fake.requests.append((parsed.path, query))
+                fake.client_ports.append(self.client_address[1])
+
+                if fake.statuses:
+                    headers = {"Retry-After": fake.retry_after} if fake.retry_after else {}
+                    self._send(fake.statuses.pop(0), {}, headers)
+                elif parsed.path.endswith("/simple/price"):
+                    ids = query.get("ids", [""])[0].split(",")
+                    currencies = query.get("vs_currencies", ["usd"])[0].split(",")
+                    body = {
+                        coin_id: {c: fake.prices[coin_id][c] for c in currencies if c in fake.prices[coin_id]}
+                        for coin_id in ids if coin_id in fake.prices
+                    }
+                    self._send(200, body)
+                elif parsed.path.endswith("/market_chart"):
+                    coin_id = parsed.path.split("/")[-2]
+                    if coin_id in fake.charts:
+                        self._send(200, {"prices": fake.charts[coin_id]})
+                    else:
+                        self._send(404, {"error": "coin not found"})
+                else:
+                    self._send(404, {"error": "not found"})
+
+            def _send(self, status_code, body, headers=None):
+                payload = json.dumps(body).encode()
+                self.send_response(status_code)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,105 @@
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from rest_framework.test import APITestCase
+from django.urls import reverse
+from rest_framework import status
+from portfolio.models import Asset, Portfolio, PortfolioAggregate, Transaction
+from portfolio.services.aggregates import verify_aggregate
+from django.contrib.auth import get_user_model
+
+
+# Portfolio totals kept up to date by the API writers
+class PortfolioAggregateTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        # Asset and trade responses are valued at live prices
+        patcher = mock.patch("portfolio.services.coingecko.upstream_get")
+        patcher.start().return_value.json.return_value = {"bitcoin": {"usd": 30000}, "ethereum": {"usd": 2000}}
+        self.addCleanup(patcher.stop)
+        self.user = get_user_model().objects.create_user(
+            username="aggregateuser",
+            email="aggregateuser@example.com",
+            password="testpassword123"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.portfolio = Portfolio.objects.create(owner=self.user, name="Aggregated Portfolio")
+        self.asset = self.add_asset("bitcoin")
+
+    def add_asset(self, coin_id):
+        response = self.client.post(reverse('portfolio-assets-list', kwargs={'portfolio_pk': self.portfolio.pk}),
+                                    {"coin_id": coin_id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return Asset.objects.get(pk=response.data['id'])
+
+    def transactions_url(self, asset):
+        return reverse('asset-transactions-list', kwargs={'portfolio_pk': self.portfolio.pk, 'asset_pk': asset.pk})
+
+    def aggregate(self):
+        return PortfolioAggregate.objects.get(portfolio=self.portfolio)
+
+    def test_trades_move_the_totals(self):
+        response = self.client.post(self.transactions_url(self.asset),
+                                    {"transaction_type": "BUY", "quantity": "2"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post(reverse('asset-transactions-bulk', kwargs={
+            'portfolio_pk': self.portfolio.pk,
+            'asset_pk': self.asset.pk
+        }), {"transactions": [
+            {"transaction_type": "BUY", "quantity": "2", "price_per_unit": "20000"},
+            {"transaction_type": "SELL", "quantity": "1", "price_per_unit": "40000"},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        aggregate = self.aggregate()
+        # 3 left at an average of 25000, 1 sold 15000 above it
+        self.assertEqual(aggregate.cost_basis, Decimal("75000"))
+        self.assertEqual(aggregate.realized_profit_loss, Decimal("15000"))
+        self.assertEqual((aggregate.asset_count, aggregate.position_count, aggregate.transaction_count), (1, 1, 3))
+        self.assertEqual(verify_aggregate(self.portfolio.pk, repair=False), {})
+
+    def test_summary_reads_the_aggregate(self):
+        self.client.post(self.transactions_url(self.asset), {"transaction_type": "BUY", "quantity": "1"}, format='json')
+        response = self.client.get(reverse('portfolio-summary', kwargs={'pk': self.portfolio.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Decimal(response.data['total_invested']), Decimal("30000"))
+        self.assertEqual(response.data['transaction_count'], 1)
+        self.assertEqual(response.data['position_count'], 1)
+
+    def test_deleting_an_asset_removes_it_from_the_totals(self):
+        asset = self.add_asset("ethereum")
+        self.assertEqual(self.aggregate().asset_count, 2)
+        response = self.client.delete(reverse('portfolio-assets-detail', kwargs={
+            'portfolio_pk': self.portfolio.pk,
+            'pk': asset.pk
+        }))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.aggregate().asset_count, 1)
+
+    def test_rebuild_repairs_drift(self):
+        # Written behind the API's back, like an admin edit
+        Asset.objects.filter(pk=self.asset.pk).update(quantity=Decimal("2"), average_buy_price=Decimal("100"))
+        Transaction.objects.create(asset=self.asset, transaction_type="BUY", quantity=Decimal("2"),
+                                   price_per_unit=Decimal("100"), total_value=Decimal("200"))
+
+        with self.assertRaises(CommandError):
+            call_command("rebuild_aggregates", "--check", stdout=StringIO())
+        self.assertEqual(self.aggregate().transaction_count, 0)
+
+        call_command("rebuild_aggregates", stdout=StringIO())
+        aggregate = self.aggregate()
+        self.assertEqual(aggregate.cost_basis, Decimal("200"))
+        self.assertEqual((aggregate.position_count, aggregate.transaction_count), (1, 1))
+        call_command("rebuild_aggregates", "--check", stdout=StringIO())
+
+    def test_rebuild_creates_missing_aggregates(self):
+        portfolio = Portfolio.objects.create(owner=self.user, name="Older Portfolio")
+        Asset.objects.create(portfolio=portfolio, coin_id="solana", quantity=Decimal("3"),
+                             average_buy_price=Decimal("10"), realized_profit_loss=Decimal("-5"))
+        call_command("rebuild_aggregates", "--portfolio", str(portfolio.pk), stdout=StringIO())
+        aggregate = PortfolioAggregate.objects.get(portfolio=portfolio)
+        self.assertEqual(aggregate.cost_basis, Decimal("30"))
+        self.assertEqual(aggregate.realized_profit_loss, Decimal("-5"))
@@ -1,4 +1,7 @@
+from unittest import mock
+from decimal import Decimal
 from rest_framework.test import APITestCase
+from django.core.cache import cache
 from django.urls import reverse
 from rest_framework import status
 from portfolio.models import Asset, Portfolio
@@ -31,4 +34,38 @@ class AssetAPITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(Asset.objects.count(), 1)
         self.assertEqual(Asset.objects.get().coin_id, "bitcoin")
-        self.assertEqual(Asset.objects.get().portfolio, self.portfolio)
\ No newline at end of file
+        self.assertEqual(Asset.objects.get().portfolio, self.portfolio)
+
+# Asset list resolves every price on the page in one batch
+class AssetListPricePrefetchTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            username="prefetchuser",
+            email="prefetchuser@example.com",
+            password="testpassword123"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.portfolio = Portfolio.objects.create(owner=self.user, name="Prefetch Portfolio")
+        Asset.objects.create(portfolio=self.portfolio, coin_id="bitcoin",
+                             quantity=Decimal("2"), average_buy_price=Decimal("25000"))
+        Asset.objects.create(portfolio=self.portfolio, coin_id="ethereum",
+                             quantity=Decimal("10"), average_buy_price=Decimal("1500"))
+        self.url = reverse('portfolio-assets-list', kwargs={'portfolio_pk': self.portfolio.pk})
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_list_assets_fetches_prices_once(self, mock_get):
+        mock_get.return_value.json.return_value = {
+            "bitcoin": {"usd": 30000},
+            "ethereum": {"usd": 2000},
+        }
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(mock_get.call_count, 1)
+        results = {row['coin_id']: row for row in response.data['results']}
+        self.assertEqual(Decimal(results['bitcoin']['current_value']), Decimal("60000"))
+        self.assertEqual(Decimal(results['bitcoin']['unrealized_profit_loss']), Decimal("10000"))
+        self.assertEqual(Decimal(results['ethereum']['current_value']), Decimal("20000"))
+        self.assertEqual(Decimal(results['ethereum']['unrealized_profit_loss']), Decimal("5000"))
+        self.assertEqual(response['X-Price-Freshness'], "fresh")
@@ -0,0 +1,140 @@
+import asyncio
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APITestCase
+from django.urls import reverse
+from rest_framework import status
+from portfolio.models import Asset, Portfolio
+from portfolio.services import http_client
+from portfolio.services.coingecko import aget_coin_prices, chunk_coin_ids as coingecko_chunks
+from portfolio.tests.fake_upstream import FakeCoinGecko
+from django.contrib.auth import get_user_model
+
+
+PRICES = {
+    "bitcoin": {"usd": 30000},
+    "ethereum": {"usd": 2000},
+}
+
+
+# Async endpoints answer exactly like their sync counterparts
+@override_settings(UPSTREAM_BACKOFF_FACTOR=0, UPSTREAM_BACKOFF_JITTER=0)
+class AsyncViewsTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.upstream = FakeCoinGecko(PRICES).start()
+        self.settings_override = override_settings(COIN_GECKO_URL=self.upstream.url)
+        self.settings_override.enable()
+        self.user = get_user_model().objects.create_user(
+            username="asyncuser",
+            email="asyncuser@example.com",
+            password="testpassword123"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.portfolio = Portfolio.objects.create(owner=self.user, name="Async Portfolio")
+        Asset.objects.create(portfolio=self.portfolio, coin_id="bitcoin",
+                             quantity=Decimal("2"), average_buy_price=Decimal("20000"))
+        Asset.objects.create(portfolio=self.portfolio, coin_id="ethereum",
+                             quantity=Decimal("10"), average_buy_price=Decimal("1500"))
+
+    def tearDown(self):
+        self.settings_override.disable()
+        http_client.reset_session()
+        self.upstream.stop()
+
+    def test_summary_matches_sync_summary(self):
+        response = self.client.get(reverse('async-portfolio-summary', kwargs={'pk': self.portfolio.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["X-Price-Freshness"], "fresh")
+        self.assertEqual(Decimal(response.json()["current_value"]), Decimal("80000"))
+        # Prices fetched by the async view are cached for the sync one
+        sync = self.client.get(reverse('portfolio-summary', kwargs={'pk': self.portfolio.pk}))
+        self.assertEqual(response.json(), sync.json())
+        self.assertEqual(len(self.upstream.requests), 1)
+
+    def test_asset_list_matches_sync_list(self):
+        kwargs = {'portfolio_pk': self.portfolio.pk}
+        response = self.client.get(reverse('async-portfolio-assets', kwargs=kwargs))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()["results"]), 2)
+        sync = self.client.get(reverse('portfolio-assets-list', kwargs=kwargs))
+        self.assertEqual(response.json(), sync.json())
+
+    def test_other_users_portfolio_is_not_found(self):
+        other = get_user_model().objects.create_user(
+            username="otherasyncuser", email="otherasyncuser@example.com", password="testpassword123"
+        )
+        self.client.force_authenticate(user=other)
+        response = self.client.get(reverse('async-portfolio-summary', kwargs={'pk': self.portfolio.pk}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        assets = self.client.get(reverse('async-portfolio-assets', kwargs={'portfolio_pk': self.portfolio.pk}))
+        self.assertEqual(assets.json()["results"], [])
+
+    def test_authentication_is_required(self):
+        self.client.force_authenticate(user=None)
+        response = self.client.get(reverse('async-portfolio-summary', kwargs={'pk': self.portfolio.pk}))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_unsupported_currency_is_rejected(self):
+        response = self.client.get(reverse('async-portfolio-summary', kwargs={'pk': self.portfolio.pk}),
+                                   {"currency": "xyz"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("currency", response.json())
+
+
+@override_settings(UPSTREAM_BACKOFF_FACTOR=0, UPSTREAM_BACKOFF_JITTER=0)
+class AsyncPriceLookupTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.upstream = FakeCoinGecko(PRICES).start()
+        self.settings_override = override_settings(COIN_GECKO_URL=self.upstream.url)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.upstream.stop()
+
+    async def test_prices_come_from_upstream_then_cache(self):
+        result = await aget_coin_prices(["bitcoin", "ethereum"])
+        self.assertEqual(result["prices"], {"bitcoin": 30000, "ethereum": 2000})
+        result = await aget_coin_prices(["bitcoin"])
+        self.assertEqual(result["prices"], {"bitcoin": 30000})
+        self.assertEqual(len(self.upstream.requests), 1)
+        await http_client.reset_async_client()
+
+    async def test_retries_on_server_error(self):
+        self.upstream.statuses = [503, 429]
+        result = await aget_coin_prices(["bitcoin"])
+        self.assertTrue(result["success"])
+        self.assertEqual(len(self.upstream.requests), 3)
+        await http_client.reset_async_client()
+
+    @override_settings(UPSTREAM_MAX_RETRIES=1)
+    async def test_gives_up_after_max_retries(self):
+        self.upstream.statuses = [503, 503, 503]
+        result = await aget_coin_prices(["bitcoin"])
+        self.assertFalse(result["success"])
+        self.assertEqual(len(self.upstream.requests), 2)
+        await http_client.reset_async_client()
+
+    async def test_chunks_are_fetched_concurrently(self):
+        in_flight, peak = 0, 0
+
+        async def slow_prices(coin_ids, currency):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.05)
+            in_flight -= 1
+            return {coin_id: {currency: 1} for coin_id in coin_ids}
+
+        # Two coin ids per upstream call
+        small_chunks = lambda coin_ids: coingecko_chunks(coin_ids, max_length=19)
+        with mock.patch("portfolio.services.coingecko.chunk_coin_ids", side_effect=small_chunks), \
+                mock.patch("portfolio.services.coingecko._arequest_prices", side_effect=slow_prices):
+            coin_ids = [f"coin-{n}" for n in range(6)]
+            result = await aget_coin_prices(coin_ids)
+        self.assertEqual(set(result["prices"]), set(coin_ids))
+        self.assertEqual(peak, 3)
@@ -0,0 +1,208 @@
+import time
+from unittest import mock
+from urllib.parse import urlencode
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from portfolio.services import coingecko
+from portfolio.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN
+from portfolio.services.coingecko import get_coin_price, get_coin_prices
+
+
+def fake_response(payload):
+    response = mock.Mock()
+    response.json.return_value = payload
+    response.raise_for_status.return_value = None
+    return response
+
+
+class GetCoinPricesTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_fetches_all_misses_in_one_call(self, mock_get):
+        mock_get.return_value = fake_response({
+            "bitcoin": {"usd": 30000},
+            "ethereum": {"usd": 2000},
+        })
+        result = get_coin_prices(["bitcoin", "ethereum"], currency="usd")
+
+        self.assertTrue(result["success"])
+        self.assertEqual(result["prices"], {"bitcoin": 30000, "ethereum": 2000})
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(mock_get.call_args.kwargs["params"]["ids"], "bitcoin,ethereum")
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_cache_hits_skip_upstream(self, mock_get):
+        cache.set("coin_price_bitcoin_usd", {"price": 30000, "fresh_until": time.time() + 60})
+        mock_get.return_value = fake_response({"ethereum": {"usd": 2000}})
+
+        result = get_coin_prices(["bitcoin", "ethereum"])
+
+        self.assertEqual(result["prices"], {"bitcoin": 30000, "ethereum": 2000})
+        self.assertEqual(mock_get.call_args.kwargs["params"]["ids"], "ethereum")
+        # Second call is served entirely from cache
+        get_coin_prices(["bitcoin", "ethereum"])
+        self.assertEqual(mock_get.call_count, 1)
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_unknown_coin_is_left_out(self, mock_get):
+        mock_get.return_value = fake_response({"bitcoin": {"usd": 30000}})
+        result = get_coin_prices(["bitcoin", "notacoin"])
+        self.assertTrue(result["success"])
+        self.assertEqual(result["prices"], {"bitcoin": 30000})
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_chunks_long_id_lists(self, mock_get):
+        mock_get.return_value = fake_response({})
+        coin_ids = [f"coin-{i:04d}" for i in range(400)]
+        get_coin_prices(coin_ids)
+
+        self.assertGreater(mock_get.call_count, 1)
+        for call in mock_get.call_args_list:
+            encoded = urlencode({"ids": call.kwargs["params"]["ids"]})
+            self.assertLessEqual(len(encoded), coingecko.MAX_IDS_PARAM_LENGTH)
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_single_price_not_found(self, mock_get):
+        mock_get.return_value = fake_response({})
+        result = get_coin_price("notacoin")
+        self.assertFalse(result["success"])
+        self.assertIn("not found", result["message"])
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_single_price_timeout(self, mock_get):
+        mock_get.side_effect = coingecko.requests.Timeout()
+        result = get_coin_price("bitcoin")
+        self.assertFalse(result["success"])
+        self.assertEqual(result["message"], "Request to CoinGecko timed out.")
+
+
+# Stale-while-revalidate and the refresh lock
+@mock.patch("portfolio.services.coingecko.PRICE_REFRESH_WAIT", 0.2)
+class StaleWhileRevalidateTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        # Soft TTL already passed, hard TTL still running
+        cache.set("coin_price_bitcoin_usd", {"price": 29000, "fresh_until": time.time() - 1})
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_lock_holder_refreshes_stale_price(self, mock_get):
+        mock_get.return_value = fake_response({"bitcoin": {"usd": 30000}})
+        result = get_coin_prices(["bitcoin"])
+
+        self.assertEqual(result["prices"], {"bitcoin": 30000})
+        self.assertEqual(result["stale"], [])
+        self.assertEqual(mock_get.call_count, 1)
+        # Lock is released after the refresh
+        self.assertIsNone(cache.get("coin_price_bitcoin_usd_lock"))
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_stale_price_served_while_other_worker_refreshes(self, mock_get):
+        cache.add("coin_price_bitcoin_usd_lock", 1)
+        result = get_coin_prices(["bitcoin"])
+
+        mock_get.assert_not_called()
+        self.assertEqual(result["prices"], {"bitcoin": 29000})
+        self.assertEqual(result["stale"], ["bitcoin"])
+        self.assertTrue(get_coin_price("bitcoin")["stale"])
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_stale_price_served_when_upstream_fails(self, mock_get):
+        mock_get.side_effect = coingecko.requests.ConnectionError("down")
+        result = get_coin_prices(["bitcoin"])
+
+        self.assertFalse(result["success"])
+        self.assertEqual(result["prices"], {"bitcoin": 29000})
+        self.assertEqual(result["stale"], ["bitcoin"])
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_hard_miss_falls_back_to_fetch_when_lock_holder_is_slow(self, mock_get):
+        cache.clear()
+        cache.add("coin_price_bitcoin_usd_lock", 1)
+        mock_get.return_value = fake_response({"bitcoin": {"usd": 30000}})
+        result = get_coin_prices(["bitcoin"])
+
+        self.assertEqual(result["prices"], {"bitcoin": 30000})
+        self.assertEqual(mock_get.call_count, 1)
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_stale_not_allowed_forces_fresh_price(self, mock_get):
+        cache.add("coin_price_bitcoin_usd_lock", 1)
+        mock_get.return_value = fake_response({"bitcoin": {"usd": 30000}})
+        result = get_coin_price("bitcoin", allow_stale=False)
+
+        self.assertEqual(result["price"], 30000)
+        self.assertFalse(result["stale"])
+
+
+# Circuit breaker and negative caching of unknown coins
+class CircuitBreakerTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_circuit_opens_and_fails_fast(self, mock_get):
+        mock_get.side_effect = coingecko.requests.ConnectionError("down")
+        for _ in range(coingecko.coingecko_circuit.failure_threshold):
+            get_coin_price("bitcoin")
+        self.assertEqual(coingecko.coingecko_circuit.state(), OPEN)
+
+        mock_get.reset_mock()
+        result = get_coin_price("bitcoin")
+        mock_get.assert_not_called()
+        self.assertFalse(result["success"])
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_client_errors_do_not_open_circuit(self, mock_get):
+        response = mock.Mock(status_code=404)
+        response.raise_for_status.side_effect = coingecko.requests.HTTPError("404", response=response)
+        mock_get.return_value = response
+        for _ in range(coingecko.coingecko_circuit.failure_threshold):
+            self.assertFalse(coingecko.get_market_chart("notacoin")["success"])
+        self.assertEqual(coingecko.coingecko_circuit.state(), CLOSED)
+
+        # Upstream rate limiting does count
+        response.status_code = 429
+        for _ in range(coingecko.coingecko_circuit.failure_threshold):
+            coingecko.get_market_chart("bitcoin")
+        self.assertEqual(coingecko.coingecko_circuit.state(), OPEN)
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_open_circuit_serves_last_known_price(self, mock_get):
+        cache.set("coin_price_bitcoin_usd", {"price": 29000, "fresh_until": time.time() - 1})
+        cache.set(coingecko.coingecko_circuit.opened_at_key, time.time())
+
+        result = get_coin_price("bitcoin")
+        mock_get.assert_not_called()
+        self.assertEqual(result["price"], 29000)
+        self.assertTrue(result["stale"])
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_half_open_probe_closes_circuit(self, mock_get):
+        circuit = coingecko.coingecko_circuit
+        cache.set(circuit.opened_at_key, time.time() - circuit.recovery_timeout - 1)
+        self.assertEqual(circuit.state(), HALF_OPEN)
+
+        mock_get.return_value = fake_response({"bitcoin": {"usd": 30000}})
+        self.assertEqual(get_coin_price("bitcoin")["price"], 30000)
+        self.assertEqual(circuit.state(), CLOSED)
+
+    def test_half_open_allows_a_single_probe(self):
+        circuit = coingecko.coingecko_circuit
+        cache.set(circuit.opened_at_key, time.time() - circuit.recovery_timeout - 1)
+        self.assertTrue(circuit.allow_request())
+        self.assertFalse(circuit.allow_request())
+        # Failed probe re-opens the circuit
+        circuit.record_failure()
+        self.assertEqual(circuit.state(), OPEN)
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_unknown_coin_is_negatively_cached(self, mock_get):
+        mock_get.return_value = fake_response({})
+        get_coin_price("bitcon")
+        result = get_coin_price("bitcon")
+
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertFalse(result["success"])
+        self.assertIn("not found", result["message"])
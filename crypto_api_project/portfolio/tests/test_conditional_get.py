@@ -0,0 +1,121 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from portfolio.models import Asset, Portfolio, Transaction
+from django.contrib.auth import get_user_model
+
+
+# ETag / Last-Modified on polled list endpoints
+@mock.patch("portfolio.services.coingecko.upstream_get")
+class ConditionalGetTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            username="etaguser",
+            email="etaguser@example.com",
+            password="testpassword123"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.portfolio = Portfolio.objects.create(owner=self.user, name="Polled Portfolio")
+        self.asset = Asset.objects.create(portfolio=self.portfolio, coin_id="bitcoin", quantity=Decimal("1"))
+        Transaction.objects.create(asset=self.asset, transaction_type="BUY", quantity=Decimal("1"),
+                                   price_per_unit=Decimal("100"), total_value=Decimal("100"))
+        self.assets_url = reverse('portfolio-assets-list', kwargs={'portfolio_pk': self.portfolio.pk})
+        self.transactions_url = reverse('portfolio-transactions-list',
+                                        kwargs={'portfolio_pk': self.portfolio.pk})
+
+    def revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+
+    def test_unchanged_asset_list_is_not_modified(self, mock_get):
+        mock_get.return_value.json.return_value = {"bitcoin": {"usd": 30000}}
+        first = self.client.get(self.assets_url)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertIn("Last-Modified", first)
+        self.assertIn("private", first["Cache-Control"])
+
+        # Prices fetched by the first request are part of the version
+        second = self.client.get(self.assets_url)
+        # Only the page query runs, nothing is serialized
+        with self.assertNumQueries(1):
+            response = self.revalidate(self.assets_url, second)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], second["ETag"])
+        self.assertEqual(response.content, b"")
+
+    def test_asset_list_changes_with_asset_or_prices(self, mock_get):
+        mock_get.return_value.json.return_value = {"bitcoin": {"usd": 30000}}
+        self.client.get(self.assets_url)
+        first = self.client.get(self.assets_url)
+
+        self.asset.quantity = Decimal("2")
+        self.asset.save()
+        second = self.revalidate(self.assets_url, first)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+
+        # A price refresh of a coin on the page
+        cache.set("coin_price_bitcoin_usd", {"price": 31000, "fresh_until": time.time() + 300})
+        self.assertEqual(self.revalidate(self.assets_url, second).status_code, status.HTTP_200_OK)
+
+    def test_asset_list_ignores_prices_of_other_coins(self, mock_get):
+        mock_get.return_value.json.return_value = {"bitcoin": {"usd": 30000}}
+        self.client.get(self.assets_url)
+        first = self.client.get(self.assets_url)
+
+        cache.set("coin_price_ethereum_usd", {"price": 2000, "fresh_until": time.time() + 300})
+        self.assertEqual(self.revalidate(self.assets_url, first).status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_transaction_list_changes_with_new_transaction(self, mock_get):
+        first = self.client.get(self.transactions_url)
+        self.assertEqual(self.revalidate(self.transactions_url, first).status_code,
+                         status.HTTP_304_NOT_MODIFIED)
+
+        Transaction.objects.create(asset=self.asset, transaction_type="BUY", quantity=Decimal("1"),
+                                   price_per_unit=Decimal("100"), total_value=Decimal("100"))
+        self.assertEqual(self.revalidate(self.transactions_url, first).status_code, status.HTTP_200_OK)
+
+    def test_transaction_list_changes_with_past_dated_import(self, mock_get):
+        first = self.client.get(self.transactions_url)
+        # Not the newest row: only the portfolio generation moves
+        with self.captureOnCommitCallbacks(execute=True):
+            Transaction.objects.create(asset=self.asset, transaction_type="BUY", quantity=Decimal("1"),
+                                       price_per_unit=Decimal("100"), total_value=Decimal("100"),
+                                       transaction_date=timezone.now() - timedelta(days=30))
+        self.assertEqual(self.revalidate(self.transactions_url, first).status_code, status.HTTP_200_OK)
+
+    def test_asset_transaction_list_follows_the_assets_portfolio(self, mock_get):
+        # The URL's portfolio is not the asset's: its generation never moves
+        other = Portfolio.objects.create(owner=self.user, name="Other Portfolio")
+        url = reverse('asset-transactions-list', kwargs={'portfolio_pk': other.pk, 'asset_pk': self.asset.pk})
+        first = self.client.get(url)
+        self.assertEqual(self.revalidate(url, first).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Transaction.objects.create(asset=self.asset, transaction_type="BUY", quantity=Decimal("1"),
+                                       price_per_unit=Decimal("100"), total_value=Decimal("100"),
+                                       transaction_date=timezone.now() - timedelta(days=30))
+        self.assertEqual(self.revalidate(url, first).status_code, status.HTTP_200_OK)
+
+    def test_other_page_has_other_etag(self, mock_get):
+        first = self.client.get(self.transactions_url)
+        other = self.client.get(self.transactions_url, {"page_size": 1})
+        self.assertNotEqual(first["ETag"], other["ETag"])
+
+    def test_portfolio_list_changes_on_rename(self, mock_get):
+        url = reverse('portfolio-list')
+        first = self.client.get(url)
+        self.assertEqual(self.revalidate(url, first).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.portfolio.name = "Renamed"
+        # Commit also invalidates the cached response data
+        with self.captureOnCommitCallbacks(execute=True):
+            self.portfolio.save()
+        response = self.revalidate(url, first)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['name'], "Renamed")
@@ -0,0 +1,161 @@
+import time
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APITestCase
+from django.urls import reverse
+from rest_framework import status
+from portfolio.models import Asset, Portfolio
+from portfolio.services import coingecko, fx
+from portfolio.services.fx import UnsupportedCurrency, cross_rate, fx_rate
+from django.contrib.auth import get_user_model
+
+
+# Bitcoin quoted in each supported currency: 1 USD = 0.9 EUR = 130 KES
+BITCOIN_QUOTES = {"usd": 30000, "eur": 27000, "kes": 3900000}
+
+
+def fake_upstream(prices):
+    """upstream_get stand-in answering /simple/price from {coin_id: {currency: price}}."""
+    def get(url, params=None, **kwargs):
+        currencies = params["vs_currencies"].split(",")
+        response = mock.Mock()
+        response.json.return_value = {
+            coin_id: {c: prices[coin_id][c] for c in currencies if c in prices[coin_id]}
+            for coin_id in params["ids"].split(",") if coin_id in prices
+        }
+        return response
+    return get
+
+
+@override_settings(SUPPORTED_CURRENCIES=["usd", "eur", "kes"])
+class FxRatesTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_all_rates_come_from_one_call(self, mock_get):
+        mock_get.side_effect = fake_upstream({"bitcoin": BITCOIN_QUOTES})
+
+        self.assertEqual(fx_rate("eur"), (Decimal("0.9"), False))
+        self.assertEqual(fx_rate("KES")[0], Decimal("130"))
+        self.assertEqual(cross_rate("eur", "kes")[0].quantize(Decimal("0.01")), Decimal("144.44"))
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(mock_get.call_args.kwargs["params"]["vs_currencies"], "usd,eur,kes")
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_base_currency_needs_no_rates(self, mock_get):
+        self.assertEqual(fx_rate("usd"), (Decimal("1"), False))
+        mock_get.assert_not_called()
+
+    def test_unsupported_currency(self):
+        with self.assertRaises(UnsupportedCurrency):
+            fx_rate("jpy")
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_stale_rates_served_when_upstream_fails(self, mock_get):
+        cache.set(fx.FX_CACHE_KEY, {"rates": {"usd": Decimal("1"), "eur": Decimal("0.8")},
+                                    "fresh_until": time.time() - 1})
+        mock_get.side_effect = coingecko.requests.ConnectionError("down")
+
+        self.assertEqual(fx_rate("eur"), (Decimal("0.8"), True))
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_failed_refresh_is_not_retried_at_once(self, mock_get):
+        mock_get.side_effect = coingecko.requests.ConnectionError("down")
+        self.assertEqual(fx.get_fx_rates(), ({"usd": Decimal("1")}, True))
+        self.assertEqual(fx.get_fx_rates(), ({"usd": Decimal("1")}, True))
+        self.assertEqual(mock_get.call_count, 1)
+        # The refresh lock was released
+        self.assertIsNone(cache.get(fx.FX_LOCK_KEY))
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_refresh_in_progress_serves_stale_rates(self, mock_get):
+        cache.set(fx.FX_CACHE_KEY, {"rates": {"usd": Decimal("1"), "eur": Decimal("0.8")},
+                                    "fresh_until": time.time() - 1})
+        cache.add(fx.FX_LOCK_KEY, 1)
+
+        self.assertEqual(fx_rate("eur"), (Decimal("0.8"), True))
+        mock_get.assert_not_called()
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_cached_rates_only(self, mock_get):
+        self.assertEqual(fx.get_fx_rates(fetch=False), ({"usd": Decimal("1")}, True))
+        mock_get.assert_not_called()
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_no_rates_at_all_is_unsupported(self, mock_get):
+        mock_get.side_effect = coingecko.requests.ConnectionError("down")
+        with self.assertRaises(UnsupportedCurrency):
+            fx_rate("eur")
+
+
+# Asset list and summary valued in the user's currency
+@override_settings(SUPPORTED_CURRENCIES=["usd", "eur", "kes"])
+class MultiCurrencyValuationTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            username="fxuser",
+            email="fxuser@example.com",
+            password="testpassword123"
+        )
+        self.user.profile.preferred_currency = "EUR"
+        self.user.profile.save()
+        self.client.force_authenticate(user=self.user)
+        self.portfolio = Portfolio.objects.create(owner=self.user, name="FX Portfolio")
+        Asset.objects.create(portfolio=self.portfolio, coin_id="bitcoin", quantity=Decimal("2"),
+                             average_buy_price=Decimal("25000"))
+        Asset.objects.create(portfolio=self.portfolio, coin_id="ethereum", quantity=Decimal("10"),
+                             average_buy_price=Decimal("1500"))
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_assets_valued_in_preferred_currency(self, mock_get):
+        mock_get.side_effect = fake_upstream({
+            "bitcoin": BITCOIN_QUOTES,
+            "ethereum": {"usd": 2000, "eur": 1800},
+        })
+        url = reverse('portfolio-assets-list', kwargs={'portfolio_pk': self.portfolio.pk})
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        bitcoin = next(row for row in response.data['results'] if row['coin_id'] == "bitcoin")
+        self.assertEqual(bitcoin['valuation_currency'], "eur")
+        self.assertEqual(bitcoin['current_value'], Decimal("54000"))
+        self.assertEqual(bitcoin['unrealized_profit_loss'], Decimal("9000"))
+        # One FX call plus one batched USD price call, no per-currency price keys
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertIsNone(cache.get("coin_price_bitcoin_eur"))
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_summary_currency_from_query(self, mock_get):
+        mock_get.side_effect = fake_upstream({
+            "bitcoin": BITCOIN_QUOTES,
+            "ethereum": {"usd": 2000},
+        })
+        url = reverse('portfolio-summary', kwargs={'pk': self.portfolio.pk})
+        response = self.client.get(url, {"currency": "kes"})
+
+        self.assertEqual(response.data['currency'], "kes")
+        self.assertEqual(Decimal(response.data['current_value']), Decimal("80000") * 130)
+        self.assertEqual(Decimal(response.data['total_invested']), Decimal("65000") * 130)
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_writes_use_cached_rates_only(self, mock_get):
+        mock_get.side_effect = fake_upstream({"solana": {"usd": 100}})
+        cache.set(fx.FX_CACHE_KEY, {"rates": {"usd": Decimal("1"), "eur": Decimal("0.8")},
+                                    "fresh_until": time.time() - 1})
+        url = reverse('portfolio-assets-list', kwargs={'portfolio_pk': self.portfolio.pk})
+        response = self.client.post(url, {"coin_id": "solana"}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['valuation_currency'], "eur")
+        # Only the coin's own USD price was fetched
+        for call in mock_get.call_args_list:
+            self.assertEqual(call.kwargs["params"]["vs_currencies"], "usd")
+
+    def test_unsupported_query_currency_is_rejected(self):
+        url = reverse('portfolio-summary', kwargs={'pk': self.portfolio.pk})
+        response = self.client.get(url, {"currency": "jpy"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
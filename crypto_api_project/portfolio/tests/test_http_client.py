@@ -0,0 +1,108 @@
+import asyncio
+import time
+from unittest import mock
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from portfolio.services import http_client
+from portfolio.services.coingecko import get_coin_prices
+from portfolio.tests.fake_upstream import FakeCoinGecko
+
+
+@override_settings(UPSTREAM_BACKOFF_FACTOR=0, UPSTREAM_BACKOFF_JITTER=0)
+class PooledUpstreamClientTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        http_client.reset_session()
+        self.upstream = FakeCoinGecko({
+            "bitcoin": {"usd": 30000},
+            "ethereum": {"usd": 2000},
+        }).start()
+        self.settings_override = override_settings(COIN_GECKO_URL=self.upstream.url)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        http_client.reset_session()
+        self.upstream.stop()
+
+    def test_prices_come_from_upstream(self):
+        result = get_coin_prices(["bitcoin", "ethereum"])
+        self.assertEqual(result["prices"], {"bitcoin": 30000, "ethereum": 2000})
+        self.assertEqual(len(self.upstream.requests), 1)
+
+    def test_connection_is_kept_alive(self):
+        http_client.upstream_get(f"{self.upstream.url}/simple/price", params={"ids": "bitcoin"})
+        http_client.upstream_get(f"{self.upstream.url}/simple/price", params={"ids": "ethereum"})
+        # Same client socket served both requests
+        self.assertEqual(len(set(self.upstream.client_ports)), 1)
+
+    def test_retries_on_server_error(self):
+        self.upstream.statuses = [503, 429]
+        result = get_coin_prices(["bitcoin"])
+        self.assertTrue(result["success"])
+        self.assertEqual(result["prices"], {"bitcoin": 30000})
+        self.assertEqual(len(self.upstream.requests), 3)
+
+    @override_settings(UPSTREAM_MAX_RETRIES=1)
+    def test_gives_up_after_max_retries(self):
+        http_client.reset_session()
+        self.upstream.statuses = [503, 503, 503]
+        result = get_coin_prices(["bitcoin"])
+        self.assertFalse(result["success"])
+        self.assertEqual(len(self.upstream.requests), 2)
+
+    @override_settings(UPSTREAM_BACKOFF_MAX=0.1)
+    def test_retry_after_is_capped(self):
+        http_client.reset_session()
+        self.upstream.statuses = [429]
+        self.upstream.retry_after = "60"
+        start = time.monotonic()
+        result = get_coin_prices(["bitcoin"])
+        self.assertTrue(result["success"])
+        self.assertLess(time.monotonic() - start, 5)
+
+    @override_settings(UPSTREAM_BACKOFF_MAX=0.1)
+    async def test_async_retry_after_is_capped(self):
+        self.upstream.statuses = [429]
+        self.upstream.retry_after = "60"
+        start = time.monotonic()
+        try:
+            response = await http_client.aupstream_get(f"{self.upstream.url}/simple/price",
+                                                       params={"ids": "bitcoin"})
+        finally:
+            await http_client.reset_async_client()
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(time.monotonic() - start, 5)
+
+    def test_async_client_is_closed_with_its_loop(self):
+        async def request():
+            await http_client.aupstream_get(f"{self.upstream.url}/simple/price",
+                                            params={"ids": "bitcoin"})
+            client, _ = await http_client.get_async_client()
+            return client
+
+        # As under WSGI: every async view runs in a loop of its own
+        clients = [asyncio.run(request()) for _ in range(2)]
+        self.assertIsNot(clients[0], clients[1])
+        self.assertTrue(all(client.is_closed for client in clients))
+
+    def test_session_rebuilt_in_forked_process(self):
+        session = http_client.get_session()
+        self.assertIs(http_client.get_session(), session)
+        with mock.patch("portfolio.services.http_client.os.getpid", return_value=-1):
+            self.assertIsNot(http_client.get_session(), session)
+
+    def test_latency_is_reported(self):
+        received = []
+
+        def receiver(sender, url, status_code, duration, **kwargs):
+            received.append((status_code, duration))
+
+        http_client.upstream_request_finished.connect(receiver)
+        try:
+            get_coin_prices(["bitcoin"])
+        finally:
+            http_client.upstream_request_finished.disconnect(receiver)
+        self.assertEqual(len(received), 1)
+        self.assertEqual(received[0][0], 200)
+        self.assertGreaterEqual(received[0][1], 0)
@@ -0,0 +1,94 @@
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from portfolio.management.commands.import_transactions import Command as ImportCommand
+from portfolio.models import Asset, ImportJob, Portfolio, PortfolioAggregate, Transaction
+from portfolio.services.aggregates import verify_aggregate
+
+
+CSV_ROWS = """coin_id,transaction_type,quantity,price_per_unit,transaction_date
+bitcoin,BUY,1,100,2021-01-01T00:00:00Z
+bitcoin,BUY,1,200,2021-02-01T00:00:00Z
+ethereum,BUY,10,50,2021-03-01T00:00:00Z
+bitcoin,SELL,1,300,2021-04-01T00:00:00Z
+ethereum,SELL,5,40,2021-05-01T00:00:00Z
+"""
+
+
+class ImportTransactionsCommandTest(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            username="importuser",
+            email="importuser@example.com",
+            password="testpassword123"
+        )
+        self.portfolio = Portfolio.objects.create(owner=user, name="History")
+        handle, self.path = tempfile.mkstemp(suffix=".csv")
+        with os.fdopen(handle, "w") as source:
+            source.write(CSV_ROWS)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def run_import(self, *args):
+        call_command("import_transactions", self.path, "--portfolio", str(self.portfolio.id),
+                     *args, stdout=StringIO())
+
+    def test_import_replays_history_with_file_prices(self):
+        self.run_import("--batch-size", "2")
+
+        bitcoin = Asset.objects.get(portfolio=self.portfolio, coin_id="bitcoin")
+        self.assertEqual(bitcoin.quantity, Decimal("1"))
+        self.assertEqual(bitcoin.average_buy_price, Decimal("150"))
+        self.assertEqual(bitcoin.realized_profit_loss, Decimal("150"))
+        ethereum = Asset.objects.get(portfolio=self.portfolio, coin_id="ethereum")
+        self.assertEqual(ethereum.quantity, Decimal("5"))
+        self.assertEqual(ethereum.realized_profit_loss, Decimal("-50"))
+
+        self.assertEqual(Transaction.objects.count(), 5)
+        self.assertEqual(Transaction.objects.order_by('transaction_date').first().transaction_date.year, 2021)
+        self.assertIsNotNone(ImportJob.objects.get().completed_at)
+
+    def test_import_keeps_portfolio_totals(self):
+        self.run_import("--batch-size", "2")
+        aggregate = PortfolioAggregate.objects.get(portfolio=self.portfolio)
+        self.assertEqual((aggregate.asset_count, aggregate.position_count, aggregate.transaction_count), (2, 2, 5))
+        self.assertEqual(aggregate.realized_profit_loss, Decimal("100"))
+        self.assertEqual(verify_aggregate(self.portfolio.id, repair=False), {})
+
+    def test_interrupted_import_resumes_without_duplicates(self):
+        original = ImportCommand.import_batch
+        calls = []
+
+        def crash_on_second_batch(command, *args):
+            calls.append(1)
+            if len(calls) == 2:
+                raise RuntimeError("worker killed")
+            return original(command, *args)
+
+        with mock.patch.object(ImportCommand, "import_batch", crash_on_second_batch):
+            with self.assertRaises(RuntimeError):
+                self.run_import("--batch-size", "2")
+        self.assertEqual(ImportJob.objects.get().rows_imported, 2)
+        self.assertEqual(Transaction.objects.count(), 2)
+
+        self.run_import("--batch-size", "2")
+        self.assertEqual(Transaction.objects.count(), 5)
+        self.assertEqual(Asset.objects.get(coin_id="bitcoin").realized_profit_loss, Decimal("150"))
+
+        # A finished file is not imported twice
+        self.run_import()
+        self.assertEqual(Transaction.objects.count(), 5)
+
+    def test_oversell_aborts_the_batch(self):
+        with open(self.path, "w") as source:
+            source.write("coin_id,transaction_type,quantity,price_per_unit\nbitcoin,SELL,1,100\n")
+        with self.assertRaises(CommandError):
+            self.run_import()
+        self.assertEqual(Transaction.objects.count(), 0)
@@ -1,7 +1,10 @@
+from unittest import mock
+from decimal import Decimal
 from rest_framework.test import APITestCase
+from django.core.cache import cache
 from django.urls import reverse
 from rest_framework import status
-from portfolio.models import Portfolio
+from portfolio.models import Asset, Portfolio
 from django.contrib.auth import get_user_model
 from rest_framework.authtoken.models import Token
 
@@ -24,4 +27,50 @@ class PortfolioAPITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(Portfolio.objects.count(), 1)
         self.assertEqual(Portfolio.objects.get().name, "My Crypto Portfolio")
-        self.assertEqual(Portfolio.objects.get().owner, self.user)
\ No newline at end of file
+        self.assertEqual(Portfolio.objects.get().owner, self.user)
+
+# Portfolio summary endpoint
+class PortfolioSummaryTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            username="summaryuser",
+            email="summaryuser@example.com",
+            password="testpassword123"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.portfolio = Portfolio.objects.create(owner=self.user, name="Summary Portfolio")
+        Asset.objects.create(portfolio=self.portfolio, coin_id="bitcoin", quantity=Decimal("2"),
+                             average_buy_price=Decimal("25000"), realized_profit_loss=Decimal("500"))
+        Asset.objects.create(portfolio=self.portfolio, coin_id="ethereum", quantity=Decimal("10"),
+                             average_buy_price=Decimal("1500"))
+        # Fully sold position only contributes realized P/L
+        Asset.objects.create(portfolio=self.portfolio, coin_id="litecoin", quantity=Decimal("0"),
+                             realized_profit_loss=Decimal("-100"))
+        self.url = reverse('portfolio-summary', kwargs={'pk': self.portfolio.pk})
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_summary_totals(self, mock_get):
+        mock_get.return_value.json.return_value = {
+            "bitcoin": {"usd": 30000},
+            "ethereum": {"usd": 2000},
+        }
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(mock_get.call_args.kwargs["params"]["ids"], "bitcoin,ethereum")
+        self.assertEqual(response.data['asset_count'], 3)
+        self.assertEqual(response.data['position_count'], 2)
+        self.assertEqual(Decimal(response.data['total_invested']), Decimal("65000"))
+        self.assertEqual(Decimal(response.data['realized_profit_loss']), Decimal("400"))
+        self.assertEqual(Decimal(response.data['current_value']), Decimal("80000"))
+        self.assertEqual(Decimal(response.data['unrealized_profit_loss']), Decimal("15000"))
+
+    def test_summary_of_other_users_portfolio_is_hidden(self):
+        other = get_user_model().objects.create_user(
+            username="otheruser", email="otheruser@example.com", password="testpassword123"
+        )
+        self.client.force_authenticate(user=other)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,144 @@
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+from django.urls import reverse
+from rest_framework import status
+from portfolio.models import Asset, Portfolio, PortfolioSnapshot
+from portfolio.services import fx
+from portfolio.services.price_history import record_prices
+from portfolio.services.snapshots import snapshot_time, take_snapshots
+from django.contrib.auth import get_user_model
+
+
+# Valuation snapshots and the history endpoint serving them
+class PortfolioHistoryTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            username="historyuser",
+            email="historyuser@example.com",
+            password="testpassword123"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.portfolio = Portfolio.objects.create(owner=self.user, name="History Portfolio")
+        Asset.objects.create(portfolio=self.portfolio, coin_id="bitcoin", quantity=Decimal("2"),
+                             average_buy_price=Decimal("25000"), realized_profit_loss=Decimal("500"))
+        Asset.objects.create(portfolio=self.portfolio, coin_id="ethereum", quantity=Decimal("10"),
+                             average_buy_price=Decimal("1500"))
+        self.url = reverse('portfolio-history', kwargs={'pk': self.portfolio.pk})
+
+    def snapshot(self, taken_at, value):
+        PortfolioSnapshot.objects.create(
+            portfolio=self.portfolio, taken_at=taken_at, value=Decimal(value),
+            cost_basis=Decimal("0"), unrealized_profit_loss=Decimal("0"), realized_profit_loss=Decimal("0"),
+        )
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_snapshot_records_totals_and_positions(self, mock_get):
+        mock_get.return_value.json.return_value = {
+            "bitcoin": {"usd": 30000},
+            "ethereum": {"usd": 2000},
+        }
+        taken_at = snapshot_time()
+        written, unpriced = take_snapshots(taken_at)
+
+        self.assertEqual(written, 3)
+        self.assertEqual(unpriced, [])
+        self.assertEqual(mock_get.call_count, 1)
+        total = PortfolioSnapshot.objects.get(portfolio=self.portfolio, coin_id="")
+        self.assertEqual(total.value, Decimal("80000"))
+        self.assertEqual(total.cost_basis, Decimal("65000"))
+        self.assertEqual(total.unrealized_profit_loss, Decimal("15000"))
+        self.assertEqual(total.realized_profit_loss, Decimal("500"))
+        bitcoin = PortfolioSnapshot.objects.get(portfolio=self.portfolio, coin_id="bitcoin")
+        self.assertEqual(bitcoin.value, Decimal("60000"))
+
+        # Same slot again overwrites the rows, but never with missing prices
+        cache.clear()
+        mock_get.return_value.json.return_value = {"bitcoin": {"usd": 31000}}
+        take_snapshots(taken_at)
+        self.assertEqual(PortfolioSnapshot.objects.count(), 3)
+        total = PortfolioSnapshot.objects.get(portfolio=self.portfolio, coin_id="")
+        self.assertEqual(total.value, Decimal("80000"))
+        bitcoin = PortfolioSnapshot.objects.get(portfolio=self.portfolio, coin_id="bitcoin")
+        self.assertEqual(bitcoin.value, Decimal("62000"))
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_totals_without_all_prices_are_incomplete(self, mock_get):
+        mock_get.return_value.json.return_value = {"bitcoin": {"usd": 30000}}
+        taken_at = snapshot_time()
+        written, unpriced = take_snapshots(taken_at)
+
+        self.assertEqual(unpriced, ["ethereum"])
+        total = PortfolioSnapshot.objects.get(portfolio=self.portfolio, coin_id="")
+        self.assertIsNone(total.value)
+        self.assertIsNone(total.unrealized_profit_loss)
+        self.assertEqual(total.cost_basis, Decimal("65000"))
+
+        # A later run in the slot, once prices are back, completes it
+        cache.clear()
+        mock_get.return_value.json.return_value = {"bitcoin": {"usd": 30000}, "ethereum": {"usd": 2000}}
+        take_snapshots(taken_at)
+        total.refresh_from_db()
+        self.assertEqual(total.value, Decimal("80000"))
+        self.assertEqual(PortfolioSnapshot.objects.get(coin_id="ethereum").value, Decimal("20000"))
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_command_snapshots_current_slot(self, mock_get):
+        mock_get.return_value.json.return_value = {"bitcoin": {"usd": 30000}}
+        call_command("snapshot_portfolios", stdout=StringIO())
+
+        taken_at = list(PortfolioSnapshot.objects.values_list('taken_at', flat=True).distinct())
+        self.assertEqual(len(taken_at), 1)
+        self.assertEqual(taken_at[0].timestamp() % settings.SNAPSHOT_INTERVAL, 0)
+        # Ethereum had no price: its position is recorded without a value
+        self.assertIsNone(PortfolioSnapshot.objects.get(coin_id="ethereum").value)
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_snapshot_falls_back_to_local_price_history(self, mock_get):
+        mock_get.return_value.json.return_value = {"bitcoin": {"usd": 30000}}
+        record_prices({"ethereum": 2000}, "usd")
+        written, unpriced = take_snapshots(snapshot_time())
+
+        self.assertEqual(unpriced, [])
+        self.assertEqual(PortfolioSnapshot.objects.get(coin_id="ethereum").value, Decimal("20000"))
+        self.assertEqual(PortfolioSnapshot.objects.get(coin_id="").value, Decimal("80000"))
+
+    def test_history_downsamples_to_last_snapshot_per_bucket(self):
+        day = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+        for hour, value in ((1, "100"), (23, "200"), (24 + 5, "300")):
+            self.snapshot(day + timedelta(hours=hour), value)
+
+        response = self.client.get(self.url, {
+            "from": "2024-01-01", "to": "2024-01-03", "interval": "day"
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([point['value'] for point in response.data['points']],
+                         [Decimal("200"), Decimal("300")])
+
+        response = self.client.get(self.url, {
+            "from": "2024-01-01", "to": "2024-01-03", "interval": "hour"
+        })
+        self.assertEqual(len(response.data['points']), 3)
+
+    def test_history_is_converted_at_read_time(self):
+        cache.set(fx.FX_CACHE_KEY, {"rates": {"usd": Decimal("1"), "eur": Decimal("0.9")},
+                                    "fresh_until": time.time() + 600})
+        self.snapshot(datetime(2024, 1, 1, 1, tzinfo=dt_timezone.utc), "100")
+
+        response = self.client.get(self.url, {"from": "2024-01-01", "to": "2024-01-02", "currency": "eur"})
+        self.assertEqual(response.data['currency'], "eur")
+        self.assertEqual(response.data['points'][0]['value'], Decimal("90"))
+        self.assertEqual(response["X-Price-Freshness"], "fresh")
+        # Stored rows stay in USD
+        self.assertEqual(PortfolioSnapshot.objects.get().value, Decimal("100"))
+
+    def test_history_rejects_unknown_interval(self):
+        response = self.client.get(self.url, {"interval": "minute"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
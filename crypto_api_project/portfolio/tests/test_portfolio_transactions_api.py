@@ -1,4 +1,8 @@
+import json
+from unittest import mock
 from rest_framework.test import APITestCase
+from django.utils import timezone
+from portfolio.pagination import TransactionCursorPagination
 from django.urls import reverse
 from rest_framework import status
 from portfolio.models import Asset, Portfolio, Transaction
@@ -109,4 +113,88 @@ class TestEmptyPortfolioTransactions(APITestCase):
 
         # Assert the response status code and data
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data['results']), 0)  # No transactions in this portfolio
\ No newline at end of file
+        self.assertEqual(len(response.data['results']), 0)  # No transactions in this portfolio
+
+# Cursor pages must stay stable when transactions share a timestamp
+class TransactionCursorPaginationTest(APITestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="pageuser",
+            email="pageuser@example.com",
+            password="testpassword123"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.portfolio = Portfolio.objects.create(owner=self.user, name="Bulk Portfolio")
+        asset = Asset.objects.create(portfolio=self.portfolio, coin_id="bitcoin")
+        Transaction.objects.bulk_create([
+            Transaction(asset=asset, transaction_type="BUY", quantity=Decimal("1"),
+                        price_per_unit=Decimal("100"), total_value=Decimal("100"))
+            for _ in range(25)
+        ])
+        # Same timestamp for every row, as in a bulk import
+        Transaction.objects.update(transaction_date=timezone.now())
+        self.url = reverse('portfolio-transactions-list', kwargs={'portfolio_pk': self.portfolio.id})
+
+    def test_pages_neither_skip_nor_repeat_rows(self):
+        seen = []
+        url = self.url
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(len(set(seen)), 25)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+
+    def test_page_size_is_client_selectable_and_capped(self):
+        response = self.client.get(self.url, {'page_size': 20})
+        self.assertEqual(len(response.data['results']), 20)
+
+        with mock.patch.object(TransactionCursorPagination, 'max_page_size', 5):
+            response = self.client.get(self.url, {'page_size': 1000})
+        self.assertEqual(len(response.data['results']), 5)
+
+
+# Streaming export of a portfolio's transaction history
+class TransactionExportTest(APITestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="exportuser",
+            email="exportuser@example.com",
+            password="testpassword123"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.portfolio = Portfolio.objects.create(owner=self.user, name="Export Portfolio")
+        asset = Asset.objects.create(portfolio=self.portfolio, coin_id="bitcoin")
+        for quantity in ("0.5", "1.5"):
+            Transaction.objects.create(
+                asset=asset, transaction_type="BUY", quantity=Decimal(quantity),
+                price_per_unit=Decimal("30000"), total_value=Decimal(quantity) * 30000
+            )
+        self.url = reverse('portfolio-transactions-export', kwargs={'portfolio_pk': self.portfolio.id})
+
+    def test_csv_export(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], "text/csv")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(",")[:3], ["id", "asset", "coin_id"])
+        self.assertEqual(len(lines), 3)
+        # Newest first
+        self.assertIn("1.50000000", lines[1])
+
+    def test_ndjson_export(self):
+        response = self.client.get(self.url, {'type': 'ndjson'})
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['coin_id'], "bitcoin")
+        self.assertEqual(Decimal(rows[1]['quantity']), Decimal("0.5"))
+
+    def test_export_of_other_users_portfolio_is_hidden(self):
+        other = get_user_model().objects.create_user(
+            username="otherexport", email="otherexport@example.com", password="testpassword123"
+        )
+        self.client.force_authenticate(user=other)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
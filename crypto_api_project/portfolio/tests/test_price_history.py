@@ -0,0 +1,139 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from portfolio.models import Asset, Portfolio, PricePoint
+from portfolio.services import http_client
+from portfolio.services.price_history import (
+    backfill_price_history, price_at, price_history, record_prices
+)
+from portfolio.tests.fake_upstream import FakeCoinGecko
+
+
+START = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def ms(moment):
+    return int(moment.timestamp() * 1000)
+
+
+@override_settings(PRICE_HISTORY_BUCKET=3600)
+class PriceHistoryTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        http_client.reset_session()
+        self.upstream = FakeCoinGecko().start()
+        self.settings_override = override_settings(COIN_GECKO_URL=self.upstream.url)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        http_client.reset_session()
+        self.upstream.stop()
+
+    def test_backfill_folds_points_into_ohlc_buckets(self):
+        self.upstream.charts["bitcoin"] = [
+            [ms(START), 100], [ms(START + timedelta(minutes=20)), 130],
+            [ms(START + timedelta(minutes=40)), 90], [ms(START + timedelta(minutes=59)), 110],
+            [ms(START + timedelta(hours=1)), 120],
+        ]
+        result = backfill_price_history("bitcoin", "usd", days=1)
+
+        self.assertTrue(result["success"])
+        self.assertEqual(result["buckets"], 2)
+        self.assertEqual(self.upstream.requests[0][0], "/api/v3/coins/bitcoin/market_chart")
+        first = PricePoint.objects.get(coin_id="bitcoin", timestamp=START)
+        self.assertEqual(
+            (first.open, first.high, first.low, first.close),
+            (Decimal("100"), Decimal("130"), Decimal("90"), Decimal("110"))
+        )
+        series = price_history("bitcoin", "usd", START, START + timedelta(days=1))
+        self.assertEqual([point["close"] for point in series], [Decimal("110"), Decimal("120")])
+
+    def test_spot_prices_widen_existing_bucket(self):
+        record_prices({"bitcoin": 100}, "usd", at=START + timedelta(minutes=1))
+        record_prices({"bitcoin": 150}, "usd", at=START + timedelta(minutes=2))
+        record_prices({"bitcoin": 80}, "usd", at=START + timedelta(minutes=3))
+
+        point = PricePoint.objects.get()
+        self.assertEqual(
+            (point.open, point.high, point.low, point.close),
+            (Decimal("100"), Decimal("150"), Decimal("80"), Decimal("80"))
+        )
+
+    def test_backfill_keeps_later_close(self):
+        record_prices({"bitcoin": 200}, "usd", at=START + timedelta(minutes=50))
+        self.upstream.charts["bitcoin"] = [[ms(START + timedelta(minutes=10)), 100]]
+        backfill_price_history("bitcoin", "usd", days=1)
+
+        point = PricePoint.objects.get()
+        self.assertEqual((point.low, point.close), (Decimal("100"), Decimal("200")))
+        self.assertEqual(point.close_at, START + timedelta(minutes=50))
+
+    def test_earlier_point_merged_later_becomes_open(self):
+        record_prices({"bitcoin": 200}, "usd", at=START + timedelta(minutes=50))
+        record_prices({"bitcoin": 100}, "usd", at=START + timedelta(minutes=10))
+
+        point = PricePoint.objects.get()
+        self.assertEqual(
+            (point.open, point.high, point.low, point.close),
+            (Decimal("100"), Decimal("200"), Decimal("100"), Decimal("200"))
+        )
+        self.assertEqual(point.open_at, START + timedelta(minutes=10))
+
+    def test_price_at_uses_latest_bucket_before_time(self):
+        record_prices({"bitcoin": 100}, "usd", at=START)
+        record_prices({"bitcoin": 200}, "usd", at=START + timedelta(hours=2))
+
+        self.assertEqual(price_at("bitcoin", "usd", START + timedelta(hours=1)), Decimal("100"))
+        self.assertEqual(price_at("Bitcoin", "USD", START + timedelta(hours=3)), Decimal("200"))
+        self.assertIsNone(price_at("bitcoin", "usd", START - timedelta(seconds=1)))
+        self.assertIsNone(price_at("bitcoin", "usd", START + timedelta(hours=1, minutes=30),
+                                   max_age=timedelta(hours=1)))
+
+    def test_backfill_command_reports_unknown_coin(self):
+        self.upstream.charts["bitcoin"] = [[ms(START), 100]]
+        stdout, stderr = StringIO(), StringIO()
+        call_command("backfill_prices", "bitcoin", "notacoin", "--days", "1", stdout=stdout, stderr=stderr)
+
+        self.assertIn("Backfilled 1 of 2 coins.", stdout.getvalue())
+        self.assertIn("notacoin", stderr.getvalue())
+        self.assertEqual(PricePoint.objects.count(), 1)
+
+
+# Price history of an asset's coin served from the local buckets
+@override_settings(PRICE_HISTORY_BUCKET=3600)
+class PriceHistoryApiTest(APITestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="pricehistoryuser",
+            email="pricehistoryuser@example.com",
+            password="testpassword123"
+        )
+        self.client.force_authenticate(user=self.user)
+        portfolio = Portfolio.objects.create(owner=self.user, name="Charted Portfolio")
+        asset = Asset.objects.create(portfolio=portfolio, coin_id="bitcoin")
+        self.url = reverse('portfolio-assets-price-history', kwargs={
+            'portfolio_pk': portfolio.pk, 'pk': asset.pk
+        })
+
+    def test_buckets_in_range(self):
+        record_prices({"bitcoin": 100}, "usd", at=START)
+        record_prices({"bitcoin": 200}, "usd", at=START + timedelta(hours=1))
+        record_prices({"bitcoin": 300}, "usd", at=START + timedelta(days=2))
+
+        response = self.client.get(self.url, {"from": "2024-01-01", "to": "2024-01-02"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['currency'], "usd")
+        self.assertEqual([point['close'] for point in response.data['points']],
+                         [Decimal("100"), Decimal("200")])
+
+    def test_invalid_date_is_rejected(self):
+        response = self.client.get(self.url, {"to": "soon"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
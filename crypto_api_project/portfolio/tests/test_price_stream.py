@@ -0,0 +1,133 @@
+import asyncio
+import json
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
+from django.test import AsyncClient, SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+from portfolio.models import Asset, Portfolio
+from portfolio.services.price_feed import get_broadcaster, publish_prices
+from portfolio.services.price_stream import PortfolioStream
+from django.contrib.auth import get_user_model
+
+
+def parse_event(chunk):
+    if isinstance(chunk, bytes):
+        chunk = chunk.decode()
+    fields = dict(line.split(": ", 1) for line in chunk.strip().splitlines())
+    return fields["event"], json.loads(fields["data"])
+
+
+# What an EventSource sends, with a JWT
+def stream_headers(user):
+    return {"Accept": "text/event-stream", "Authorization": f"Bearer {AccessToken.for_user(user)}"}
+
+
+def cached_prices(prices):
+    cache.set_many({
+        f"coin_price_{coin_id}_usd": {"price": price, "fresh_until": float("inf")}
+        for coin_id, price in prices.items()
+    })
+
+
+# Live value and P/L events of a portfolio, fed by the price broadcaster
+@mock.patch("portfolio.services.coingecko.aupstream_get")
+class PortfolioStreamTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        cached_prices({"bitcoin": 30000, "ethereum": 2000})
+        self.user = get_user_model().objects.create_user(
+            username="streamuser",
+            email="streamuser@example.com",
+            password="testpassword123"
+        )
+        self.portfolio = Portfolio.objects.create(owner=self.user, name="Streamed Portfolio")
+        Asset.objects.create(portfolio=self.portfolio, coin_id="bitcoin",
+                             quantity=Decimal("2"), average_buy_price=Decimal("20000"))
+        Asset.objects.create(portfolio=self.portfolio, coin_id="ethereum",
+                             quantity=Decimal("10"), average_buy_price=Decimal("1500"))
+        # Sold out positions are not streamed
+        Asset.objects.create(portfolio=self.portfolio, coin_id="solana", quantity=Decimal("0"))
+        self.client = AsyncClient()
+        self.url = reverse('portfolio-stream', kwargs={'pk': self.portfolio.pk})
+
+    async def test_stream_starts_with_a_snapshot(self, mock_get):
+        response = await self.client.get(self.url, headers=stream_headers(self.user))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        content = aiter(response.streaming_content)
+        name, data = parse_event(await anext(content))
+        await content.aclose()
+
+        self.assertEqual(name, "snapshot")
+        self.assertEqual(Decimal(str(data["current_value"])), Decimal("80000"))
+        self.assertEqual(Decimal(str(data["unrealized_profit_loss"])), Decimal("25000"))
+        self.assertEqual([position["coin_id"] for position in data["positions"]], ["bitcoin", "ethereum"])
+        mock_get.assert_not_called()
+
+    async def test_price_updates_carry_deltas(self, mock_get):
+        stream = PortfolioStream(self.portfolio.pk, "usd")
+        await stream.load()
+        events = stream.events()
+        await anext(events)
+
+        get_broadcaster().dispatch({"currency": "usd", "prices": {"bitcoin": 31000, "dogecoin": 1}})
+        name, data = parse_event(await anext(events))
+        self.assertEqual(name, "prices")
+        self.assertEqual(Decimal(str(data["value_change"])), Decimal("2000"))
+        self.assertEqual(Decimal(str(data["current_value"])), Decimal("82000"))
+        self.assertEqual(len(data["positions"]), 1)
+        self.assertEqual(Decimal(str(data["positions"][0]["value_change"])), Decimal("2000"))
+
+        # A closed stream stops listening
+        await events.aclose()
+        self.assertEqual(get_broadcaster().subscriptions, set())
+
+    async def test_other_users_portfolio_is_not_found(self, mock_get):
+        other = await get_user_model().objects.acreate_user(
+            username="otherstreamuser", email="otherstreamuser@example.com", password="testpassword123"
+        )
+        response = await self.client.get(self.url, headers=stream_headers(other))
+        self.assertEqual(response.status_code, 404)
+        # EventSource clients get the error as an event
+        self.assertEqual(parse_event(response.content)[0], "error")
+
+    async def test_authentication_is_required(self, mock_get):
+        response = await self.client.get(self.url)
+        self.assertEqual(response.status_code, 401)
+
+
+class PriceBroadcasterTest(SimpleTestCase):
+    async def test_prices_published_from_a_thread_reach_subscribers(self):
+        broadcaster = get_broadcaster()
+        subscription = broadcaster.subscribe(["Bitcoin"])
+        try:
+            await asyncio.to_thread(publish_prices, {"bitcoin": 30000, "ethereum": 2000}, "usd")
+            self.assertEqual(await subscription.next(timeout=1), {"bitcoin": 30000})
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    async def test_slow_subscriber_only_gets_latest_price(self):
+        broadcaster = get_broadcaster()
+        subscription = broadcaster.subscribe(["bitcoin"])
+        try:
+            for price in (30000, 30100, 30200):
+                broadcaster.dispatch({"currency": "usd", "prices": {"bitcoin": price}})
+            # Other currencies are not what streams value positions in
+            broadcaster.dispatch({"currency": "eur", "prices": {"bitcoin": 1}})
+            self.assertEqual(await subscription.next(timeout=1), {"bitcoin": 30200})
+            self.assertEqual(await subscription.next(timeout=0.01), {})
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    async def test_only_holders_of_a_coin_are_woken(self):
+        broadcaster = get_broadcaster()
+        holders = [broadcaster.subscribe(["bitcoin"]) for _ in range(3)]
+        others = [broadcaster.subscribe(["ethereum"]) for _ in range(3)]
+        broadcaster.dispatch({"currency": "usd", "prices": {"bitcoin": 30000}})
+        self.assertTrue(all(subscription.ready.is_set() for subscription in holders))
+        self.assertFalse(any(subscription.ready.is_set() for subscription in others))
+        for subscription in holders + others:
+            broadcaster.unsubscribe(subscription)
+        self.assertEqual(dict(broadcaster.by_coin), {})
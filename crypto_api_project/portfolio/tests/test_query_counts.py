@@ -0,0 +1,96 @@
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+from django.urls import reverse
+from rest_framework import status
+from portfolio.models import Asset, Portfolio, Transaction
+from portfolio.services.aggregates import verify_aggregate
+from django.contrib.auth import get_user_model
+
+
+COIN_IDS = ["bitcoin", "ethereum", "solana", "cardano", "ripple"]
+
+
+# Each endpoint runs a fixed number of queries, whatever the amount of data
+@mock.patch("portfolio.services.coingecko.upstream_get")
+class QueryCountTest(APITestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="countuser",
+            email="countuser@example.com",
+            password="testpassword123"
+        )
+        self.portfolio = Portfolio.objects.create(owner=self.user, name="Counted Portfolio")
+        self.asset = self.add_asset("bitcoin")
+        # Totals row as the API writers would have created it
+        verify_aggregate(self.portfolio.pk)
+
+    def add_asset(self, coin_id):
+        asset = Asset.objects.create(portfolio=self.portfolio, coin_id=coin_id, quantity=Decimal("1"))
+        self.add_transaction(asset)
+        return asset
+
+    def add_transaction(self, asset):
+        return Transaction.objects.create(asset=asset, transaction_type="BUY", quantity=Decimal("1"),
+                                          price_per_unit=Decimal("100"), total_value=Decimal("100"))
+
+    def grow(self, size):
+        for coin_id in COIN_IDS[1:size]:
+            self.add_asset(coin_id)
+            Portfolio.objects.create(owner=self.user, name=f"Counted {coin_id}")
+        for _ in range(size - 1):
+            self.add_transaction(self.asset)
+
+    def assertQueries(self, count, url):
+        for size in (1, len(COIN_IDS)):
+            self.grow(size)
+            # Cold caches and a fresh user, so nothing is carried over between requests
+            cache.clear()
+            self.client.force_authenticate(user=get_user_model().objects.get(pk=self.user.pk))
+            with self.subTest(size=size), self.assertNumQueries(count):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def prices(self, mock_get):
+        mock_get.return_value.json.return_value = {coin_id: {"usd": 100} for coin_id in COIN_IDS}
+
+    def test_portfolio_list(self, mock_get):
+        self.assertQueries(2, reverse('portfolio-list'))
+
+    # Ownership is checked on the loaded object, without further queries
+    def test_portfolio_detail(self, mock_get):
+        self.assertQueries(1, reverse('portfolio-detail', kwargs={'pk': self.portfolio.pk}))
+
+    def test_portfolio_summary(self, mock_get):
+        self.prices(mock_get)
+        self.assertQueries(3, reverse('portfolio-summary', kwargs={'pk': self.portfolio.pk}))
+
+    def test_asset_list(self, mock_get):
+        self.prices(mock_get)
+        self.assertQueries(2, reverse('portfolio-assets-list', kwargs={'portfolio_pk': self.portfolio.pk}))
+
+    def test_asset_detail(self, mock_get):
+        self.prices(mock_get)
+        self.assertQueries(2, reverse('portfolio-assets-detail', kwargs={
+            'portfolio_pk': self.portfolio.pk,
+            'pk': self.asset.pk
+        }))
+
+    def test_asset_transaction_list(self, mock_get):
+        self.assertQueries(2, reverse('asset-transactions-list', kwargs={
+            'portfolio_pk': self.portfolio.pk,
+            'asset_pk': self.asset.pk
+        }))
+
+    def test_asset_transaction_detail(self, mock_get):
+        transaction = self.asset.transactions.first()
+        self.assertQueries(1, reverse('asset-transactions-detail', kwargs={
+            'portfolio_pk': self.portfolio.pk,
+            'asset_pk': self.asset.pk,
+            'pk': transaction.pk
+        }))
+
+    def test_portfolio_transaction_list(self, mock_get):
+        self.assertQueries(2, reverse('portfolio-transactions-list',
+                                      kwargs={'portfolio_pk': self.portfolio.pk}))
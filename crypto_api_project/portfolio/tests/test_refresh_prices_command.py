@@ -0,0 +1,69 @@
+import time
+from io import StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from portfolio.models import Asset, Portfolio, PricePoint
+from portfolio.management.commands.refresh_prices import REFRESHER_CYCLE_LOCK_KEY, REFRESHER_STATS_KEY
+
+
+class RefreshPricesCommandTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = get_user_model().objects.create_user(
+            username="refreshuser",
+            email="refreshuser@example.com",
+            password="testpassword123"
+        )
+        portfolio = Portfolio.objects.create(owner=user, name="Held Coins")
+        Asset.objects.create(portfolio=portfolio, coin_id="bitcoin")
+        Asset.objects.create(portfolio=portfolio, coin_id="ethereum")
+        # Assets in a deleted portfolio are not worth refreshing
+        deleted = Portfolio.objects.create(owner=user, name="Old", active=False)
+        Asset.objects.create(portfolio=deleted, coin_id="dogecoin")
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_single_cycle_warms_cache_in_one_call(self, mock_get):
+        mock_get.return_value.json.return_value = {
+            "bitcoin": {"usd": 30000},
+            "ethereum": {"usd": 2000},
+        }
+        call_command("refresh_prices", "--once", stdout=StringIO())
+
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(mock_get.call_args.kwargs["params"]["ids"], "bitcoin,ethereum")
+        entry = cache.get("coin_price_bitcoin_usd")
+        self.assertEqual(entry["price"], 30000)
+        self.assertGreater(entry["fresh_until"], time.time())
+        # Refreshed prices also land in the local price history
+        self.assertEqual(
+            sorted(PricePoint.objects.values_list('coin_id', 'close')),
+            [("bitcoin", 30000), ("ethereum", 2000)]
+        )
+
+        stats = cache.get(REFRESHER_STATS_KEY)
+        self.assertEqual(stats["coins"], 2)
+        self.assertEqual(stats["refreshed"], 2)
+        self.assertEqual(stats["upstream_calls"], 1)
+        # The next cycle can start on time
+        self.assertIsNone(cache.get(REFRESHER_CYCLE_LOCK_KEY))
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_cycle_skipped_while_another_refresher_runs(self, mock_get):
+        cache.add(REFRESHER_CYCLE_LOCK_KEY, 1)
+        call_command("refresh_prices", "--once", stdout=StringIO())
+        mock_get.assert_not_called()
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_lock_taken_over_mid_cycle_is_left_alone(self, mock_get):
+        def slow_cycle(*args, **kwargs):
+            # Our lock expired during the call and another refresher took it
+            cache.set(REFRESHER_CYCLE_LOCK_KEY, "other-refresher")
+            return mock.DEFAULT
+
+        mock_get.side_effect = slow_cycle
+        mock_get.return_value.json.return_value = {"bitcoin": {"usd": 30000}}
+        call_command("refresh_prices", "--once", stdout=StringIO())
+        self.assertEqual(cache.get(REFRESHER_CYCLE_LOCK_KEY), "other-refresher")
@@ -0,0 +1,131 @@
+import time
+import requests
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from rest_framework.response import Response
+from rest_framework.test import APITestCase
+from django.urls import reverse
+from rest_framework import status
+from portfolio.models import Asset, Portfolio
+from portfolio.response_cache import CachedResponseMixin
+from django.contrib.auth import get_user_model
+
+
+# Per-user response cache invalidated through cache generations
+@mock.patch("portfolio.services.coingecko.upstream_get")
+class ResponseCacheTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            username="cacheuser",
+            email="cacheuser@example.com",
+            password="testpassword123"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.portfolio = Portfolio.objects.create(owner=self.user, name="Cached Portfolio")
+        self.asset = Asset.objects.create(portfolio=self.portfolio, coin_id="bitcoin")
+        self.assets_url = reverse('portfolio-assets-list', kwargs={'portfolio_pk': self.portfolio.pk})
+        self.transactions_url = reverse('portfolio-transactions-list',
+                                        kwargs={'portfolio_pk': self.portfolio.pk})
+
+    def buy(self, quantity):
+        url = reverse('asset-transactions-list', kwargs={
+            'portfolio_pk': self.portfolio.pk,
+            'asset_pk': self.asset.pk
+        })
+        # Generations are bumped on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {"transaction_type": "BUY", "quantity": quantity}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_repeated_read_is_served_from_cache(self, mock_get):
+        mock_get.return_value.json.return_value = {"bitcoin": {"usd": 30000}}
+        self.client.get(self.transactions_url)
+        with self.assertNumQueries(1):  # ETag validators only
+            response = self.client.get(self.transactions_url)
+        self.assertEqual(response["X-Cache"], "HIT")
+
+    def test_buy_is_visible_immediately(self, mock_get):
+        mock_get.return_value.json.return_value = {"bitcoin": {"usd": 30000}}
+        # First read fetches the page's prices, which are part of the key
+        self.client.get(self.assets_url)
+        self.client.get(self.assets_url)
+        self.client.get(self.transactions_url)
+        self.assertEqual(self.client.get(self.assets_url)["X-Cache"], "HIT")
+
+        self.buy("0.5")
+
+        assets = self.client.get(self.assets_url)
+        self.assertEqual(assets["X-Cache"], "MISS")
+        self.assertEqual(Decimal(assets.data['results'][0]['quantity']), Decimal("0.5"))
+        transactions = self.client.get(self.transactions_url)
+        self.assertEqual(transactions["X-Cache"], "MISS")
+        self.assertEqual(len(transactions.data['results']), 1)
+
+    def test_asset_list_is_keyed_by_its_own_prices(self, mock_get):
+        mock_get.return_value.json.return_value = {"bitcoin": {"usd": 30000}}
+        self.client.get(self.assets_url)
+        self.client.get(self.assets_url)
+
+        # A refresh of a coin that is not on the page keeps the entry
+        cache.set("coin_price_ethereum_usd", {"price": 2000, "fresh_until": time.time() + 300})
+        self.assertEqual(self.client.get(self.assets_url)["X-Cache"], "HIT")
+
+        cache.set("coin_price_bitcoin_usd", {"price": 31000, "fresh_until": time.time() + 300})
+        self.assertEqual(self.client.get(self.assets_url)["X-Cache"], "MISS")
+
+    def test_stale_price_is_not_replayed(self, mock_get):
+        mock_get.return_value.json.return_value = {"bitcoin": {"usd": 30000}}
+        # First read fetches the page's prices, which are part of the key
+        self.client.get(self.assets_url)
+        self.client.get(self.assets_url)
+        self.assertEqual(self.client.get(self.assets_url)["X-Cache"], "HIT")
+
+        # Same price, past its soft TTL, and the refresh fails
+        cache.set("coin_price_bitcoin_usd", {"price": 30000, "fresh_until": time.time() - 1})
+        mock_get.side_effect = requests.ConnectionError("down")
+        for _ in range(2):
+            response = self.client.get(self.assets_url)
+            self.assertEqual(response["X-Cache"], "MISS")
+            self.assertEqual(response["X-Price-Freshness"], "stale")
+
+    def test_soft_delete_invalidates_portfolio_reads(self, mock_get):
+        list_url = reverse('portfolio-list')
+        self.client.get(list_url)
+        self.client.get(self.transactions_url)
+        self.assertEqual(self.client.get(list_url)["X-Cache"], "HIT")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('portfolio-detail', kwargs={'pk': self.portfolio.pk}))
+        self.assertEqual(self.client.get(list_url)["X-Cache"], "MISS")
+        self.assertEqual(self.client.get(self.transactions_url)["X-Cache"], "MISS")
+
+    def test_cache_is_per_user(self, mock_get):
+        self.client.get(self.transactions_url)
+        other = get_user_model().objects.create_user(
+            username="othercacheuser", email="othercacheuser@example.com", password="testpassword123"
+        )
+        self.client.force_authenticate(user=other)
+        response = self.client.get(self.transactions_url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data['results'], [])
+
+    def test_stats_for_staff(self, mock_get):
+        self.client.get(self.transactions_url)
+        self.client.get(self.transactions_url)
+        url = reverse('response-cache-stats')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_staff = True
+        self.user.save()
+        stats = self.client.get(url).data['portfolio-transactions']
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_ratio']), (1, 1, 0.5))
+
+
+class CachedResponseDefaultsTest(SimpleTestCase):
+    def test_views_without_a_version_are_not_cached(self):
+        response = Response({"detail": "fresh"})
+        self.assertIs(CachedResponseMixin().cached_response(lambda: response), response)
+        self.assertNotIn("X-Cache", response)
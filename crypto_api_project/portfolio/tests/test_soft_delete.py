@@ -0,0 +1,131 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from django.urls import reverse
+from rest_framework import status
+from portfolio.models import Asset, Portfolio, PortfolioSnapshot, TaxLot, Transaction
+from portfolio.services.aggregates import verify_aggregate
+from portfolio.services.lots import LotLedger
+from django.contrib.auth import get_user_model
+
+
+def create_user(username):
+    return get_user_model().objects.create_user(
+        username=username,
+        email=f"{username}@example.com",
+        password="testpassword123"
+    )
+
+
+def buy(asset, quantity):
+    transaction = Transaction.objects.create(asset=asset, transaction_type="BUY", quantity=Decimal(quantity),
+                                             price_per_unit=Decimal("100"), total_value=Decimal("100"))
+    ledger = LotLedger(asset)
+    ledger.record(transaction)
+    ledger.flush()
+    return transaction
+
+
+# Deleted portfolios, their assets and transactions disappear from the API
+class SoftDeleteApiTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_user("softdeleteuser")
+        self.client.force_authenticate(user=self.user)
+        self.portfolio = Portfolio.objects.create(owner=self.user, name="Doomed")
+        self.asset = Asset.objects.create(portfolio=self.portfolio, coin_id="bitcoin", quantity=Decimal("1"))
+        buy(self.asset, "1")
+
+    def delete(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.delete(reverse('portfolio-detail', kwargs={'pk': self.portfolio.pk}))
+
+    def test_soft_delete_is_one_update(self):
+        self.portfolio.name = "Renamed elsewhere"
+        with self.assertNumQueries(1):
+            self.portfolio.soft_delete()
+        stored = Portfolio.all_objects.get(pk=self.portfolio.pk)
+        self.assertFalse(stored.active)
+        self.assertIsNotNone(stored.deleted_at)
+        # Only the soft delete columns are written
+        self.assertEqual(stored.name, "Doomed")
+
+    def test_deleted_portfolio_is_hidden(self):
+        response = self.delete()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["transactions_affected"], 1)
+
+        self.assertFalse(Portfolio.objects.filter(pk=self.portfolio.pk).exists())
+        self.assertEqual(self.client.get(reverse('portfolio-list')).data, [])
+        detail = self.client.get(reverse('portfolio-detail', kwargs={'pk': self.portfolio.pk}))
+        self.assertEqual(detail.status_code, status.HTTP_404_NOT_FOUND)
+
+    # The affected count comes from the portfolio's totals, not a count over its history
+    def test_delete_does_not_count_the_history(self):
+        verify_aggregate(self.portfolio.pk)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.delete()
+        self.assertEqual(response.data["transactions_affected"], 1)
+        self.assertEqual([query["sql"] for query in queries if Transaction._meta.db_table in query["sql"]], [])
+
+    def test_assets_and_transactions_follow_the_portfolio(self):
+        self.delete()
+        kwargs = {'portfolio_pk': self.portfolio.pk}
+        self.assertEqual(self.client.get(reverse('portfolio-assets-list', kwargs=kwargs)).data['results'], [])
+        self.assertEqual(self.client.get(reverse('portfolio-transactions-list', kwargs=kwargs)).data['results'], [])
+        asset_transactions = reverse('asset-transactions-list', kwargs={**kwargs, 'asset_pk': self.asset.pk})
+        self.assertEqual(self.client.get(asset_transactions).data['results'], [])
+        response = self.client.post(asset_transactions, {
+            "transaction_type": "BUY", "quantity": "1", "price_per_unit": "100"
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        # Rows are kept until purged
+        self.assertTrue(Asset.objects.filter(pk=self.asset.pk).exists())
+
+    def test_deleting_twice_is_not_found(self):
+        self.delete()
+        self.assertEqual(self.delete().status_code, status.HTTP_404_NOT_FOUND)
+
+
+class PurgePortfoliosCommandTest(TestCase):
+    def setUp(self):
+        user = create_user("purgeuser")
+        self.kept = Portfolio.objects.create(owner=user, name="Kept")
+        kept_asset = Asset.objects.create(portfolio=self.kept, coin_id="bitcoin")
+        buy(kept_asset, "1")
+
+        self.old = Portfolio.objects.create(owner=user, name="Old")
+        for coin_id in ("bitcoin", "ethereum"):
+            asset = Asset.objects.create(portfolio=self.old, coin_id=coin_id)
+            for _ in range(3):
+                buy(asset, "1")
+        PortfolioSnapshot.objects.create(portfolio=self.old, taken_at=timezone.now(),
+                                         cost_basis=Decimal("0"), realized_profit_loss=Decimal("0"))
+        self.old.soft_delete()
+        Portfolio.all_objects.filter(pk=self.old.pk).update(deleted_at=timezone.now() - timedelta(days=40))
+
+        self.recent = Portfolio.objects.create(owner=user, name="Recent")
+        Asset.objects.create(portfolio=self.recent, coin_id="solana")
+        self.recent.soft_delete()
+
+    def test_purges_old_deleted_portfolios_in_batches(self):
+        out = StringIO()
+        call_command("purge_portfolios", "--older-than-days", "30", "--batch-size", "2", stdout=out)
+
+        self.assertIn("Purged 1 portfolios, 6 transactions.", out.getvalue())
+        self.assertFalse(Portfolio.all_objects.filter(pk=self.old.pk).exists())
+        self.assertFalse(Asset.objects.filter(coin_id="ethereum").exists())
+        self.assertFalse(PortfolioSnapshot.objects.exists())
+        # Only the kept portfolio's history is left
+        self.assertEqual(Transaction.objects.count(), 1)
+        self.assertEqual(TaxLot.objects.count(), 1)
+        # Deleted too recently, or not deleted at all
+        self.assertTrue(Portfolio.all_objects.filter(pk=self.recent.pk).exists())
+        self.assertTrue(Portfolio.objects.filter(pk=self.kept.pk).exists())
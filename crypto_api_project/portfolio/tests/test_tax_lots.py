@@ -0,0 +1,119 @@
+from datetime import timedelta
+from decimal import Decimal
+from rest_framework.test import APITestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from portfolio.models import Asset, LotDisposal, Portfolio, TaxLot
+from django.contrib.auth import get_user_model
+
+
+# Lot matching for SELLs and the realized gains report
+class TaxLotTest(APITestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="lotuser",
+            email="lotuser@example.com",
+            password="testpassword123"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.portfolio = Portfolio.objects.create(owner=self.user, name="Lot Portfolio")
+        self.asset = Asset.objects.create(portfolio=self.portfolio, coin_id="bitcoin")
+        self.bulk_url = reverse('asset-transactions-bulk', kwargs={
+            'portfolio_pk': self.portfolio.pk,
+            'asset_pk': self.asset.pk
+        })
+        self.gains_url = reverse('portfolio-realized-gains', kwargs={'pk': self.portfolio.pk})
+
+    def trade(self, *trades):
+        response = self.client.post(self.bulk_url, {"transactions": [
+            {"transaction_type": kind, "quantity": quantity, "price_per_unit": price}
+            for kind, quantity, price in trades
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def buy_three_lots_and_sell(self, method):
+        self.portfolio.lot_method = method
+        self.portfolio.save()
+        self.trade(
+            ("BUY", "1", "100"),
+            ("BUY", "1", "300"),
+            ("BUY", "1", "200"),
+            ("SELL", "1.5", "400"),
+        )
+        return self.client.get(self.gains_url).data
+
+    def test_fifo_consumes_oldest_lots(self):
+        data = self.buy_three_lots_and_sell("FIFO")
+        # 1 @ 100 + 0.5 @ 300
+        self.assertEqual(data['total_realized_gain'], Decimal("350"))
+        self.assertEqual(
+            sorted(TaxLot.objects.values_list('cost_per_unit', 'remaining_quantity')),
+            [(Decimal("100"), Decimal("0")), (Decimal("200"), Decimal("1")), (Decimal("300"), Decimal("0.5"))]
+        )
+
+    def test_lifo_consumes_newest_lots(self):
+        data = self.buy_three_lots_and_sell("LIFO")
+        # 1 @ 200 + 0.5 @ 300
+        self.assertEqual(data['total_realized_gain'], Decimal("250"))
+        self.assertEqual(data['method'], "LIFO")
+
+    def test_hifo_consumes_most_expensive_lots(self):
+        data = self.buy_three_lots_and_sell("HIFO")
+        # 1 @ 300 + 0.5 @ 200
+        self.assertEqual(data['total_realized_gain'], Decimal("200"))
+        self.assertEqual(data['assets'], [
+            {"coin_id": "bitcoin", "quantity": Decimal("1.5"), "realized_gain": Decimal("200")}
+        ])
+
+    def test_quantity_without_lots_uses_average_buy_price(self):
+        # Held before lot tracking: no lots exist for it
+        self.asset.quantity = Decimal("2")
+        self.asset.average_buy_price = Decimal("50")
+        self.asset.save()
+        self.trade(("SELL", "1", "80"))
+
+        disposal = LotDisposal.objects.get()
+        self.assertIsNone(disposal.lot)
+        self.assertEqual(disposal.realized_gain, Decimal("30"))
+
+    def hold_untracked_then_trade(self, method, *trades):
+        # 1 held from before lot tracking at an average of 150
+        self.portfolio.lot_method = method
+        self.portfolio.save()
+        self.asset.quantity = Decimal("1")
+        self.asset.average_buy_price = Decimal("150")
+        self.asset.save()
+        self.trade(*trades)
+        return self.client.get(self.gains_url).data['total_realized_gain']
+
+    def test_fifo_consumes_untracked_quantity_first(self):
+        gain = self.hold_untracked_then_trade("FIFO", ("BUY", "1", "100"), ("SELL", "1", "200"))
+        self.assertEqual(gain, Decimal("50"))
+        self.assertEqual(TaxLot.objects.get().remaining_quantity, Decimal("1"))
+
+    def test_lifo_consumes_untracked_quantity_last(self):
+        gain = self.hold_untracked_then_trade("LIFO", ("BUY", "1", "100"), ("SELL", "1", "200"))
+        self.assertEqual(gain, Decimal("100"))
+        self.assertEqual(TaxLot.objects.get().remaining_quantity, Decimal("0"))
+
+    def test_hifo_places_untracked_quantity_by_cost(self):
+        gain = self.hold_untracked_then_trade(
+            "HIFO", ("BUY", "1", "100"), ("BUY", "1", "200"), ("SELL", "1.5", "300")
+        )
+        # 1 @ 200 + 0.5 @ 150
+        self.assertEqual(gain, Decimal("175"))
+        self.assertEqual(LotDisposal.objects.get(lot=None).quantity, Decimal("0.5"))
+
+    def test_gains_filtered_by_date_range(self):
+        self.trade(("BUY", "1", "100"), ("SELL", "1", "150"))
+        tomorrow = (timezone.now() + timedelta(days=1)).date().isoformat()
+
+        self.assertEqual(self.client.get(self.gains_url, {"to": tomorrow}).data['total_realized_gain'], Decimal("50"))
+        data = self.client.get(self.gains_url, {"from": tomorrow}).data
+        self.assertEqual(data['total_realized_gain'], Decimal("0"))
+        self.assertEqual(data['assets'], [])
+
+    def test_invalid_date_is_rejected(self):
+        response = self.client.get(self.gains_url, {"from": "yesterday"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
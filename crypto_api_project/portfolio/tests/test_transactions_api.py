@@ -1,4 +1,8 @@
+from unittest import mock
 from rest_framework.test import APITestCase
+from django.core.cache import cache
+from django.core.signing import SignatureExpired
+from portfolio.services.quotes import issue_quote
 from django.urls import reverse
 from rest_framework import status
 from portfolio.models import Asset, Portfolio, Transaction
@@ -61,4 +65,131 @@ class TransactionAPITest(APITestCase):
         self.assertEqual(response.data['results'][0]['transaction_type'], "BUY")
         self.assertEqual(float(response.data['results'][0]['quantity']), 0.5)
         self.assertEqual(float(response.data['results'][0]['price_per_unit']), 30000.0)
-        self.assertEqual(float(response.data['results'][0]['total_value']), 15000.0)
\ No newline at end of file
+        self.assertEqual(float(response.data['results'][0]['total_value']), 15000.0)
+
+
+# Quote-then-commit: the price is resolved before the asset row is locked
+class TransactionQuoteTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            username="quoteuser",
+            email="quoteuser@example.com",
+            password="testpassword123"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.portfolio = Portfolio.objects.create(owner=self.user, name="Quote Portfolio")
+        self.asset = Asset.objects.create(portfolio=self.portfolio, coin_id="bitcoin")
+        self.url = reverse('asset-transactions-list', kwargs={
+            'portfolio_pk': self.portfolio.pk,
+            'asset_pk': self.asset.pk
+        })
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_quote_endpoint_returns_signed_price(self, mock_get):
+        mock_get.return_value.json.return_value = {"bitcoin": {"usd": 30000}}
+        url = reverse('portfolio-assets-quote', kwargs={
+            'portfolio_pk': self.portfolio.pk,
+            'pk': self.asset.pk
+        })
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Decimal(response.data['price']), Decimal("30000"))
+        self.assertTrue(response.data['quote_token'])
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_create_transaction_with_quote_skips_live_price(self, mock_get):
+        token = issue_quote("bitcoin", Decimal("31000"))
+        response = self.client.post(self.url, {
+            "transaction_type": "BUY",
+            "quantity": "2",
+            "quote_token": token,
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        mock_get.assert_not_called()
+        self.asset.refresh_from_db()
+        self.assertEqual(self.asset.quantity, Decimal("2"))
+        self.assertEqual(self.asset.average_buy_price, Decimal("31000"))
+        self.assertEqual(Transaction.objects.get().total_value, Decimal("62000"))
+
+    def test_quote_for_other_coin_is_rejected(self):
+        token = issue_quote("ethereum", Decimal("2000"))
+        response = self.client.post(self.url, {
+            "transaction_type": "BUY",
+            "quantity": "1",
+            "quote_token": token,
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Transaction.objects.count(), 0)
+
+    @mock.patch("portfolio.services.quotes.signing.loads")
+    def test_expired_quote_is_rejected(self, mock_loads):
+        mock_loads.side_effect = SignatureExpired("expired")
+        response = self.client.post(self.url, {
+            "transaction_type": "BUY",
+            "quantity": "1",
+            "quote_token": "stale-token",
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Transaction.objects.count(), 0)
+
+
+# Bulk import: one lock per asset, ordered replay, one insert
+class BulkTransactionTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            username="bulkuser",
+            email="bulkuser@example.com",
+            password="testpassword123"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.portfolio = Portfolio.objects.create(owner=self.user, name="Bulk Portfolio")
+        self.asset = Asset.objects.create(portfolio=self.portfolio, coin_id="bitcoin")
+        self.url = reverse('asset-transactions-bulk', kwargs={
+            'portfolio_pk': self.portfolio.pk,
+            'asset_pk': self.asset.pk
+        })
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_bulk_replays_trades_in_order(self, mock_get):
+        response = self.client.post(self.url, {"transactions": [
+            {"transaction_type": "BUY", "quantity": "1", "price_per_unit": "100"},
+            {"transaction_type": "BUY", "quantity": "1", "price_per_unit": "200"},
+            {"transaction_type": "SELL", "quantity": "1", "price_per_unit": "300"},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 3)
+        mock_get.assert_not_called()
+        self.asset.refresh_from_db()
+        self.assertEqual(self.asset.quantity, Decimal("1"))
+        self.assertEqual(self.asset.average_buy_price, Decimal("150"))
+        self.assertEqual(self.asset.realized_profit_loss, Decimal("150"))
+        self.assertEqual(Transaction.objects.filter(asset=self.asset).count(), 3)
+
+    def test_bulk_is_all_or_nothing(self):
+        response = self.client.post(self.url, {"transactions": [
+            {"transaction_type": "BUY", "quantity": "1", "price_per_unit": "100"},
+            {"transaction_type": "SELL", "quantity": "2", "price_per_unit": "100"},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Transaction.objects.count(), 0)
+        self.asset.refresh_from_db()
+        self.assertEqual(self.asset.quantity, Decimal("0"))
+
+    @mock.patch("portfolio.services.coingecko.upstream_get")
+    def test_trades_without_price_use_one_live_fetch(self, mock_get):
+        mock_get.return_value.json.return_value = {"bitcoin": {"usd": 30000}}
+        response = self.client.post(self.url, {"transactions": [
+            {"transaction_type": "BUY", "quantity": "1"},
+            {"transaction_type": "BUY", "quantity": "2"},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(mock_get.call_count, 1)
+        self.asset.refresh_from_db()
+        self.assertEqual(self.asset.quantity, Decimal("3"))
+        self.assertEqual(self.asset.average_buy_price, Decimal("30000"))
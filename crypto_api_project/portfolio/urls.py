@@ -5,8 +5,10 @@ from .views import (
     AssetViewSet, TransactionViewSet, 
     UserProfileViewSet, 
     PortfolioTransactionsViewSet,
-    LogoutView
+    LogoutView,
+    ResponseCacheStatsView
 )
+from .async_views import AsyncAssetListView, AsyncPortfolioSummaryView, PortfolioStreamView
 from rest_framework.routers import DefaultRouter
 from rest_framework_nested.routers import NestedDefaultRouter
 from drf_spectacular.views import(
@@ -39,6 +41,18 @@ urlpatterns = [
     path("register/", UserCreateView.as_view(), name="user-register"),
     path("logout/", LogoutView.as_view(), name="user-logout"),
 
+    # Operational metrics (staff only)
+    path("metrics/response-cache/", ResponseCacheStatsView.as_view(), name="response-cache-stats"),
+
+    # Async versions of the hottest reads, meant for the ASGI entry point
+    path("async/portfolios/<int:pk>/summary/", AsyncPortfolioSummaryView.as_view(),
+         name="async-portfolio-summary"),
+    path("async/portfolios/<int:portfolio_pk>/assets/", AsyncAssetListView.as_view(),
+         name="async-portfolio-assets"),
+
+    # Live price stream (server-sent events), for the ASGI entry point
+    path("portfolios/<int:pk>/stream/", PortfolioStreamView.as_view(), name="portfolio-stream"),
+
     # API schema and documentation routes
     path('schema/', SpectacularAPIView.as_view(), name='schema'),
     path('swagger/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
@@ -1,21 +1,43 @@
+from datetime import datetime, time, timedelta, timezone as dt_timezone
 from decimal import Decimal
 from django.shortcuts import render
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.http import StreamingHttpResponse
+from django.db.models import Count, Max
 from rest_framework.generics import CreateAPIView
 from rest_framework import mixins, viewsets
+from rest_framework.decorators import action
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from .serializers import (
     UserCreateSerializer, PortfolioSerializer, 
-    AssetSerializer, TransactionSerializer, UserProfileSerializer 
+    AssetSerializer, TransactionSerializer, UserProfileSerializer,
+    BulkTransactionSerializer
 )
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from .models import Portfolio, Asset, Transaction, UserProfile
-from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
 from rest_framework import status
-from portfolio.services.coingecko import get_coin_price
+from portfolio.services.coingecko import (
+    PRICE_CACHE_TIMEOUT, get_cached_prices, get_coin_price, get_coin_prices
+)
 from portfolio.services.request_meta import get_client_ip
+from portfolio.services.summary import build_portfolio_summary
+from portfolio.services.trades import apply_trade, InsufficientBalance
+from portfolio.services.export import stream_csv, stream_ndjson
+from portfolio.services.quotes import issue_quote, resolve_quote, QuoteError
+from portfolio.services.lots import LotLedger, realized_gains
+from portfolio.services.aggregates import asset_contribution, portfolio_aggregate, record_asset_change
+from portfolio.services.snapshots import HISTORY_INTERVALS, portfolio_history
+from portfolio.services.price_history import price_history
+from portfolio.services.fx import FX_BASE_CURRENCY, UnsupportedCurrency, fx_rate, preferred_currency
 from django.db import transaction
 from portfolio.pagination import TransactionCursorPagination, AssetCursorPagination
+from portfolio.conditional import ConditionalListMixin
+from portfolio.response_cache import CachedResponseMixin
+from portfolio.services.generations import portfolio_generation, response_cache_stats, user_generation
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
 from .throttles import LoginRateThrottle
@@ -30,6 +52,66 @@ import logging
 # Create a logger for this module
 logger = logging.getLogger(__name__)
 
+# Transaction export formats: ?type= -> (row generator, content type, file extension)
+EXPORT_TYPES = {
+    "csv": (stream_csv, "text/csv", "csv"),
+    "ndjson": (stream_ndjson, "application/x-ndjson", "ndjson"),
+}
+# Range served by the history endpoint when ?from= is omitted
+HISTORY_DEFAULT_RANGE = timedelta(days=30)
+# Same for the price history of a coin, which has a row per PRICE_HISTORY_BUCKET
+PRICE_HISTORY_DEFAULT_RANGE = timedelta(days=1)
+
+
+# Valuation currency of a request: ?currency= if given, else the user's preferred currency
+def get_request_currency(request):
+    currency = request.query_params.get('currency')
+    if not currency:
+        return preferred_currency(request.user)
+    currency = currency.lower()
+    if currency not in settings.SUPPORTED_CURRENCIES:
+        raise ValidationError({"currency": [f"Use one of: {', '.join(settings.SUPPORTED_CURRENCIES)}."]})
+    return currency
+
+# ?name= as an aware datetime (ISO 8601 date or datetime), None if not given
+def parse_date_param(request, name):
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    try:
+        parsed = parse_datetime(value) or parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValidationError({name: ["Use an ISO 8601 date or datetime."]})
+    if not isinstance(parsed, datetime):
+        parsed = datetime.combine(parsed, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+# Validators of a one-portfolio transaction list ordered by (-transaction_date, -id).
+# Its newest row is one descent of that index and catches new trades. It
+# also names the portfolio the rows belong to (the URL's portfolio_pk may be
+# missing or not the asset's), whose generation, bumped by every transaction
+# write, catches rows imported with past dates. No Last-Modified for the
+# same reason.
+def transaction_list_validators(queryset):
+    newest = queryset.values_list('id', 'transaction_date', 'asset__portfolio_id').first()
+    generation = portfolio_generation(newest[2]) if newest else None
+    return [generation, newest], None
+
+# Valuation currency and its rate from USD, as (currency, rate, stale).
+# Falls back to USD while no exchange rate for the currency is known.
+# With fetch=False only cached rates are used, stale or not.
+def get_valuation(request, fetch=True):
+    currency = get_request_currency(request)
+    try:
+        rate, stale = fx_rate(currency, fetch)
+    except UnsupportedCurrency:
+        return FX_BASE_CURRENCY, Decimal("1"), True
+    return currency, rate, stale
+
 
 # Create your views here.
 class UserCreateView(CreateAPIView):
@@ -71,11 +153,21 @@ class LogoutView(APIView):
                             status=status.HTTP_400_BAD_REQUEST)
          
 
+# Hit/miss counters of the per-user response cache, for staff dashboards
+class ResponseCacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+    cached_views = ("portfolio", "portfolio-assets", "portfolio-transactions")
+
+    def get(self, request):
+        return Response(response_cache_stats(self.cached_views), status=status.HTTP_200_OK)
+
 # Portofolio, Asset, and Transaction views would go here
-class PortfolioViewSet(viewsets.ModelViewSet):
+class PortfolioViewSet(ConditionalListMixin, CachedResponseMixin, viewsets.ModelViewSet):
     # Implementation for Portfolio CRUD operations
     serializer_class = PortfolioSerializer
-    queryset = Portfolio.objects.all()
+    # Active portfolios only, see ActivePortfolioManager.
+    # The summary reads the aggregate row, load it with the portfolio.
+    queryset = Portfolio.objects.select_related('aggregate')
     permission_classes = [IsAuthenticated, IsOwner] # Only authenticated users can access
     pagination_class = None  # Pagination is not necessary for portfolios
 
@@ -84,6 +176,14 @@ class PortfolioViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         # Limit portfolios to those owned by the authenticated user
         return self.queryset.filter(owner=self.request.user)
+
+    # Any edit bumps update_at, the count catches removals
+    def list_validators(self, queryset):
+        versions = queryset.aggregate(last_update=Max('update_at'), count=Count('id'))
+        return [versions['last_update'], versions['count']], versions['last_update']
+
+    def response_cache_version(self):
+        return user_generation(self.request.user.pk)
     
     def perform_create(self, serializer):
         # Automatically set the owner to the logged-in user
@@ -100,10 +200,9 @@ class PortfolioViewSet(viewsets.ModelViewSet):
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object() # Get the portfolio instance to be deleted
         instance_name = instance.name # Get the portfolio name for message  
-        # Count associated transactions before deletion for logging
-        transaction_count = Transaction.objects.filter(
-            asset__portfolio=instance
-        ).count()
+        # Transactions affected, from the running totals loaded with the
+        # portfolio rather than a count over its whole history
+        transaction_count = portfolio_aggregate(instance).transaction_count
 
         instance.soft_delete() # Soft delete the portfolio
         client_ip = get_client_ip(request)
@@ -119,23 +218,165 @@ class PortfolioViewSet(viewsets.ModelViewSet):
                         "transactions_affected": transaction_count},
                         status = status.HTTP_200_OK)
 
-class AssetViewSet(viewsets.ModelViewSet):
+    # Portfolio totals and per-coin positions valued at current prices,
+    # in ?currency= or the user's preferred currency
+    @action(detail=True, methods=['get'])
+    def summary(self, request, *args, **kwargs):
+        portfolio = self.get_object()
+        currency, _, _ = get_valuation(request)
+        summary, stale = build_portfolio_summary(portfolio, currency=currency)
+        response = Response(summary, status=status.HTTP_200_OK)
+        response["X-Price-Freshness"] = "stale" if stale else "fresh"
+        return response
+
+    # Lot-matched realized gains per coin, optionally within ?from=&to= (ISO dates)
+    @action(detail=True, methods=['get'], url_path='realized-gains')
+    def realized_gains(self, request, *args, **kwargs):
+        portfolio = self.get_object()
+        start = parse_date_param(request, 'from')
+        end = parse_date_param(request, 'to')
+        gains = realized_gains(portfolio, start, end)
+        total = sum((row['realized_gain'] for row in gains), Decimal("0"))
+        return Response({
+            "method": portfolio.lot_method,
+            "from": start,
+            "to": end,
+            "total_realized_gain": total,
+            "assets": [{
+                "coin_id": row['asset__coin_id'],
+                "quantity": row['quantity'],
+                "realized_gain": row['realized_gain'],
+            } for row in gains],
+        }, status=status.HTTP_200_OK)
+
+    # Valuation series from stored snapshots: ?from=&to=&interval=hour|day|week[&coin_id=][&currency=]
+    # Snapshots are stored in USD and converted at the current rate
+    @action(detail=True, methods=['get'])
+    def history(self, request, *args, **kwargs):
+        portfolio = self.get_object()
+        interval = request.query_params.get('interval', 'day')
+        if interval not in HISTORY_INTERVALS:
+            raise ValidationError({"interval": [f"Use one of: {', '.join(HISTORY_INTERVALS)}."]})
+        end = parse_date_param(request, 'to') or timezone.now()
+        start = parse_date_param(request, 'from') or end - HISTORY_DEFAULT_RANGE
+        coin_id = request.query_params.get('coin_id', '')
+        currency, rate, stale = get_valuation(request)
+        response = Response({
+            "portfolio": portfolio.id,
+            "coin_id": coin_id or None,
+            "currency": currency,
+            "interval": interval,
+            "from": start,
+            "to": end,
+            "points": portfolio_history(portfolio, start, end, interval, coin_id, rate=rate),
+        }, status=status.HTTP_200_OK)
+        response["X-Price-Freshness"] = "stale" if stale else "fresh"
+        return response
+
+class AssetViewSet(ConditionalListMixin, CachedResponseMixin, viewsets.ModelViewSet):
     # Implementation for Asset CRUD operations
     serializer_class = AssetSerializer
-    queryset = Asset.objects.all()
+    # Portfolio is needed by IsAssetOwner, load it with the asset
+    queryset = Asset.objects.select_related('portfolio')
     permission_classes = [IsAuthenticated, IsAssetOwner] # Only authenticated users can access
     pagination_class = AssetCursorPagination
 
     def get_queryset(self):
         queryset = super().get_queryset()
-        queryset = queryset.filter(portfolio__owner=self.request.user)
-        # Limit assets to those in portfolios owned by the authenticated user
+        # Limit assets to those in active portfolios owned by the authenticated user
+        queryset = queryset.filter(portfolio__owner=self.request.user, portfolio__active=True)
         # Get the portfolio ID from the URL if nested routing is used
         portfolio_id = self.kwargs.get('portfolio_pk') # For nested routing
         if portfolio_id:
             queryset = queryset.filter(portfolio__id=portfolio_id)
         # Otherwise, return all assets in portfolios owned by the user
         return queryset   
+
+    # Value assets in ?currency= or the user's preferred currency.
+    # Prices stay in USD; the serializer multiplies by the cached FX rate.
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["currency"], context["fx_rate"], self.fx_stale = self.valuation()
+        return context
+
+    # Resolved once per request. Writes only use cached rates, so an FX
+    # refresh never sits on the write path.
+    def valuation(self):
+        if not hasattr(self, '_valuation'):
+            self._valuation = get_valuation(self.request, fetch=self.request.method in SAFE_METHODS)
+        return self._valuation
+
+    # Values depend on the page's assets, the cached prices of their coins
+    # and the FX rate. Price writes for other coins leave the ETag alone.
+    def list_validators(self, queryset):
+        assets = self.page_assets
+        prices = self.shown_prices
+        currency, rate, _ = self.valuation()
+        updates = [asset.update_at for asset in assets] + [
+            datetime.fromtimestamp(fetched_at, tz=dt_timezone.utc)
+            for _, fetched_at in prices.values() if fetched_at
+        ]
+        parts = [
+            [(asset.id, asset.update_at) for asset in assets],
+            # Assets added or removed around the page change its links
+            getattr(self.paginator, 'has_next', None), getattr(self.paginator, 'has_previous', None),
+            sorted((coin_id, price) for coin_id, (price, _) in prices.items()),
+            currency, rate,
+        ]
+        return parts, max(updates, default=None)
+
+    # Keyed like the ETag: a price write for a coin not shown keeps the entry
+    def response_cache_version(self):
+        currency, rate, _ = self.valuation()
+        prices = sorted((coin_id, price) for coin_id, (price, _) in self.shown_prices.items())
+        return [portfolio_generation(self.kwargs.get('portfolio_pk')), prices, self.prices_fresh_until(),
+                currency, rate]
+
+    # Entries expire when the first price shown goes stale: the rebuild then
+    # refreshes it and reports it as stale instead of replaying "fresh"
+    def response_cache_timeout(self):
+        fresh_until = self.prices_fresh_until()
+        if fresh_until is None:
+            return settings.RESPONSE_CACHE_TIMEOUT
+        return min(settings.RESPONSE_CACHE_TIMEOUT, int(fresh_until - timezone.now().timestamp()))
+
+    def prices_fresh_until(self):
+        fetched = [fetched_at for _, fetched_at in self.shown_prices.values() if fetched_at]
+        return min(fetched) + PRICE_CACHE_TIMEOUT if fetched else None
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        # The page query runs once: validators and the response both use its rows
+        page = self.paginate_queryset(queryset)
+        self.page_assets = page if page is not None else list(queryset)
+        self.shown_prices = get_cached_prices({asset.coin_id for asset in self.page_assets},
+                                              currency=FX_BASE_CURRENCY)
+        not_modified = self.not_modified_response(queryset)
+        if not_modified is not None:
+            return self.with_validators(not_modified)
+        return self.with_validators(self.cached_response(lambda: self.render_list(page)))
+
+    # The cache key needs the asset's coin, so the object is loaded first
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        self.shown_prices = get_cached_prices([instance.coin_id], currency=FX_BASE_CURRENCY)
+        return self.cached_response(lambda: Response(self.get_serializer(instance).data))
+
+    # List assets with every price on the page resolved in one batch
+    def render_list(self, page):
+        assets = self.page_assets
+        context = self.get_serializer_context()
+        price_response = get_coin_prices({asset.coin_id for asset in assets}, currency=FX_BASE_CURRENCY)
+        context["prices"] = price_response["prices"]
+
+        serializer = self.get_serializer(assets, many=True, context=context)
+        if page is not None:
+            response = self.get_paginated_response(serializer.data)
+        else:
+            response = Response(serializer.data)
+        # Tell clients whether any price on the page came from a stale cache entry
+        response["X-Price-Freshness"] = "stale" if price_response["stale"] or self.fx_stale else "fresh"
+        return response
      
     # Automatically set the portfolio based on the request data
     def perform_create(self, serializer):
@@ -148,7 +389,9 @@ class AssetViewSet(viewsets.ModelViewSet):
             portfolio_instance = Portfolio.objects.get(id=portfolio_pk, owner=self.request.user) 
         except Portfolio.DoesNotExist:
             raise PermissionDenied("You do not have permission to add assets to this portfolio.")
-        serializer.save(portfolio=portfolio_instance)
+        with transaction.atomic():
+            serializer.save(portfolio=portfolio_instance)
+            record_asset_change(portfolio_instance.id, None, asset_contribution(serializer.instance), assets=1)
         logger.info(
             "ASSET_CREATED - User: %s, Asset ID: %s, Portfolio ID: %s",
             self.request.user.username,
@@ -160,7 +403,12 @@ class AssetViewSet(viewsets.ModelViewSet):
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object() # Get the asset instance to be deleted
         symbol = instance.coin_id.upper() # Get the coin symbol for message
-        self.perform_destroy(instance) # Delete the asset
+        with transaction.atomic():
+            # Lock the row so a concurrent trade can't change what it takes out of the totals
+            instance = Asset.objects.select_for_update().get(pk=instance.pk)
+            before = asset_contribution(instance)
+            self.perform_destroy(instance) # Delete the asset
+            record_asset_change(instance.portfolio_id, before, None, assets=-1)
         client_ip = get_client_ip(request)
         logger.info(
             "ASSET_DELETED - User: %s, Asset ID: %s, IP: %s",
@@ -170,6 +418,36 @@ class AssetViewSet(viewsets.ModelViewSet):
         )
         return Response({"detail": f"Asset {symbol} deleted successfully."},
                         status = status.HTTP_200_OK)
+
+    # Signed price quote to place a transaction at a known price
+    @action(detail=True, methods=['get'])
+    def quote(self, request, *args, **kwargs):
+        asset = self.get_object()
+        price_response = get_coin_price(asset.coin_id, currency="usd", allow_stale=False)
+        if not price_response or not price_response.get("success", True):
+            raise ValidationError("Could not fetch live price for the asset.")
+        price = Decimal(str(price_response.get("price")))
+        return Response({
+            "coin_id": asset.coin_id,
+            "currency": "usd",
+            "price": price,
+            "quote_token": issue_quote(asset.coin_id, price, currency="usd"),
+            "expires_in": settings.PRICE_QUOTE_MAX_AGE,
+        }, status=status.HTTP_200_OK)
+
+    # OHLC price buckets of the asset's coin from the local history (USD): ?from=&to=
+    @action(detail=True, methods=['get'], url_path='price-history', url_name='price-history')
+    def coin_price_history(self, request, *args, **kwargs):
+        asset = self.get_object()
+        end = parse_date_param(request, 'to') or timezone.now()
+        start = parse_date_param(request, 'from') or end - PRICE_HISTORY_DEFAULT_RANGE
+        return Response({
+            "coin_id": asset.coin_id,
+            "currency": FX_BASE_CURRENCY,
+            "from": start,
+            "to": end,
+            "points": price_history(asset.coin_id, FX_BASE_CURRENCY, start, end),
+        }, status=status.HTTP_200_OK)
     
 """
 - Transaction ViewSet with create, list, and retrieve functionalities.
@@ -180,6 +458,7 @@ class AssetViewSet(viewsets.ModelViewSet):
 - Custom error handling for insufficient balance.
 """    
 class TransactionViewSet(
+    ConditionalListMixin,
     viewsets.GenericViewSet, 
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
@@ -187,7 +466,8 @@ class TransactionViewSet(
 ):
     # Implementation for Transaction CRUD operations
     serializer_class = TransactionSerializer
-    queryset = Transaction.objects.all()
+    # Asset and portfolio are needed by IsTransactionOwner, load them with the transaction
+    queryset = Transaction.objects.select_related('asset__portfolio')
     permission_classes = [IsAuthenticated, IsTransactionOwner] # Only authenticated users can access
     pagination_class = TransactionCursorPagination
 
@@ -198,51 +478,80 @@ class TransactionViewSet(
             return super().get_queryset().none()
         return super().get_queryset().filter(
             asset_id=asset_id,
-            asset__portfolio__owner=self.request.user
-        ).order_by('-transaction_date')
-    # Automatically set the asset based on the request data
-    @transaction.atomic
-    def perform_create(self, serializer):
+            asset__portfolio__owner=self.request.user,
+            asset__portfolio__active=True
+        ).order_by('-transaction_date', '-id')
+
+    def list_validators(self, queryset):
+        return transaction_list_validators(queryset)
+
+    # Resolve the unit price before any row lock is taken.
+    # A valid quote token pins the price; otherwise fetch the live price.
+    def resolve_price(self, coin_id, quote_token=None):
+        if quote_token:
+            try:
+                return resolve_quote(
+                    quote_token, coin_id, currency="usd",
+                    max_age=settings.PRICE_QUOTE_MAX_AGE
+                )
+            except QuoteError as e:
+                raise ValidationError(str(e))
+        # Fetch live price for the asset
+        price_response = get_coin_price(coin_id, currency="usd", allow_stale=False)  
+        # check if price fetch was successful
+        if not price_response or not price_response.get("success", True):
+            raise ValidationError("Could not fetch live price for the asset.")   
+        return Decimal(str(price_response.get("price", 0.00)))
+
+    # Lock the asset row for the rest of the transaction.
+    # The coin was priced before locking, make sure it did not change since.
+    def lock_asset(self, asset_id, coin_id):
+        try:
+            asset = Asset.objects.select_for_update().get(
+                id=asset_id, portfolio__owner=self.request.user, portfolio__active=True)
+        except Asset.DoesNotExist:
+            raise PermissionDenied("Asset not found or access denied.")
+        if asset.coin_id != coin_id:
+            raise ValidationError("Asset changed while placing the transaction, please retry.")
+        return asset
+
+    # Look the asset up without locking, only to know which coin to price
+    def get_asset_coin_id(self):
         asset_id = self.kwargs.get('asset_pk')
         # Guard against missing asset_id
         if not asset_id:
             raise ValidationError("Asset ID is required to add a transaction.") 
         # Ensure the asset belongs to a portfolio owned by the authenticated user
         try:
-            asset = Asset.objects.select_for_update().get(
-                id=asset_id, portfolio__owner=self.request.user)
+            return Asset.objects.values_list('coin_id', flat=True).get(
+                id=asset_id, portfolio__owner=self.request.user, portfolio__active=True)
         except Asset.DoesNotExist:
             raise PermissionDenied("Asset not found or access denied.")
+
+    # Automatically set the asset based on the request data
+    def perform_create(self, serializer):
+        asset_id = self.kwargs.get('asset_pk')
+        coin_id = self.get_asset_coin_id()
         
         #Get the values from the validated data
         transaction_type = serializer.validated_data.get('transaction_type')
         quantity = serializer.validated_data.get('quantity')
+        quote_token = serializer.validated_data.pop('quote_token', None)
         # Validate quantity(Avoid zero, negative, none)
         if not quantity or quantity <= 0:
             raise ValidationError("Quantity must be greater than zero.")    
-        # Fetch live price for the asset
-        price_response = get_coin_price(asset.coin_id, currency="usd")  
-        # check if price fetch was successful
-        if not price_response or not price_response.get("success", True):
-            raise ValidationError("Could not fetch live price for the asset.")   
-        price_per_unit = Decimal(str(price_response.get("price", 0.00)))
-        
-        # calculate total value
-        total_value = price_per_unit * quantity
+        # Price is resolved outside the transaction so a slow upstream
+        # never holds the asset row lock or a DB connection.
+        price_per_unit = self.resolve_price(coin_id, quote_token)
         
-        if transaction_type == "BUY":
-            # Calculate the new average buy price based on the existing quantity and price plus the new purchase
-            total_cost = (asset.average_buy_price * asset.quantity) + (price_per_unit * quantity)
-            total_quantity = asset.quantity + quantity
-
-            # Avoid division by zero error
-            if total_quantity > 0:
-                asset.average_buy_price = total_cost / total_quantity
-            asset.quantity = total_quantity
-        elif transaction_type == "SELL":
-
-            # check if user is trying to sell more than they own
-            if quantity > asset.quantity:
+        # The locked section only does arithmetic and writes
+        with transaction.atomic():
+            asset = self.lock_asset(asset_id, coin_id)
+            before = asset_contribution(asset)
+            ledger = LotLedger(asset)
+            try:
+                total_value = apply_trade(asset, transaction_type, quantity, price_per_unit)
+            except InsufficientBalance as e:
                 client_ip = get_client_ip(self.request)
                 logger.info(
                     "TRANSACTION_FAILED - User: %s, Asset ID: %s, Attempted Sell Quantity: %s, IP: %s",
@@ -251,21 +560,17 @@ class TransactionViewSet(
                     quantity,
                     client_ip
                 )
-                raise ValidationError("Insufficient balance.")
-            
-            # Calculate realized profit/loss for the sold quantity
-            profit_loss = (price_per_unit - asset.average_buy_price) * quantity
-            asset.realized_profit_loss += profit_loss
-            
-            # Sell transaction reduces the quantity
-            asset.quantity -= quantity
-        serializer.save(
-            asset=asset,
-            price_per_unit=price_per_unit,
-            total_value=total_value
-
-            )
-        asset.save()
+                raise ValidationError(str(e))
+            serializer.save(
+                asset=asset,
+                price_per_unit=price_per_unit,
+                total_value=total_value
+
+                )
+            ledger.record(serializer.instance)
+            ledger.flush()
+            asset.save()
+            record_asset_change(asset.portfolio_id, before, asset_contribution(asset), transactions=1)
         client_ip = get_client_ip(self.request)
         logger.info(
             "TRANSACTION_CREATED - User: %s, Transaction ID: %s, Asset ID: %s, Type: %s, IP: %s",
@@ -276,8 +581,65 @@ class TransactionViewSet(
             client_ip
         )
 
+    # Import many trades for one asset: one price fetch, one row lock, one bulk insert
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request, *args, **kwargs):
+        asset_id = self.kwargs.get('asset_pk')
+        coin_id = self.get_asset_coin_id()
+        serializer = BulkTransactionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        trades = serializer.validated_data['transactions']
+
+        # Trades without their own fill price are booked at one live/quoted price
+        live_price = None
+        if any(trade.get('price_per_unit') is None for trade in trades):
+            live_price = self.resolve_price(coin_id, serializer.validated_data.get('quote_token'))
+
+        with transaction.atomic():
+            asset = self.lock_asset(asset_id, coin_id)
+            before = asset_contribution(asset)
+            ledger = LotLedger(asset)
+            # Replay the average-cost and realized P/L math in order
+            new_transactions = []
+            for index, trade in enumerate(trades):
+                price_per_unit = trade.get('price_per_unit') or live_price
+                try:
+                    total_value = apply_trade(asset, trade['transaction_type'], trade['quantity'], price_per_unit)
+                except InsufficientBalance as e:
+                    raise ValidationError({"transactions": {index: [str(e)]}})
+                new_transactions.append(Transaction(
+                    asset=asset,
+                    transaction_type=trade['transaction_type'],
+                    quantity=trade['quantity'],
+                    price_per_unit=price_per_unit,
+                    total_value=total_value,
+                ))
+            Transaction.objects.bulk_create(new_transactions, batch_size=500)
+            # Lots need the primary keys returned by bulk_create
+            for txn in new_transactions:
+                ledger.record(txn)
+            ledger.flush()
+            asset.save(update_fields=['quantity', 'average_buy_price', 'realized_profit_loss', 'update_at'])
+            record_asset_change(asset.portfolio_id, before, asset_contribution(asset),
+                                transactions=len(new_transactions))
+
+        client_ip = get_client_ip(request)
+        logger.info(
+            "TRANSACTIONS_BULK_CREATED - User: %s, Asset ID: %s, Count: %d, IP: %s",
+            request.user.username,
+            asset.id,
+            len(new_transactions),
+            client_ip
+        )
+        return Response({
+            "created": len(new_transactions),
+            "quantity": asset.quantity,
+            "average_buy_price": asset.average_buy_price,
+            "realized_profit_loss": asset.realized_profit_loss,
+        }, status=status.HTTP_201_CREATED)
+
 # Portfolio specific view to get list of transactions
-class PortfolioTransactionsViewSet(viewsets.ReadOnlyModelViewSet):
+class PortfolioTransactionsViewSet(ConditionalListMixin, CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = TransactionSerializer
     permission_classes = [IsAuthenticated]
     pagination_class = TransactionCursorPagination
@@ -286,5 +648,35 @@ class PortfolioTransactionsViewSet(viewsets.ReadOnlyModelViewSet):
         portfolio_id = self.kwargs.get('portfolio_pk')
         return Transaction.objects.filter(
             asset__portfolio__id=portfolio_id,
-            asset__portfolio__owner=self.request.user
-        ).order_by('-transaction_date')
+            asset__portfolio__owner=self.request.user,
+            asset__portfolio__active=True
+        ).order_by('-transaction_date', '-id')
+
+    def list_validators(self, queryset):
+        return transaction_list_validators(queryset)
+
+    def response_cache_version(self):
+        return portfolio_generation(self.kwargs.get('portfolio_pk'))
+
+    # Stream the full history as CSV (default) or NDJSON in constant memory
+    @action(detail=False, methods=['get'])
+    def export(self, request, *args, **kwargs):
+        portfolio_id = self.kwargs.get('portfolio_pk')
+        if not Portfolio.objects.filter(id=portfolio_id, owner=request.user).exists():
+            raise NotFound("Portfolio not found.")
+        export_type = request.query_params.get('type', 'csv')
+        if export_type not in EXPORT_TYPES:
+            raise ValidationError(f"Unsupported export type, use one of: {', '.join(EXPORT_TYPES)}.")
+
+        stream, content_type, extension = EXPORT_TYPES[export_type]
+        response = StreamingHttpResponse(stream(self.get_queryset()), content_type=content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="portfolio-{portfolio_id}-transactions.{extension}"'
+        )
+        logger.info(
+            "TRANSACTIONS_EXPORTED - User: %s, Portfolio ID: %s, Type: %s",
+            request.user.username,
+            portfolio_id,
+            export_type
+        )
+        return response